@@ -2,52 +2,130 @@
 
 from __future__ import annotations
 
-import shutil
+import uuid
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from app.services.storage import save_and_index_pdf
-from app.core.schemas import UploadResponse
+from app.services.storage import delete_document, write_stream
+from app.workers.bulk import BULK_IMPORT_ROOT, submit_bulk
+from app.workers.ingest import INCOMING_DIR, QueueFull, hold_file, release_file, submit_ingest
+from app.core.schemas import JobAccepted, DeleteResponse
 
 router = APIRouter(tags=["documents"])
 
 
-@router.post("/upload", response_model=UploadResponse)
+@router.post("/upload", response_model=JobAccepted, status_code=202)
 async def upload(file: UploadFile = File(...)):
     """
     1) Receive a PDF
     2) Save it to disk
-    3) Extract + chunk + index via save_and_index_pdf
+    3) Queue a background job to extract + chunk + index it
+
+    Returns right away with a job id; poll /v1/jobs/{job_id} for progress
+    and the indexing result. Uploading a file with the same name again
+    replaces the indexed version; uploading a byte-identical copy of an
+    indexed document skips extraction and embedding.
     """
 
     if not file.filename:
         raise HTTPException(status_code=400, detail="Empty filename")
 
-    upload_dir = Path("uploaded_files")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    filename = Path(file.filename).name  # never write outside the upload dir
+    INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    incoming = INCOMING_DIR / f"{uuid.uuid4().hex}-{filename}"
+
+    # Stream the upload to disk in blocks, hashing it on the way, off the
+    # event loop. The incoming dir is inside UPLOAD_DIR, so the job later
+    # moves the file into place with a rename, not a copy.
+    sha256, _ = await run_in_threadpool(write_stream, file.file, incoming)
+
+    try:
+        job = submit_ingest(incoming, filename, sha256=sha256)
+    except QueueFull as e:
+        incoming.unlink(missing_ok=True)
+        raise HTTPException(status_code=429, detail=f"Ingestion queue is full: {e}")
 
-    target = upload_dir / file.filename
+    return JobAccepted(
+        job_id=job.id,
+        filename=filename,
+        status=job.status,
+        status_url=f"/v1/jobs/{job.id}",
+    )
 
-    # Save uploaded file to disk
-    with target.open("wb") as f:
-        shutil.copyfileobj(file.file, f)
 
-    # Call storage pipeline
+@router.post("/bulk", response_model=JobAccepted, status_code=202)
+async def bulk(
+    file: Optional[UploadFile] = File(None),
+    path: Optional[str] = Form(None),
+):
+    """
+    Import a whole corpus of PDF, .txt and .md files as one background job:
+    either an uploaded .zip archive (`file`), or a directory or .zip on the
+    server (`path`, only under BULK_IMPORT_ROOT). Poll /v1/jobs/{job_id}
+    for file and chunk counts; the result has the throughput summary.
+    Files already indexed are skipped, so re-submitting an interrupted
+    import resumes it.
+    """
+    if (file is None) == (path is None):
+        raise HTTPException(status_code=400, detail="Send either a .zip file or a path")
+
+    if file is not None:
+        if not file.filename or not file.filename.lower().endswith(".zip"):
+            raise HTTPException(status_code=400, detail="Bulk uploads must be .zip archives")
+        label = Path(file.filename).name
+        INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+        source = INCOMING_DIR / f"{uuid.uuid4().hex}-{label}"
+        await run_in_threadpool(write_stream, file.file, source)
+        cleanup = True
+    else:
+        if not BULK_IMPORT_ROOT:
+            raise HTTPException(status_code=403, detail="Importing by path is disabled (BULK_IMPORT_ROOT)")
+        root = Path(BULK_IMPORT_ROOT).resolve()
+        source = (root / path).resolve()
+        if source != root and root not in source.parents:
+            raise HTTPException(status_code=403, detail="Path is outside BULK_IMPORT_ROOT")
+        if not source.exists():
+            raise HTTPException(status_code=404, detail=f"Not found: {path}")
+        label = source.name
+        cleanup = False
+
     try:
-        result = save_and_index_pdf(target)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Indexing failed: {e}")
+        job = submit_bulk(source, label, cleanup=cleanup)
+    except QueueFull as e:
+        if cleanup:
+            source.unlink(missing_ok=True)
+        raise HTTPException(status_code=429, detail=f"Ingestion queue is full: {e}")
 
-    if not result.get("ok"):
+    return JobAccepted(
+        job_id=job.id,
+        filename=label,
+        status=job.status,
+        status_url=f"/v1/jobs/{job.id}",
+    )
+
+
+@router.delete("/documents/{filename}", response_model=DeleteResponse)
+def delete(filename: str):
+    """
+    Remove a document from the vector store, the keyword index and disk.
+    Answers 409 while an upload or bulk import is indexing the same file.
+    """
+    name = Path(filename).name
+    if not hold_file(name, blocking=False):
         raise HTTPException(
-            status_code=400,
-            detail=result.get("error", "Unknown indexing error"),
+            status_code=409, detail=f"'{name}' is being indexed; retry when its job is done"
         )
+    try:
+        result = delete_document(name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delete failed: {e}")
+    finally:
+        release_file(name)
 
-    return UploadResponse(
-        ok=True,
-        filename=result["filename"],
-        chunks_indexed=result["chunks_indexed"],
-        collection_info=result["collection_info"],
-    )
+    if not result.get("ok"):
+        raise HTTPException(status_code=404, detail=f"Document not found: {filename}")
+
+    return DeleteResponse(**result)
@@ -0,0 +1,23 @@
+# app/api/routes_jobs.py
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from app.workers.ingest import get_job
+from app.core.schemas import JobStatus
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    """
+    Status of a background ingestion job: queued / running / done / failed,
+    the current stage, page and chunk progress counts, and the indexing
+    result (or error) once finished.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return JobStatus(**job.to_dict())
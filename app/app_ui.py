@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import os
 import json
+import time
 from typing import Any, Dict, Tuple
 
 import requests
@@ -163,6 +164,12 @@ if page == "Upload Document":
             with st.spinner("Uploading to backend…"):
                 ok, resp = post_file("/v1/upload", file_name, data, mime)
             if ok:
+                # Indexing runs as a background job; poll until it finishes
+                with st.spinner("Indexing…"):
+                    while ok and resp.get("status") in ("queued", "running"):
+                        time.sleep(1)
+                        ok, resp = get_json(f"/v1/jobs/{resp['job_id']}")
+            if ok and resp.get("status") == "done":
                 st.success("Indexed ✅")
                 st.json(resp)
             else:
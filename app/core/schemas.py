@@ -20,14 +20,49 @@ class RetrievedChunk(BaseModel):
     meta: Dict[str, object] = Field(default_factory=dict)
 
 
-# ---------- /v1/upload responses ----------
+# ---------- /v1/upload (queued) and /v1/jobs/{job_id} ----------
 
-class UploadResponse(BaseModel):
+class JobAccepted(BaseModel):
     ok: bool = True
+    job_id: str
     filename: str
-    chunks_indexed: int
-    collection_info: Optional[Dict[str, object]] = None
-    message: str = "Indexed successfully"
+    status: str = "queued"
+    status_url: str
+
+
+class JobProgress(BaseModel):
+    pages_total: int = 0
+    pages_extracted: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_indexed: int = 0
+    # Bulk imports (/v1/bulk) only
+    files_total: int = 0
+    files_done: int = 0
+    files_indexed: int = 0
+    files_skipped: int = 0
+    files_failed: int = 0
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    filename: str
+    status: Literal["queued", "running", "done", "failed"]
+    stage: Optional[str] = None
+    progress: JobProgress
+    result: Optional[Dict[str, object]] = None   # save_and_index_pdf's (or ingest_corpus's) result
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+# ---------- DELETE /v1/documents/{filename} ----------
+
+class DeleteResponse(BaseModel):
+    ok: bool = True
+    filename: str
+    chunks_deleted: int
 
 
 # ---------- /v1/query ----------
@@ -10,15 +10,24 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.routing import APIRoute
 
 # --- Feature routers (must exist and expose `router = APIRouter()`) ---
 from app.api.routes_documents import router as docs_router       # /v1/upload etc.
+from app.api.routes_jobs import router as jobs_router            # /v1/jobs/{id}
 from app.api.routes_query import router as query_router          # /v1/query
 from app.api.routes_answer import router as answer_router        # /v1/answer
 from app.api.routes_summarize import router as summarize_router  # /v1/summarize
 
+from app.services import bm25_index
+from app.services.pipeline import cache_stats
+from app.services.embedding_cache import get_cache as embedding_cache
+from app.services.embeddings import shutdown_workers
+from app.services.extractor import shutdown_extract_pool
+from app.services.warmup import readiness, start_warmup
+from app.workers import ingest
+
 
 
 log = logging.getLogger("app.main")
@@ -44,11 +53,26 @@ app.add_middleware(
 def root():
     return RedirectResponse(url="/ui")
 
-# Health
+# Health (liveness: the process is up, models may still be loading)
 @app.get("/v1/health")
 def health():
     return {"status": "healthy"}
 
+# Readiness: 200 only once every model and index is loaded and warmed up
+@app.get("/v1/ready")
+def ready():
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+# Retrieval / embedding cache hit rates and sizes
+@app.get("/v1/cache")
+def caches():
+    emb = embedding_cache()
+    return {
+        "retrieval": cache_stats(),
+        "embeddings": emb.stats() if emb is not None else None,
+    }
+
 # Robust route lister (avoids "Internal Server Error" on mounts)
 @app.get("/v1/routes")
 def list_routes():
@@ -64,6 +88,7 @@ def list_routes():
 
 # Mount feature routers
 app.include_router(docs_router,      prefix="/v1")
+app.include_router(jobs_router,      prefix="/v1")
 app.include_router(query_router,     prefix="/v1")
 app.include_router(answer_router,    prefix="/v1")
 app.include_router(summarize_router, prefix="/v1")
@@ -78,7 +103,20 @@ def _startup():
     model_name = os.getenv("MODEL_NAME", "gpt-4o-mini")
     log.info("🔑 OPENAI_API_KEY loaded? %s", key_loaded)
     log.info("🤖 MODEL_NAME: %s", model_name)
-    log.info("✅ Server startup complete.")
+    # Uploads staged by a previous process that never got indexed
+    ingest.sweep_incoming()
+    n_chunks = bm25_index.open_store()
+    log.info("🔎 BM25 index: %s chunks", n_chunks)
+    # Embedding model, Chroma and reranker load in the background;
+    # /v1/ready turns 200 when they are done
+    start_warmup()
+    log.info("✅ Server startup complete (warming up).")
+
+@app.on_event("shutdown")
+def _shutdown():
+    ingest.shutdown()
+    shutdown_workers()
+    shutdown_extract_pool()
 
 # Optional: run directly via `python app/main.py`
 if __name__ == "__main__":
@@ -1,11 +1,32 @@
-from sentence_transformers import CrossEncoder
+import threading
+
+# small local reranker/summarizer, loaded on first use (or by warmup())
+_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                # Imported here: sentence-transformers pulls in torch
+                from sentence_transformers import CrossEncoder
+
+                _model = CrossEncoder(_MODEL_NAME)
+    return _model
+
+
+def warmup() -> None:
+    """Load the cross-encoder and score one pair."""
+    get_model().predict([["warm up", "warm up"]])
 
-# small local reranker/summarizer
-model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
 
 def generate_answer(query, passages):
     pairs = [[query, p] for p in passages]
-    scores = model.predict(pairs)
+    scores = get_model().predict(pairs)
     ranked = [p for _, p in sorted(zip(scores, passages), reverse=True)]
     top = " ".join(ranked[:3])
     return f"Answer summary: {top[:500]}..."
@@ -1,13 +1,44 @@
 # app/services/bm25_index.py
 """
-Simple in-memory BM25 index for keyword retrieval.
+Simple BM25 index for keyword retrieval, persisted next to `chroma_db`.
 
 This file MUST provide:
     - add_chunks(doc_id: str, chunks: list[str])  -> None
 
+Indexing is incremental: document frequencies and the total token count are
+updated per chunk, and idf is derived from them at query time, so adding or
+removing a document never rescans the rest of the corpus.
+
+Chunks are stored in an inverted index (term -> postings of (chunk, tf)), so a
+query only walks the postings of its own terms and keeps the best `top_k`
+with a bounded heap.
+
+The index is a list of immutable *segments*. Every add_chunks call builds one
+small segment, and a background thread merges them (see maintain()), so an
+add never waits for a merge. Once open_store() has been called, each segment
+is also written to its own file under BM25_DIR and memory-mapped back, so
+startup only maps files instead of re-tokenizing the corpus.
+
+Removing or replacing a document only tombstones its chunks. A background
+compaction rewrites segments once enough of them is dead, so steady
+re-upload traffic does not grow the index or slow queries down.
+
+Terms are interned once into integer ids (the lexicon, persisted as
+lexicon.txt), and segments hold only typed arrays plus one UTF-8 text blob,
+so no per-chunk or per-term Python objects are kept beyond the lexicon.
+
 Optionally, we also expose:
-    - query_bm25(query: str, top_k: int = 6) -> list[dict]
+    - query_bm25(query: str, top_k: int = 6, *, prune=True, stats=None) -> list[dict]
     - query(query: str, top_k: int = 6)      -> list[dict]
+    - query_batch(queries: list[str], top_k: int = 6) -> list[list[dict]]
+    - remove_chunks(doc_id: str)              -> int
+    - replace_chunks(doc_id: str, chunks: list[str]) -> int
+    - compact(min_dead_ratio: float | None = None) -> int
+    - maintain()                              -> None
+    - version()                               -> int
+    - size()                                  -> int
+    - documents()                             -> set[str]
+    - open_store(path: str | Path | None = None) -> int
 
 If the rest of the app imports only `add_chunks`, that's fine.
 If it later wants `query(...)`, we also have it implemented here.
@@ -15,20 +46,443 @@ If it later wants `query(...)`, we also have it implemented here.
 
 from __future__ import annotations
 
+import bisect
+import heapq
+import json
+import logging
 import math
+import mmap
+import os
 import re
-from typing import Any, Dict, List, Tuple
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+log = logging.getLogger("app.services.bm25_index")
+
+# Where the on-disk index lives (sibling of chroma_db by default)
+BM25_DIR = Path(os.getenv("BM25_DIR", "bm25_index"))
+
+# Rewrite a segment in the background once this fraction of it is deleted
+COMPACT_RATIO = float(os.getenv("BM25_COMPACT_RATIO", "0.25"))
+
+_MAGIC = b"BM25SEG3"
+_MANIFEST = "manifest.json"
+_LEXICON = "lexicon.txt"
+
+
+def _copy_array(typecode: str, seq: Any) -> array:
+    """Copy an array or memory-mapped view into a new heap array."""
+    out = array(typecode)
+    out.frombytes(memoryview(seq).cast("B"))
+    return out
+
+
+def _extend(out: array, seq: Any) -> None:
+    """Append an array or memory-mapped view of the same item type to `out`."""
+    if len(seq):
+        out.frombytes(memoryview(seq).cast("B"))
+
+
+# ---------------------------------------------------------------------
+# Lexicon: every distinct term is interned once as a small integer id
+# ---------------------------------------------------------------------
+
+# Append-only and shared by all segments and snapshots: ids never change, so
+# readers can look terms up without a lock. Persisted as one term per line.
+_TERM_IDS: Dict[str, int] = {}
+_TERMS: List[str] = []
+_LEX_LOCK = threading.Lock()
+_LEX_SAVED: int = 0              # how many of _TERMS are already on disk
+
+
+def _intern(terms: Iterable[str]) -> List[int]:
+    """Term ids for `terms`, assigning new ids to unseen terms."""
+    ids: List[int] = []
+    for t in terms:
+        tid = _TERM_IDS.get(t)
+        if tid is None:
+            with _LEX_LOCK:
+                tid = _TERM_IDS.get(t)
+                if tid is None:
+                    tid = len(_TERMS)
+                    _TERMS.append(t)
+                    _TERM_IDS[t] = tid
+        ids.append(tid)
+    return ids
+
 
 # ---------------------------------------------------------------------
-# Internal global state: VERY simple in-memory BM25 index
+# Segments: immutable blocks of chunks with their own postings
 # ---------------------------------------------------------------------
 
-_DOCS: List[str] = []          # raw chunk text
-_DOC_IDS: List[str] = []       # doc_id for each chunk
-_TOKENS: List[List[str]] = []  # tokenized chunks
+class _Segment:
+    """
+    A contiguous range of chunks [base, base + n) and their inverted index.
+
+    Everything per chunk or per posting is a typed array: `array.array` when
+    freshly built, or a memoryview over a memory-mapped segment file; both
+    support len(), indexing, slicing and bisect. Chunk texts are one UTF-8
+    blob plus offsets, so no Python object is kept per chunk or per token.
+    """
+
+    __slots__ = (
+        "base", "n", "total_len", "doc_names", "doc_starts", "doc_lens",
+        "text_offsets", "text_blob", "term_ids", "term_offsets",
+        "term_max_tf", "term_min_dl", "post_docs", "post_tfs", "path", "_mmap",
+    )
+
+    def __init__(self) -> None:
+        self.base = 0
+        self.n = 0
+        self.total_len = 0
+        self.doc_names: List[str] = []      # doc_id of each run of chunks
+        self.doc_starts: List[int] = []     # local index where each run starts
+        self.doc_lens: Sequence[int] = array("I")
+        self.text_offsets: Sequence[int] = array("Q", [0])
+        self.text_blob: Any = b""
+        # Sorted term ids, and per term: postings [offsets[i], offsets[i+1]),
+        # max tf and min chunk length (a score upper bound for pruned queries)
+        self.term_ids: Sequence[int] = array("I")
+        self.term_offsets: Sequence[int] = array("Q", [0])
+        self.term_max_tf: Sequence[int] = array("I")
+        self.term_min_dl: Sequence[int] = array("I")
+        self.post_docs: Sequence[int] = array("I")   # local chunk index
+        self.post_tfs: Sequence[int] = array("I")
+        self.path: Path | None = None
+        self._mmap: mmap.mmap | None = None
+
+    # ---- reads ----
+
+    def find(self, tid: int) -> int:
+        """Position of term id `tid` in this segment, or -1."""
+        i = bisect.bisect_left(self.term_ids, tid)
+        if i < len(self.term_ids) and self.term_ids[i] == tid:
+            return i
+        return -1
+
+    def df(self, tid: int) -> int:
+        i = self.find(tid)
+        return self.term_offsets[i + 1] - self.term_offsets[i] if i >= 0 else 0
+
+    def postings(self, tid: int) -> Tuple[Sequence[int], Sequence[int]]:
+        i = self.find(tid)
+        if i < 0:
+            return (), ()
+        a, b = self.term_offsets[i], self.term_offsets[i + 1]
+        return self.post_docs[a:b], self.post_tfs[a:b]
+
+    def text(self, local: int) -> str:
+        a, b = self.text_offsets[local], self.text_offsets[local + 1]
+        return bytes(self.text_blob[a:b]).decode("utf-8")
+
+    def doc_id(self, local: int) -> str:
+        return self.doc_names[bisect.bisect_right(self.doc_starts, local) - 1]
+
+    def doc_ranges(self, doc_id: str) -> Iterable[range]:
+        for i, name in enumerate(self.doc_names):
+            if name == doc_id:
+                end = self.doc_starts[i + 1] if i + 1 < len(self.doc_starts) else self.n
+                yield range(self.doc_starts[i], end)
+
+    # ---- construction ----
+
+    @classmethod
+    def build(cls, base: int, doc_id: str, chunks: List[str]) -> "_Segment":
+        """Tokenize `chunks` of one document into a new in-memory segment."""
+        seg = cls()
+        seg.base = base
+        seg.doc_names = [doc_id]
+        seg.doc_starts = [0]
+
+        blob = bytearray()
+        offsets = array("Q", [0])
+        lens = array("I")
+        postings: Dict[int, List[Any]] = {}
+
+        for local, ch in enumerate(chunks):
+            toks = _tokenize(ch)
+            dl = len(toks)
+            lens.append(dl)
+            blob += ch.encode("utf-8")
+            offsets.append(len(blob))
+            counts = Counter(toks)
+            for tid, tf in zip(_intern(counts), counts.values()):
+                plist = postings.get(tid)
+                if plist is None:
+                    postings[tid] = [array("I", [local]), array("I", [tf]), tf, dl]
+                    continue
+                plist[0].append(local)
+                plist[1].append(tf)
+                if tf > plist[2]:
+                    plist[2] = tf
+                if dl < plist[3]:
+                    plist[3] = dl
+
+        seg.n = len(chunks)
+        seg.total_len = sum(lens)
+        seg.doc_lens = lens
+        seg.text_offsets = offsets
+        seg.text_blob = bytes(blob)
+        seg._set_postings(postings)
+        return seg
+
+    @classmethod
+    def merge(cls, a: "_Segment", b: "_Segment") -> "_Segment":
+        """Concatenate two adjacent segments without re-tokenizing."""
+        seg = cls()
+        seg.base = a.base
+        seg.n = a.n + b.n
+        seg.total_len = a.total_len + b.total_len
+        seg.doc_names = a.doc_names + b.doc_names
+        seg.doc_starts = a.doc_starts + [s + a.n for s in b.doc_starts]
+        seg.doc_lens = _copy_array("I", a.doc_lens) + _copy_array("I", b.doc_lens)
+
+        shift = a.text_offsets[a.n]
+        seg.text_offsets = _copy_array("Q", a.text_offsets) + array(
+            "Q", (o + shift for o in b.text_offsets[1:])
+        )
+        seg.text_blob = bytes(a.text_blob) + bytes(b.text_blob)
+
+        # Both term id lists are sorted: walk them together, bulk-copying
+        # runs of terms found in only one side (b's local indexes move up
+        # by a.n) and concatenating the postings of terms found in both
+        ta, tb = a.term_ids, b.term_ids
+        na, nb = len(ta), len(tb)
+        term_ids = array("I")
+        offsets = array("Q", [0])
+        max_tf = array("I")
+        min_dl = array("I")
+        docs = array("I")
+        tfs = array("I")
+
+        def copy_run(src: "_Segment", lo: int, hi: int, doc_shift: int) -> None:
+            p0, p1 = src.term_offsets[lo], src.term_offsets[hi]
+            at = len(docs) - p0
+            _extend(term_ids, src.term_ids[lo:hi])
+            _extend(max_tf, src.term_max_tf[lo:hi])
+            _extend(min_dl, src.term_min_dl[lo:hi])
+            offsets.extend([o + at for o in src.term_offsets[lo + 1:hi + 1]])
+            if doc_shift:
+                docs.extend([d + doc_shift for d in src.post_docs[p0:p1]])
+            else:
+                _extend(docs, src.post_docs[p0:p1])
+            _extend(tfs, src.post_tfs[p0:p1])
+
+        i = j = 0
+        while i < na or j < nb:
+            k = bisect.bisect_left(ta, tb[j], i) if j < nb else na
+            if k > i:
+                copy_run(a, i, k, 0)
+                i = k
+            k = bisect.bisect_left(tb, ta[i], j) if i < na else nb
+            if k > j:
+                copy_run(b, j, k, a.n)
+                j = k
+            if i < na and j < nb and ta[i] == tb[j]:
+                lo, hi = a.term_offsets[i], a.term_offsets[i + 1]
+                _extend(docs, a.post_docs[lo:hi])
+                _extend(tfs, a.post_tfs[lo:hi])
+                lo, hi = b.term_offsets[j], b.term_offsets[j + 1]
+                docs.extend([d + a.n for d in b.post_docs[lo:hi]])
+                _extend(tfs, b.post_tfs[lo:hi])
+                term_ids.append(ta[i])
+                offsets.append(len(docs))
+                max_tf.append(max(a.term_max_tf[i], b.term_max_tf[j]))
+                min_dl.append(min(a.term_min_dl[i], b.term_min_dl[j]))
+                i += 1
+                j += 1
+
+        seg.term_ids = term_ids
+        seg.term_offsets = offsets
+        seg.term_max_tf = max_tf
+        seg.term_min_dl = min_dl
+        seg.post_docs = docs
+        seg.post_tfs = tfs
+        return seg
+
+    def compact(self, dead: Iterable[int]) -> Tuple["_Segment", Dict[int, int]]:
+        """
+        Copy of this segment without the chunks at local indexes `dead`.
+
+        Live chunks are renumbered from 0 and keep their order; the base is
+        unchanged. Also returns, per term id, how many postings were dropped,
+        i.e. how much document frequency the dead chunks had contributed.
+        """
+        dead = set(dead)
+        remap = array("q")
+        live = 0
+        for local in range(self.n):
+            if local in dead:
+                remap.append(-1)
+            else:
+                remap.append(live)
+                live += 1
+
+        seg = _Segment()
+        seg.base = self.base
+        seg.n = live
+
+        for name, start, end in zip(
+            self.doc_names, self.doc_starts, list(self.doc_starts[1:]) + [self.n]
+        ):
+            kept = [remap[i] for i in range(start, end) if remap[i] >= 0]
+            if kept:
+                seg.doc_names.append(name)
+                seg.doc_starts.append(kept[0])
+
+        blob = bytearray()
+        offsets = array("Q", [0])
+        lens = array("I")
+        for local in range(self.n):
+            if remap[local] < 0:
+                continue
+            a, b = self.text_offsets[local], self.text_offsets[local + 1]
+            blob += self.text_blob[a:b]
+            offsets.append(len(blob))
+            lens.append(self.doc_lens[local])
+        seg.total_len = sum(lens)
+        seg.doc_lens = lens
+        seg.text_offsets = offsets
+        seg.text_blob = bytes(blob)
+
+        postings: Dict[int, List[Any]] = {}
+        dropped: Dict[int, int] = {}
+        for i, tid in enumerate(self.term_ids):
+            a, b = self.term_offsets[i], self.term_offsets[i + 1]
+            docs = array("I")
+            tfs = array("I")
+            for d, tf in zip(self.post_docs[a:b], self.post_tfs[a:b]):
+                new = remap[d]
+                if new >= 0:
+                    docs.append(new)
+                    tfs.append(tf)
+            if len(docs) < b - a:
+                dropped[tid] = b - a - len(docs)
+            if docs:
+                postings[tid] = [docs, tfs, max(tfs), min(lens[d] for d in docs)]
+        seg._set_postings(postings)
+        return seg, dropped
+
+    def _set_postings(self, postings: Dict[int, List[Any]]) -> None:
+        """
+        Lay out per-term postings contiguously, term ids in sorted order.
+
+        `postings` maps term id -> [docs, tfs, max_tf, min_dl].
+        """
+        term_ids = array("I", sorted(postings))
+        offsets = array("Q", [0])
+        max_tf = array("I")
+        min_dl = array("I")
+        docs = array("I")
+        tfs = array("I")
+        for tid in term_ids:
+            term_docs, term_tfs, mx, mn = postings[tid]
+            docs.extend(term_docs)
+            tfs.extend(term_tfs)
+            offsets.append(len(docs))
+            max_tf.append(mx)
+            min_dl.append(mn)
+        self.term_ids = term_ids
+        self.term_offsets = offsets
+        self.term_max_tf = max_tf
+        self.term_min_dl = min_dl
+        self.post_docs = docs
+        self.post_tfs = tfs
+
+    # ---- on-disk format ----
+    #
+    #   b"BM25SEG3" | u64 header length | JSON header | 8-byte aligned arrays
+    #
+    # The header holds the document runs and the (offset, size in bytes) of
+    # every array section; arrays are stored in native byte order. Term ids
+    # refer to the store's lexicon file.
+
+    _SECTIONS = (
+        ("doc_lens", "I"),
+        ("text_offsets", "Q"),
+        ("term_ids", "I"),
+        ("term_offsets", "Q"),
+        ("term_max_tf", "I"),
+        ("term_min_dl", "I"),
+        ("post_docs", "I"),
+        ("post_tfs", "I"),
+        ("text_blob", "B"),
+    )
+
+    def write(self, path: Path) -> None:
+        sections: Dict[str, List[int]] = {}
+        header: Dict[str, Any] = {
+            "byteorder": sys.byteorder,
+            "n": self.n,
+            "total_len": self.total_len,
+            "doc_names": self.doc_names,
+            "doc_starts": self.doc_starts,
+            "sections": sections,
+        }
+
+        # Section offsets are relative to the (8-byte aligned) data start
+        rel = 0
+        for name, _ in self._SECTIONS:
+            size = memoryview(getattr(self, name)).nbytes
+            rel = (rel + 7) & ~7
+            sections[name] = [rel, size]
+            rel += size
+
+        raw = json.dumps(header).encode("utf-8")
+        data_start = (len(_MAGIC) + 8 + len(raw) + 7) & ~7
+
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(raw)))
+            f.write(raw)
+            for name, _ in self._SECTIONS:
+                f.seek(data_start + sections[name][0])
+                f.write(memoryview(getattr(self, name)).cast("B"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path: Path, base: int) -> "_Segment":
+        """Memory-map a segment file written by write()."""
+        with path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if mm[: len(_MAGIC)] != _MAGIC:
+            mm.close()
+            raise ValueError(f"Not a BM25 segment file: {path}")
+        (hlen,) = struct.unpack_from("<Q", mm, len(_MAGIC))
+        hstart = len(_MAGIC) + 8
+        header = json.loads(mm[hstart:hstart + hlen])
+        if header["byteorder"] != sys.byteorder:
+            mm.close()
+            raise ValueError(f"BM25 segment {path} was written on a different byte order")
+        data_start = (hstart + hlen + 7) & ~7
+
+        view = memoryview(mm)
+        seg = cls()
+        seg.base = base
+        seg.n = header["n"]
+        seg.total_len = header["total_len"]
+        seg.doc_names = header["doc_names"]
+        seg.doc_starts = header["doc_starts"]
+        for name, typecode in cls._SECTIONS:
+            off, size = header["sections"][name]
+            setattr(seg, name, view[data_start + off:data_start + off + size].cast(typecode))
+        seg.path = path
+        seg._mmap = mm
+        return seg
 
-_IDF: Dict[str, float] = {}    # word -> idf
-_AVG_DL: float = 0.0           # average document length
+
+# ---------------------------------------------------------------------
+# Snapshots: immutable, self-consistent versions of the whole index
+# ---------------------------------------------------------------------
 
 # BM25 parameters
 _K1: float = 1.5
@@ -40,33 +494,325 @@ def _tokenize(text: str) -> List[str]:
     return re.findall(r"\b\w+\b", text.lower())
 
 
-def _recompute_idf() -> None:
-    """Recompute IDF and average document length. Called after indexing."""
-    global _IDF, _AVG_DL
+class _Snapshot:
+    """
+    One published version of the index.
+
+    Writers never modify a published snapshot: they build a new one and swap
+    the module-level `_SNAP` reference, which is atomic. A query reads `_SNAP`
+    once and uses only that object, so it always sees segments, deletions and
+    corpus statistics that belong together, without taking a lock.
+    """
+
+    __slots__ = (
+        "version", "segments", "bases", "next_base", "deleted", "dead_df",
+        "n_docs", "total_len",
+    )
 
-    n_docs = len(_DOCS)
-    if n_docs == 0:
-        _IDF = {}
-        _AVG_DL = 0.0
-        return
+    def __init__(
+        self,
+        version: int = 0,
+        segments: Tuple[_Segment, ...] = (),
+        next_base: int = 0,
+        deleted: frozenset = frozenset(),
+        dead_df: Dict[int, int] | None = None,
+        n_docs: int = 0,
+        total_len: int = 0,
+    ) -> None:
+        self.version = version            # bumped whenever indexed content changes
+        self.segments = segments          # ordered by base; compaction leaves gaps
+        self.bases = [seg.base for seg in segments]
+        self.next_base = next_base        # chunk index for the next added chunk
+        # Removed chunks stay in their segment and are skipped at query time;
+        # their contribution to document frequencies is tracked in dead_df.
+        self.deleted = deleted
+        self.dead_df = dead_df if dead_df is not None else {}
+        # Corpus statistics, maintained incrementally by add/remove so that
+        # indexing cost depends only on the chunks being added/removed.
+        self.n_docs = n_docs              # number of live chunks
+        self.total_len = total_len        # sum of live chunk lengths (tokens)
+
+    def replace(self, *, bump: bool = True, **changes: Any) -> "_Snapshot":
+        """Copy with some fields changed; `bump` marks a content change."""
+        fields = {name: getattr(self, name) for name in self.__slots__ if name != "bases"}
+        fields.update(changes)
+        if bump:
+            fields["version"] = self.version + 1
+        return _Snapshot(**fields)
+
+    def avg_dl(self) -> float:
+        """Average document length, derived from the running totals."""
+        return self.total_len / float(self.n_docs) if self.n_docs else 0.0
+
+    def idf(self, tid: int) -> float:
+        """
+        Standard BM25-ish idf, computed on demand from the document frequency.
+
+        Every add/remove changes the corpus size and therefore every idf
+        value, so we never materialize the full table; queries only need
+        their own terms.
+        """
+        freq = sum(seg.df(tid) for seg in self.segments) - self.dead_df.get(tid, 0)
+        if freq <= 0:
+            return 0.0
+        return math.log(1.0 + (self.n_docs - freq + 0.5) / (freq + 0.5))
+
+    def locate(self, idx: int) -> Tuple[_Segment, int]:
+        """Map a global chunk index to (segment, local index)."""
+        seg = self.segments[bisect.bisect_right(self.bases, idx) - 1]
+        return seg, idx - seg.base
+
+
+# ---------------------------------------------------------------------
+# Internal global state
+# ---------------------------------------------------------------------
+
+_SNAP: _Snapshot = _Snapshot()      # current version; replaced, never mutated
+_WRITE_LOCK = threading.Lock()      # serializes writers only; readers never lock
+_MAINTAIN_LOCK = threading.Lock()   # held while merging/compacting (see maintain())
+
+_STORE: Path | None = None          # set by open_store(); None = memory only
+
+_MATRIX: Tuple[int, int, Any] | None = None  # query_batch() cache
+
+
+def _publish(snap: _Snapshot) -> None:
+    """Make `snap` the current version. Caller holds _WRITE_LOCK."""
+    global _SNAP
+
+    if _STORE is not None:
+        _write_manifest(snap)
+    _SNAP = snap
+
+
+# ---------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------
+
+def _segment_file(seg: _Segment) -> str:
+    return f"seg_{seg.base:012d}_{seg.n}.bin"
+
+
+def _write_manifest(snap: _Snapshot) -> None:
+    assert _STORE is not None
+    manifest = {
+        "segments": [[_segment_file(s), s.base] for s in snap.segments],
+        "next_base": snap.next_base,
+        "deleted": sorted(snap.deleted),
+    }
+    tmp = _STORE / (_MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, _STORE / _MANIFEST)
+
+
+def _save_lexicon() -> None:
+    """Append terms interned since the last save; must precede segment writes."""
+    global _LEX_SAVED
+
+    assert _STORE is not None
+    with _LEX_LOCK:
+        new = _TERMS[_LEX_SAVED:]
+        if not new:
+            return
+        with (_STORE / _LEXICON).open("a", encoding="utf-8", newline="\n") as f:
+            f.write("".join(t + "\n" for t in new))
+            f.flush()
+            os.fsync(f.fileno())
+        _LEX_SAVED += len(new)
+
+
+def _load_lexicon(store: Path) -> None:
+    """Replace the in-memory lexicon with the one saved in `store`."""
+    global _LEX_SAVED
+
+    path = store / _LEXICON
+    terms: List[str] = []
+    if path.exists():
+        raw = path.read_bytes()
+        end = raw.rfind(b"\n") + 1
+        if end < len(raw):
+            # Torn append: no segment can reference the partial term
+            with path.open("r+b") as f:
+                f.truncate(end)
+        terms = raw[:end].decode("utf-8").split("\n")[:-1]
+
+    with _LEX_LOCK:
+        _TERMS[:] = terms
+        _TERM_IDS.clear()
+        _TERM_IDS.update((t, i) for i, t in enumerate(terms))
+        _LEX_SAVED = len(terms)
+
+
+def _persist(seg: _Segment) -> _Segment:
+    """Write `seg` to the store and return its memory-mapped replacement."""
+    if _STORE is None:
+        return seg
+    _save_lexicon()
+    path = _STORE / _segment_file(seg)
+    seg.write(path)
+    return _Segment.open(path, seg.base)
+
+
+def _drop_files(segs: Iterable[_Segment]) -> None:
+    # Readers of older snapshots keep their own mapping of these files, so
+    # unlinking is safe on POSIX.
+    for seg in segs:
+        if seg.path is None:
+            continue
+        try:
+            seg.path.unlink()
+        except OSError:
+            # Still mapped (Windows); open_store() cleans up orphans later.
+            pass
+
+
+def open_store(path: str | Path | None = None) -> int:
+    """
+    Load the on-disk index (if any) and persist every later add/remove.
+
+    Called once at application startup. Returns the number of live chunks.
+    """
+    global _STORE
+
+    store = Path(path) if path is not None else BM25_DIR
+    store.mkdir(parents=True, exist_ok=True)
+
+    # A merge in progress writes its segment file outside _WRITE_LOCK
+    with _MAINTAIN_LOCK, _WRITE_LOCK:
+        manifest_path = store / _MANIFEST
+        manifest: Dict[str, Any] = {"segments": [], "next_base": 0, "deleted": []}
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+        _load_lexicon(store)
+        segments = tuple(
+            _Segment.open(store / name, base) for name, base in manifest["segments"]
+        )
+
+        # Orphans from interrupted writes or merges that could not unlink
+        live = {name for name, _ in manifest["segments"]}
+        for f in store.glob("seg_*"):
+            if f.name not in live:
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+        snap = _Snapshot(
+            version=_SNAP.version + 1,
+            segments=segments,
+            next_base=manifest["next_base"],
+            deleted=frozenset(manifest["deleted"]),
+        )
+        n_docs = sum(s.n for s in segments)
+        total_len = sum(s.total_len for s in segments)
+
+        # Only deleted chunks are re-tokenized, to rebuild their df correction
+        for idx in snap.deleted:
+            seg, local = snap.locate(idx)
+            n_docs -= 1
+            total_len -= seg.doc_lens[local]
+            for tid in set(_intern(_tokenize(seg.text(local)))):
+                snap.dead_df[tid] = snap.dead_df.get(tid, 0) + 1
+        snap.n_docs = n_docs
+        snap.total_len = total_len
+
+        _STORE = store
+        _publish(snap)
+
+    log.info("Loaded BM25 index from %s: %s chunks in %s segments", store, n_docs, len(segments))
+    return n_docs
+
+
+# ---------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------
+
+def _merge_target(segs: Sequence[_Segment]) -> int:
+    """
+    Position of the newest segment that should be merged into the one
+    before it (that one is not much bigger), or 0 if none should.
+    """
+    for i in range(len(segs) - 1, 0, -1):
+        if segs[i - 1].n <= 2 * segs[i].n:
+            return i
+    return 0
+
+
+def _merge_segments() -> int:
+    """
+    Merge the newest segments while the older one is not much bigger.
+
+    Like a binary counter, this keeps O(log n) segments and every chunk is
+    rewritten O(log n) times over the life of the index. Each merge is built
+    and written outside _WRITE_LOCK, then swapped in, so adds and removes
+    are never blocked behind one; tombstones that landed in the meantime
+    are carried over. Runs on the maintenance thread (see maintain()).
+    Returns the number of merges.
+    """
+    merges = 0
+    while True:
+        snap = _SNAP
+        i = _merge_target(snap.segments)
+        if not i:
+            return merges
+        a, b = snap.segments[i - 1], snap.segments[i]
+        merged = _persist(_Segment.merge(a, b))
+
+        with _WRITE_LOCK:
+            cur = _SNAP
+            segs = cur.segments
+            pos = next((j for j, s in enumerate(segs) if s is a), -1)
+            if pos < 0 or pos + 1 >= len(segs) or segs[pos + 1] is not b:
+                # Compacted or reloaded meanwhile: start over from the new state
+                _drop_files((merged,))
+                continue
+            changes: Dict[str, Any] = {"segments": segs[:pos] + (merged,) + segs[pos + 2:]}
+            shift = a.base + a.n - b.base
+            if shift:
+                # `a` was compacted, so b's chunks move down to close the gap
+                end = b.base + b.n
+                changes["deleted"] = frozenset(
+                    idx + shift if b.base <= idx < end else idx for idx in cur.deleted
+                )
+            # Same content, so the version (and any cache keyed on it) stays valid
+            _publish(cur.replace(bump=bool(shift), **changes))
+        _drop_files((a, b))
+        merges += 1
 
-    df: Dict[str, int] = {}
-    lengths: List[int] = []
 
-    for toks in _TOKENS:
-        lengths.append(len(toks))
-        seen = set()
-        for t in toks:
-            if t not in seen:
-                df[t] = df.get(t, 0) + 1
-                seen.add(t)
+def _tombstone(snap: _Snapshot, doc_id: str) -> Tuple[Dict[str, Any], int]:
+    """
+    Snapshot changes that mark every live chunk of `doc_id` as deleted.
+
+    Only the removed chunks' own terms are re-tokenized, to correct document
+    frequencies. Returns (changes for _Snapshot.replace, chunks removed).
+    """
+    deleted = set(snap.deleted)
+    dead_df = dict(snap.dead_df)
+    n_docs, total_len = snap.n_docs, snap.total_len
 
-    _AVG_DL = sum(lengths) / float(n_docs)
-    _IDF = {}
+    removed = 0
+    for seg in snap.segments:
+        for run in seg.doc_ranges(doc_id):
+            for local in run:
+                idx = seg.base + local
+                if idx in deleted:
+                    continue
+                deleted.add(idx)
+                n_docs -= 1
+                total_len -= seg.doc_lens[local]
+                for tid in set(_intern(_tokenize(seg.text(local)))):
+                    dead_df[tid] = dead_df.get(tid, 0) + 1
+                removed += 1
 
-    # Standard BM25-ish idf
-    for term, freq in df.items():
-        _IDF[term] = math.log(1.0 + (n_docs - freq + 0.5) / (freq + 0.5))
+    changes = {
+        "deleted": frozenset(deleted),
+        "dead_df": dead_df,
+        "n_docs": n_docs,
+        "total_len": total_len,
+    }
+    return changes, removed
 
 
 def add_chunks(doc_id: str, chunks: List[str]) -> None:
@@ -76,6 +822,8 @@ def add_chunks(doc_id: str, chunks: List[str]) -> None:
     pipeline.py imports this as:
         from app.services.bm25_index import add_chunks as bm25_add_chunks
 
+    The new chunks become visible to queries all at once.
+
     Parameters
     ----------
     doc_id : str
@@ -83,51 +831,402 @@ def add_chunks(doc_id: str, chunks: List[str]) -> None:
     chunks : list[str]
         The text chunks to index.
     """
-    global _DOCS, _DOC_IDS, _TOKENS
+    _write(doc_id, chunks, replace=False)
+
+
+def replace_chunks(doc_id: str, chunks: List[str]) -> int:
+    """
+    Replace everything indexed under `doc_id` with `chunks`.
+
+    Queries see either the old chunks or the new ones, never both or
+    neither. Returns the number of old chunks removed.
+    """
+    return _write(doc_id, chunks, replace=True)
+
+
+def _write(doc_id: str, chunks: List[str], *, replace: bool) -> int:
+    chunks = [ch for ch in chunks if ch and ch.strip()]
+
+    # Tokenize outside the lock; the base is assigned once we are serialized
+    seg = _Segment.build(0, doc_id, chunks) if chunks else None
+
+    removed = 0
+    with _WRITE_LOCK:
+        snap = _SNAP
+        changes: Dict[str, Any] = {}
+        if replace:
+            changes, removed = _tombstone(snap, doc_id)
+            if not removed:
+                changes = {}
+        if seg is not None:
+            seg.base = snap.next_base
+            seg = _persist(seg)
+            changes.update(
+                segments=snap.segments + (seg,),
+                next_base=snap.next_base + seg.n,
+                n_docs=changes.get("n_docs", snap.n_docs) + seg.n,
+                total_len=changes.get("total_len", snap.total_len) + seg.total_len,
+            )
+        if not changes:
+            return 0
+        _publish(snap.replace(**changes))
+
+    _schedule_maintenance()
+    return removed
+
+
+def remove_chunks(doc_id: str) -> int:
+    """
+    Remove every chunk that was indexed under `doc_id`.
+
+    Removed chunks are only tombstoned: queries skip them right away and a
+    background compaction reclaims their space later.
+    Returns the number of chunks removed.
+    """
+    return replace_chunks(doc_id, [])
+
+
+# ---------------------------------------------------------------------
+# Compaction and background maintenance
+# ---------------------------------------------------------------------
+
+def _dead_locals(snap: _Snapshot, seg: _Segment) -> List[int]:
+    """Sorted local indexes of the deleted chunks in `seg`."""
+    end = seg.base + seg.n
+    return sorted(idx - seg.base for idx in snap.deleted if seg.base <= idx < end)
 
-    for ch in chunks:
-        if not ch or not ch.strip():
+
+def compact(min_dead_ratio: float | None = None) -> int:
+    """
+    Rewrite every segment whose deleted fraction is at least `min_dead_ratio`
+    (default: COMPACT_RATIO).
+
+    Each segment is rebuilt from its live postings outside the write lock,
+    then swapped in; deletions that landed in the meantime are carried over
+    as tombstones. Queries keep running against the previous snapshot the
+    whole time. Returns the number of deleted chunks reclaimed.
+    """
+    if min_dead_ratio is None:
+        min_dead_ratio = COMPACT_RATIO
+
+    reclaimed = 0
+    snap = _SNAP
+    for old in snap.segments:
+        dead = _dead_locals(snap, old)
+        if not dead or len(dead) < min_dead_ratio * old.n:
             continue
 
-        _DOCS.append(ch)
-        _DOC_IDS.append(doc_id)
-        _TOKENS.append(_tokenize(ch))
+        new, dropped = old.compact(dead)
+        with _WRITE_LOCK:
+            cur = _SNAP
+            if old not in cur.segments:
+                continue  # merged away meanwhile; the next pass will see it
+            new = _persist(new) if new.n else None
+            gone = {old.base + local for local in dead}
+
+            # Tombstones for `old` that appeared since we started move down
+            # by the number of reclaimed chunks before them
+            deleted = set()
+            for idx in cur.deleted:
+                if idx in gone:
+                    continue
+                local = idx - old.base
+                if 0 <= local < old.n:
+                    idx -= bisect.bisect_left(dead, local)
+                deleted.add(idx)
+
+            dead_df = dict(cur.dead_df)
+            for tid, k in dropped.items():
+                left = dead_df.get(tid, 0) - k
+                if left > 0:
+                    dead_df[tid] = left
+                else:
+                    dead_df.pop(tid, None)
+
+            segments = tuple(
+                s for s in (new if s is old else s for s in cur.segments) if s is not None
+            )
+            _publish(
+                cur.replace(segments=segments, deleted=frozenset(deleted), dead_df=dead_df)
+            )
+            _drop_files((old,))
+        reclaimed += len(dead)
+        snap = _SNAP
+
+    if reclaimed:
+        log.info("Compacted BM25 index: reclaimed %s deleted chunks", reclaimed)
+    return reclaimed
+
+
+def _needs_maintenance(snap: _Snapshot) -> bool:
+    if _merge_target(snap.segments):
+        return True
+    for seg in snap.segments:
+        dead = len(_dead_locals(snap, seg))
+        if dead and dead >= COMPACT_RATIO * seg.n:
+            return True
+    return False
+
+
+def maintain() -> None:
+    """
+    Run pending segment merges and compaction in the calling thread, after
+    waiting for a background run to finish. Writes schedule this on the
+    maintenance thread by themselves; call it to get a settled index (tests,
+    benchmarks, before a snapshot of the store).
+    """
+    with _MAINTAIN_LOCK:
+        # Compacting can shrink a segment enough to make it mergeable
+        while _needs_maintenance(_SNAP):
+            _merge_segments()
+            compact()
+
+
+def _schedule_maintenance() -> None:
+    """Start the maintenance thread if segments need merging or compacting."""
+    if not _needs_maintenance(_SNAP):
+        return
+    if not _MAINTAIN_LOCK.acquire(blocking=False):
+        return  # already running; it re-checks the latest snapshot before exiting
+
+    def run() -> None:
+        while True:
+            try:
+                _merge_segments()
+                compact()
+            except Exception:
+                log.exception("BM25 index maintenance failed")
+                return
+            finally:
+                _MAINTAIN_LOCK.release()
+            # A write that found the lock held while we were finishing
+            # relies on us to pick up its work
+            if not _needs_maintenance(_SNAP) or not _MAINTAIN_LOCK.acquire(blocking=False):
+                return
+
+    threading.Thread(target=run, name="bm25-maintenance", daemon=True).start()
+
+
+# ---------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------
+
+def _term_score(idf: float, tf: int, doc_len: int, avg_dl: float) -> float:
+    """BM25 contribution of one query term to one chunk."""
+    denom = tf + _K1 * (1.0 - _B + _B * (doc_len / (avg_dl or 1.0)))
+    return idf * (tf * (_K1 + 1.0) / denom)
+
+
+class _Cursor:
+    """
+    Iterator over one query term's postings across all segments, in global
+    chunk order, with a galloping skip (`seek`) used by WAND.
+    """
+
+    __slots__ = ("segs", "si", "pos", "end", "doc", "visited", "slot", "bound")
+
+    def __init__(self, tid: int, segments: Iterable[_Segment]) -> None:
+        # (segment, position of the term in segment.term_ids)
+        self.segs = [(seg, i) for seg in segments for i in (seg.find(tid),) if i >= 0]
+        self.slot = 0        # position of the term in the query
+        self.bound = 0.0     # upper bound of the term's score contribution
+        self.si = -1
+        self.pos = self.end = 0
+        self.doc = _EXHAUSTED
+        self.visited = 0
+        self._next_segment()
 
-    _recompute_idf()
+    def _next_segment(self) -> None:
+        self.si += 1
+        if self.si >= len(self.segs):
+            self.doc = _EXHAUSTED
+            return
+        seg, i = self.segs[self.si]
+        self.pos, self.end = seg.term_offsets[i], seg.term_offsets[i + 1]
+        self._land()
 
+    def _land(self) -> None:
+        seg = self.segs[self.si][0]
+        self.doc = seg.base + seg.post_docs[self.pos]
+        self.visited += 1
 
-def _bm25_score(query_tokens: List[str], doc_tokens: List[str]) -> float:
-    """Compute BM25 score of one query against one document."""
-    if not doc_tokens or not query_tokens:
-        return 0.0
+    def tf_and_len(self) -> Tuple[int, int]:
+        seg = self.segs[self.si][0]
+        return seg.post_tfs[self.pos], seg.doc_lens[seg.post_docs[self.pos]]
 
-    # Term frequencies in document
-    tf: Dict[str, int] = {}
-    for t in doc_tokens:
-        tf[t] = tf.get(t, 0) + 1
+    def advance(self) -> None:
+        self.pos += 1
+        if self.pos < self.end:
+            self._land()
+        else:
+            self._next_segment()
 
-    doc_len = len(doc_tokens)
-    score = 0.0
+    def seek(self, target: int) -> None:
+        """Move to the first posting with chunk index >= target."""
+        while self.doc < target:
+            seg = self.segs[self.si][0]
+            if seg.base + seg.n <= target:
+                self._next_segment()
+                continue
+            self.pos = bisect.bisect_left(
+                seg.post_docs, target - seg.base, self.pos, self.end
+            )
+            if self.pos < self.end:
+                self._land()
+            else:
+                self._next_segment()
 
-    for term in query_tokens:
-        if term not in _IDF:
+
+_EXHAUSTED = sys.maxsize
+
+
+def _query_terms(query: str) -> Counter:
+    """Term id -> count for the query's known terms (never interns)."""
+    return Counter(
+        tid for tid in map(_TERM_IDS.get, _tokenize(query)) if tid is not None
+    )
+
+
+def _query_exhaustive(
+    snap: _Snapshot, q_terms: Counter, top_k: int, stats: Dict[str, int]
+) -> List[Tuple[float, int]]:
+    """Score every chunk in the postings of the query terms."""
+    avg_dl = snap.avg_dl()
+    scores: Dict[int, float] = {}
+
+    # Accumulate scores term-at-a-time over the postings of the query terms.
+    # A term repeated in the query counts once per occurrence.
+    for tid, q_tf in q_terms.items():
+        idf = snap.idf(tid)
+        if idf <= 0.0:
             continue
+        for seg in snap.segments:
+            docs, tfs = seg.postings(tid)
+            lens = seg.doc_lens
+            base = seg.base
+            stats["postings_visited"] += len(docs)
+            for local, tf in zip(docs, tfs):
+                idx = base + local
+                s = q_tf * _term_score(idf, tf, lens[local], avg_dl)
+                scores[idx] = scores.get(idx, 0.0) + s
+
+    stats["docs_scored"] += len(scores)
+
+    # Bounded heap: best score first, lower chunk index wins ties
+    return heapq.nlargest(
+        top_k,
+        ((s, idx) for idx, s in scores.items() if s > 0.0 and idx not in snap.deleted),
+        key=lambda x: (x[0], -x[1]),
+    )
 
-        idf = _IDF[term]
-        freq = tf.get(term, 0)
-        if freq == 0:
+
+def _query_wand(
+    snap: _Snapshot, q_terms: Counter, top_k: int, stats: Dict[str, int]
+) -> List[Tuple[float, int]]:
+    """
+    WAND dynamic pruning: document-at-a-time over the query terms' postings,
+    skipping any chunk whose summed per-term upper bounds cannot beat the
+    current k-th best score.
+
+    Scores are summed in the same term order as _query_exhaustive, so the
+    returned (score, chunk) pairs are identical, not just close.
+    """
+    avg_dl = snap.avg_dl()
+    deleted = snap.deleted
+    terms: List[Tuple[int, float]] = []  # (q_tf, idf) in query order
+    cursors: List[_Cursor] = []
+
+    for tid, q_tf in q_terms.items():
+        idf = snap.idf(tid)
+        if idf <= 0.0:
+            continue
+        cur = _Cursor(tid, snap.segments)
+        if cur.doc == _EXHAUSTED:
             continue
+        # BM25 grows with tf and shrinks with chunk length, so the segment
+        # maxima/minima bound every posting of the term.
+        cur.bound = q_tf * max(
+            _term_score(idf, seg.term_max_tf[i], seg.term_min_dl[i], avg_dl)
+            for seg, i in cur.segs
+        )
+        cur.slot = len(terms)
+        terms.append((q_tf, idf))
+        cursors.append(cur)
 
-        denom = freq + _K1 * (1.0 - _B + _B * (doc_len / (_AVG_DL or 1.0)))
-        score += idf * (freq * (_K1 + 1.0) / denom)
+    heap: List[Tuple[float, int]] = []  # min-heap of (score, -chunk_index)
+    contrib: List[float | None] = [None] * len(terms)
 
-    return score
+    while True:
+        cursors.sort(key=lambda c: c.doc)
+        threshold = heap[0][0] if len(heap) >= top_k else 0.0
 
+        # Pivot: first cursor where the running sum of bounds could beat the
+        # threshold (a hair of slack guards against float summation order).
+        acc = 0.0
+        pivot = -1
+        for i, cur in enumerate(cursors):
+            if cur.doc == _EXHAUSTED:
+                break
+            acc += cur.bound
+            if acc > threshold * (1.0 - 1e-12):
+                pivot = i
+                break
+        if pivot < 0:
+            break
 
-def query_bm25(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
+        pivot_doc = cursors[pivot].doc
+        if cursors[0].doc != pivot_doc:
+            # Chunks before the pivot can't make it: skip ahead.
+            for cur in cursors[:pivot]:
+                cur.seek(pivot_doc)
+            continue
+
+        # Every cursor up to the pivot sits on pivot_doc: fully score it.
+        if pivot_doc not in deleted:
+            for cur in cursors:
+                if cur.doc != pivot_doc:
+                    break
+                q_tf, idf = terms[cur.slot]
+                tf, dl = cur.tf_and_len()
+                contrib[cur.slot] = q_tf * _term_score(idf, tf, dl, avg_dl)
+
+            score = 0.0
+            for i, c in enumerate(contrib):
+                if c is not None:
+                    score += c
+                    contrib[i] = None
+            stats["docs_scored"] += 1
+
+            entry = (score, -pivot_doc)
+            if score > 0.0:
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        for cur in cursors:
+            if cur.doc != pivot_doc:
+                break
+            cur.advance()
+
+    stats["postings_visited"] += sum(c.visited for c in cursors)
+    return [(s, -neg) for s, neg in sorted(heap, reverse=True)]
+
+
+def query_bm25(
+    query: str,
+    top_k: int = 6,
+    *,
+    prune: bool = True,
+    stats: Dict[str, int] | None = None,
+) -> List[Dict[str, Any]]:
     """
     Keyword/BM25 search over the indexed chunks.
 
+    prune=True uses WAND dynamic pruning; prune=False scores every chunk that
+    contains a query term. Both return exactly the same results. Pass a dict
+    as `stats` to receive "postings_visited" and "docs_scored" counters.
+
     Returns a list of dicts:
         {
             "text": <chunk_text>,
@@ -138,32 +1237,57 @@ def query_bm25(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
             }
         }
     """
-    if not _DOCS:
+    if stats is None:
+        stats = {}
+    stats.setdefault("postings_visited", 0)
+    stats.setdefault("docs_scored", 0)
+
+    snap = _SNAP  # one consistent version for the whole query
+    if not snap.n_docs or top_k <= 0:
         return []
 
-    q_tokens = _tokenize(query)
-    if not q_tokens:
+    q_terms = _query_terms(query)
+    if not q_terms:
         return []
 
-    scored: List[Tuple[int, float]] = []
+    search = _query_wand if prune else _query_exhaustive
+    return _to_results(snap, search(snap, q_terms, top_k, stats))
+
+
+def version() -> int:
+    """Counter that changes whenever the indexed content changes."""
+    return _SNAP.version
+
 
-    for idx, tokens in enumerate(_TOKENS):
-        s = _bm25_score(q_tokens, tokens)
-        if s > 0.0:
-            scored.append((idx, s))
+def size() -> int:
+    """Number of live (added and not removed) chunks."""
+    return _SNAP.n_docs
 
-    # sort by score descending
-    scored.sort(key=lambda x: x[1], reverse=True)
-    scored = scored[:top_k]
 
+def documents() -> Set[str]:
+    """Ids of the documents with at least one live chunk."""
+    snap = _SNAP
+    live: Set[str] = set()
+    for seg in snap.segments:
+        ends = list(seg.doc_starts[1:]) + [seg.n]
+        for name, start, end in zip(seg.doc_names, seg.doc_starts, ends):
+            if name not in live and any(
+                seg.base + local not in snap.deleted for local in range(start, end)
+            ):
+                live.add(name)
+    return live
+
+
+def _to_results(snap: _Snapshot, best: Iterable[Tuple[float, int]]) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
-    for idx, s in scored:
+    for s, idx in best:
+        seg, local = snap.locate(idx)
         results.append(
             {
-                "text": _DOCS[idx],
+                "text": seg.text(local),
                 "score": s,
                 "meta": {
-                    "doc_id": _DOC_IDS[idx],
+                    "doc_id": seg.doc_id(local),
                     "chunk_index": idx,
                 },
             }
@@ -172,6 +1296,136 @@ def query_bm25(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
     return results
 
 
+# ---------------------------------------------------------------------
+# Batch queries (NumPy / SciPy)
+# ---------------------------------------------------------------------
+
+def _term_doc_matrix(snap: _Snapshot) -> Tuple[int, Any]:
+    """
+    BM25-weighted term x chunk matrix (CSR), so that a sparse query-term
+    matrix times it gives every query's scores at once.
+
+    Rows are term ids, so the row count is the lexicon size at build time.
+    Built from the segment postings without re-tokenizing, and cached until
+    the index changes.
+    """
+    global _MATRIX
+
+    import numpy as np
+    from scipy import sparse
+
+    cached = _MATRIX
+    if cached is not None and cached[0] == snap.version:
+        return cached[1], cached[2]
+
+    n_terms = len(_TERMS)
+    df = np.zeros(n_terms, dtype=np.int64)
+    parts = []
+    for seg in snap.segments:
+        if not len(seg.term_ids):
+            continue
+        # term_ids order is the postings layout order (see _set_postings)
+        seg_cols = np.frombuffer(seg.term_ids, dtype=np.uint32).astype(np.int64)
+        counts = np.diff(np.frombuffer(seg.term_offsets, dtype=np.uint64)).astype(np.int64)
+        df[seg_cols] += counts
+
+        local = np.frombuffer(seg.post_docs, dtype=np.uint32).astype(np.int64)
+        tfs = np.frombuffer(seg.post_tfs, dtype=np.uint32).astype(np.float64)
+        lens = np.frombuffer(seg.doc_lens, dtype=np.uint32)[local]
+        parts.append((np.repeat(seg_cols, counts), local + seg.base, tfs, lens))
+
+    for tid, dead in snap.dead_df.items():
+        if tid < n_terms:
+            df[tid] -= dead
+
+    if parts:
+        rows = np.concatenate([p[0] for p in parts])
+        docs = np.concatenate([p[1] for p in parts])
+        tfs = np.concatenate([p[2] for p in parts])
+        lens = np.concatenate([p[3] for p in parts])
+    else:
+        rows = docs = np.zeros(0, dtype=np.int64)
+        tfs = lens = np.zeros(0, dtype=np.float64)
+
+    if snap.deleted:
+        keep = ~np.isin(docs, np.fromiter(snap.deleted, dtype=np.int64))
+        rows, docs, tfs, lens = rows[keep], docs[keep], tfs[keep], lens[keep]
+
+    idf = np.where(
+        df > 0, np.log1p((snap.n_docs - df + 0.5) / (df + 0.5)), 0.0
+    )
+    norm = _K1 * (1.0 - _B + _B * (lens / (snap.avg_dl() or 1.0)))
+    weights = idf[rows] * (tfs * (_K1 + 1.0) / (tfs + norm))
+
+    matrix = sparse.csr_matrix(
+        (weights, (rows, docs)), shape=(n_terms, snap.next_base)
+    )
+    _MATRIX = (snap.version, n_terms, matrix)
+    return n_terms, matrix
+
+
+def query_batch(queries: List[str], top_k: int = 6) -> List[List[Dict[str, Any]]]:
+    """
+    Score many queries at once: (queries x terms) @ (terms x chunks).
+
+    Returns one query_bm25-style result list per query, in input order.
+    Rankings match query_bm25; scores can differ in the last float bits
+    because the sparse product sums terms in a different order.
+    """
+    # Imported here, not at module import: single queries are pure Python,
+    # and SciPy alone adds tens of milliseconds to startup
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError(
+            "query_batch needs NumPy and SciPy. Install with: pip install numpy scipy"
+        ) from e
+
+    if not queries:
+        return []
+    snap = _SNAP
+    if not snap.n_docs or top_k <= 0:
+        return [[] for _ in queries]
+
+    n_terms, matrix = _term_doc_matrix(snap)
+
+    q_rows: List[int] = []
+    q_cols: List[int] = []
+    q_data: List[float] = []
+    for i, q in enumerate(queries):
+        for tid, q_tf in _query_terms(q).items():
+            # Terms interned after the matrix was built have no postings in it
+            if tid < n_terms:
+                q_rows.append(i)
+                q_cols.append(tid)
+                q_data.append(float(q_tf))
+
+    q_matrix = sparse.csr_matrix(
+        (q_data, (q_rows, q_cols)), shape=(len(queries), n_terms)
+    )
+    scores = (q_matrix @ matrix).tocsr()
+
+    out: List[List[Dict[str, Any]]] = []
+    for i in range(len(queries)):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        vals = scores.data[start:end]
+        idxs = scores.indices[start:end]
+        pos = vals > 0.0
+        vals, idxs = vals[pos], idxs[pos]
+
+        if len(vals) > top_k:
+            # Keep everything tied with the k-th score, then order exactly
+            kth = np.partition(vals, len(vals) - top_k)[len(vals) - top_k]
+            pos = vals >= kth
+            vals, idxs = vals[pos], idxs[pos]
+        order = np.lexsort((idxs, -vals))[:top_k]
+
+        out.append(_to_results(snap, ((float(vals[j]), int(idxs[j])) for j in order)))
+
+    return out
+
+
 def query(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
     """
     Generic query function. If the rest of the app imports:
@@ -1,45 +1,164 @@
+# app/services/chunker.py
+"""
+Token-budgeted chunking, measured in the embedding model's own tokens.
+
+Provides:
+    - iter_chunks(pages, max_tokens=None, overlap_tokens=None) -> iterator of chunk dicts
+    - chunk_pages(pages, max_tokens=None, overlap_tokens=None) -> list[str]
+    - chunk_text(text, max_tokens=None, overlap_tokens=None) -> list[str]
+    - chunk_budget() -> int
+
+Pages are tokenized once each, CHUNK_TOKENIZE_PAGES at a time, by the
+embedding model's fast tokenizer (embeddings.token_offsets), and the
+resulting tokens are cut into chunks of CHUNK_TOKENS tokens that may span
+pages. By default a chunk fills one model input (EMBED_MAX_LENGTH minus the
+special tokens), so nothing is truncated at embedding time and no input is
+left half empty. A cut backs off to the start of a word when one is within
+a few tokens, so words are never split between chunks; consecutive chunks
+share CHUNK_OVERLAP_TOKENS tokens.
+
+Each chunk carries where it came from, as character offsets into the page
+texts it was cut from:
+
+    {"text": ..., "tokens": 510,
+     "page": 3, "char_start": 1208,    # first character, in page 3
+     "page_end": 4, "char_end": 377}   # one past the last, in page 4
+
+A chunk spanning pages joins its page slices with a blank line.
+"""
+
 from __future__ import annotations
-from typing import List
 
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
-def chunk_text(
-    text: str,
-    max_chars: int = 800,
-    overlap: int = 100,
-) -> List[str]:
-    if not text or not text.strip():
-        return []
+from app.services.embeddings import max_input_tokens, token_offsets
+from app.utils.streams import batched
+
+# Tokens per chunk (0 = fill the embedding model's input) and tokens shared
+# by consecutive chunks
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Pages per batched tokenizer call
+CHUNK_TOKENIZE_PAGES = int(os.getenv("CHUNK_TOKENIZE_PAGES", "16"))
+
+# How far (in tokens) a cut may back off to reach the start of a word
+_WORD_BACKOFF = 16
 
-    text = text.strip()
-    chunks: List[str] = []
+_Token = Tuple[int, int, int, bool]  # page, char start, char end, starts a word
 
-    start = 0
-    length = len(text)
 
-    while start < length:
-        end = min(start + max_chars, length)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+def chunk_budget() -> int:
+    """Tokens per chunk: CHUNK_TOKENS, capped to what fits in one model input."""
+    limit = max_input_tokens()
+    return min(CHUNK_TOKENS, limit) if CHUNK_TOKENS > 0 else limit
 
-        if end >= length:
-            break
 
-        start = max(0, end - overlap)
+def _page_tokens(page: int, offsets: List[Tuple[int, int]]) -> Iterator[_Token]:
+    prev_end = -1
+    for start, end in offsets:
+        if end > start:  # skip zero-width tokens
+            yield page, start, end, start > prev_end
+            prev_end = end
 
-    return chunks
+
+def _cut(window: Deque[_Token], budget: int) -> int:
+    """How many tokens of `window` the next chunk takes (at most `budget`)."""
+    if len(window) <= budget:
+        return len(window)
+    for n in range(budget, max(0, budget - _WORD_BACKOFF), -1):
+        if window[n][3]:  # token n starts a word: cut before it
+            return n
+    return budget
+
+
+def _chunk(window: Deque[_Token], n: int, texts: Dict[int, str]) -> Dict[str, Any]:
+    first, last = window[0], window[n - 1]
+    if first[0] == last[0]:
+        text = texts[first[0]][first[1]:last[2]]
+    else:
+        parts = [texts[first[0]][first[1]:]]
+        parts += [texts[p] for p in range(first[0] + 1, last[0]) if p in texts]
+        parts.append(texts[last[0]][:last[2]])
+        text = "\n\n".join(parts)
+    return {
+        "text": text,
+        "tokens": n,
+        "page": first[0],
+        "char_start": first[1],
+        "page_end": last[0],
+        "char_end": last[2],
+    }
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk dicts (see the module docstring) of (page_number, text) pages,
+    in order, cut as the pages arrive. Only the pages the current window
+    of tokens still points into are kept.
+    """
+    budget = max_tokens or chunk_budget()
+    overlap = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap = max(0, min(overlap, budget // 2))
+
+    window: Deque[_Token] = deque()
+    texts: Dict[int, str] = {}
+    covered = 0  # tokens at the front of the window already in a chunk
+
+    def emit(final: bool) -> Iterator[Dict[str, Any]]:
+        nonlocal covered
+        while len(window) > covered and (final or len(window) > budget):
+            n = _cut(window, budget)
+            yield _chunk(window, n, texts)
+            if n == len(window):
+                window.clear()
+                covered = 0
+            else:
+                # The next chunk starts `overlap` tokens back, at a word
+                keep = min(overlap, n - 1)
+                while keep and not window[n - keep][3]:
+                    keep -= 1
+                for _ in range(n - keep):
+                    window.popleft()
+                covered = keep
+            for page in [p for p in texts if not window or p < window[0][0]]:
+                del texts[page]
+
+    for group in batched((p for p in pages if p[1].strip()), max(1, CHUNK_TOKENIZE_PAGES)):
+        for (page, text), offsets in zip(group, token_offsets([t for _, t in group])):
+            tokens = list(_page_tokens(page, offsets))
+            if not tokens:
+                continue
+            texts[page] = text
+            window.extend(tokens)
+            yield from emit(final=False)
+    yield from emit(final=True)
 
 
 def chunk_pages(
     pages: List[str],
-    max_chars: int = 800,
-    overlap: int = 100,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
 ) -> List[str]:
-    all_chunks: List[str] = []
+    """Chunk texts of a list of page texts (pages numbered from 1)."""
+    return [
+        c["text"]
+        for c in iter_chunks(enumerate(pages, start=1), max_tokens, overlap_tokens)
+    ]
 
-    for page in pages:
-        if page and page.strip():
-            page_chunks = chunk_text(page, max_chars=max_chars, overlap=overlap)
-            all_chunks.extend(page_chunks)
 
-    return all_chunks
+def chunk_text(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> List[str]:
+    """Chunk texts of one text."""
+    if not text or not text.strip():
+        return []
+    return chunk_pages([text], max_tokens, overlap_tokens)
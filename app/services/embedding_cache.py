@@ -0,0 +1,192 @@
+# app/services/embedding_cache.py
+"""
+Persistent, content-addressed cache of embedding vectors.
+
+Keys come from app.utils.hashing.embedding_key(model, text), so the same
+text embedded by the same model is computed once, across uploads,
+re-indexing runs and restarts. Vectors are stored as float32 blobs in a
+small SQLite file under EMBED_CACHE_DIR and come back as float32 arrays.
+
+The cache is bounded by EMBED_CACHE_MB: once it grows past the limit, the
+least recently used entries are evicted. Hits only note their access time
+in memory; the times are written in batches (with the next write, or every
+_TOUCH_BATCH hits or _TOUCH_SECONDS), so a lookup that hits never costs a
+SQLite write transaction. Hit/miss counters are kept per process.
+
+Exports:
+    - get_cache() -> EmbeddingCache | None   (None when disabled)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+log = logging.getLogger("app.services.embedding_cache")
+
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", "embedding_cache"))
+# 0 disables the cache
+EMBED_CACHE_MB = float(os.getenv("EMBED_CACHE_MB", "512"))
+
+# SQLite limits the number of bound parameters per statement
+_CHUNK = 500
+
+# Access times of hits are written once this many are pending, or once the
+# oldest pending one is this old
+_TOUCH_BATCH = 1024
+_TOUCH_SECONDS = 60.0
+
+
+class EmbeddingCache:
+    """
+    key -> float32 vector, with LRU eviction by total size.
+
+    Safe to share between threads; SQLite's WAL mode also lets several
+    worker processes use the same file (each then tracks the size limit
+    from its own view, so it is enforced approximately).
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> access time not yet written
+        self._touched_since = 0.0
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS emb ("
+            " key TEXT PRIMARY KEY, vec BLOB NOT NULL, atime REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS emb_atime ON emb (atime)")
+        self._db.commit()
+        self._bytes = self._db.execute(
+            "SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM emb"
+        ).fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors (read-only float32 arrays) for the `keys` that are present."""
+        found: Dict[str, np.ndarray] = {}
+        wanted = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(wanted), _CHUNK):
+                part = wanted[i:i + _CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM emb WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                # Refresh recency for LRU eviction, in batches
+                now = time.time()
+                if not self._touched:
+                    self._touched_since = now
+                self._touched.update(dict.fromkeys(found, now))
+                if (
+                    len(self._touched) >= _TOUCH_BATCH
+                    or now - self._touched_since >= _TOUCH_SECONDS
+                ):
+                    self._write_touched()
+                    self._db.commit()
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Sequence[float]]]) -> None:
+        """Store (key, vector) pairs, then evict down to the size limit."""
+        now = time.time()
+        rows = [
+            (key, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            # Pending access times go out with this write (and before
+            # eviction picks the oldest entries)
+            self._write_touched()
+            for key, blob, _ in rows:
+                old = self._db.execute(
+                    "SELECT LENGTH(vec) FROM emb WHERE key = ?", (key,)
+                ).fetchone()
+                self._bytes += len(blob) - (old[0] if old else 0)
+            self._db.executemany(
+                "INSERT OR REPLACE INTO emb (key, vec, atime) VALUES (?, ?, ?)", rows
+            )
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _write_touched(self) -> None:
+        """Write pending access times (uncommitted). Caller holds _lock."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE emb SET atime = ? WHERE key = ?",
+                [(t, key) for key, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until 90% of max_bytes. Caller holds _lock."""
+        target = int(self.max_bytes * 0.9)
+        cur = self._db.execute("SELECT key, LENGTH(vec) FROM emb ORDER BY atime")
+        doomed: List[str] = []
+        for key, size in cur:
+            if self._bytes <= target:
+                break
+            doomed.append(key)
+            self._bytes -= size
+        self._db.executemany("DELETE FROM emb WHERE key = ?", [(k,) for k in doomed])
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "path": str(self.path),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touched()
+            self._db.commit()
+            self._db.close()
+
+
+_CACHE: EmbeddingCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache | None:
+    """The process-wide cache, opened on first use; None if EMBED_CACHE_MB is 0."""
+    global _CACHE
+
+    if EMBED_CACHE_MB <= 0:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = EmbeddingCache(
+                    EMBED_CACHE_DIR / "embeddings.sqlite3",
+                    int(EMBED_CACHE_MB * 1024 * 1024),
+                )
+                log.info("Embedding cache at %s", _CACHE.path)
+    return _CACHE
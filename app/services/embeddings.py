@@ -3,77 +3,504 @@
 Local embedding utilities.
 
 This module exposes:
+    - embed_texts_array(texts: List[str], normalize=False, bulk=False) -> np.ndarray
+    - embed_text_array(text: str, normalize=False) -> np.ndarray
     - embed_texts(texts: List[str]) -> List[List[float]]
     - embed_text(text: str) -> List[float]
+    - model_name() -> str
+    - token_offsets(texts: List[str]) -> List[List[Tuple[int, int]]]
+    - max_input_tokens() -> int
+    - lowercases() -> bool
+    - warmup() -> None
+    - shutdown_workers() -> None
 
-Used by pipeline / evaluation code instead of remote OpenAI embeddings.
+The *_array functions are the primary API: they return contiguous float32
+arrays ((n, dim) and (dim,)), optionally L2-normalized, straight from the
+model output with no per-float Python objects in between. The list
+functions are thin wrappers for callers that need plain lists.
+
+Used by the vectorstore (for both indexing and queries) and by evaluation
+code instead of remote OpenAI embeddings, so one model instance serves every
+embedding in the process.
+
+Vectors are cached on disk by hash(model, backend, truncation length, text)
+(see embedding_cache and _cache_namespace), so only texts this model has
+never embedded reach the transformer.
+
+embed_texts() sorts its inputs by token length and encodes them in batches
+bounded by a token budget, so short chunks are not padded to the longest
+one and huge inputs never become one giant batch.
+
+embed_text() is the query-time path: concurrent callers are micro-batched
+into a single forward pass by one scheduler thread (see _MicroBatcher).
+
+Bulk ingest (embed_texts_array(..., bulk=True), used by the vectorstore)
+can fan out to EMBED_WORKERS worker processes, each holding its own copy
+of the model with a few intra-op threads, instead of one process trying to
+spread small batches over every core. Queries never use the pool.
+
+EMBED_BACKEND picks what runs the forward pass:
+    - "torch"     : the PyTorch model in fp32 (on GPU when available)
+    - "onnx-int8" : the same model exported to ONNX once (cached under
+                    EMBED_ONNX_DIR), weights dynamically quantized to int8,
+                    run by ONNX Runtime on CPU
+Both use the same tokenizer and mean pooling. int8 vectors are close to,
+but not bit-identical with, fp32 ones, so the disk cache keys them
+separately (benchmarks/bench_embed_onnx.py measures the agreement).
 """
 
 from __future__ import annotations
 
-from typing import List
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Tuple
 
-import torch
-from transformers import AutoTokenizer, AutoModel
+import numpy as np
 
 from app.core.config import settings
+from app.services.embedding_cache import get_cache
+from app.utils.hashing import embedding_key
 
 
 # Use the model name from .env or default to MiniLM
 _EMBEDDING_MODEL_NAME = getattr(settings, "embeddings_model", None) or "all-MiniLM-L6-v2"
+# Short names like "all-MiniLM-L6-v2" (as Chroma and sentence-transformers
+# spell them) live under the sentence-transformers org on the hub
+if "/" not in _EMBEDDING_MODEL_NAME and not os.path.isdir(_EMBEDDING_MODEL_NAME):
+    _EMBEDDING_MODEL_NAME = f"sentence-transformers/{_EMBEDDING_MODEL_NAME}"
+
+# Query micro-batching: how long to hold a batch open for more requests
+# once several are in flight, and the largest batch per forward pass
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "2"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+
+# Longest input, in tokens with the model's special tokens; longer texts
+# are truncated (the chunker sizes chunks to fit, see max_input_tokens)
+EMBED_MAX_LENGTH = int(os.getenv("EMBED_MAX_LENGTH", "512"))
+
+# embed_texts: max padded tokens (rows x longest row) per forward pass
+EMBED_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "8192"))
+
+# "torch" or "onnx-int8" (see the module docstring)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+EMBED_ONNX_DIR = Path(os.getenv("EMBED_ONNX_DIR", "onnx_models"))
+_BACKENDS = ("torch", "onnx-int8")
+
+# Bulk ingest worker processes (0 = embed in-process), intra-op threads per
+# worker, and texts per task handed to a worker
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+EMBED_WORKER_THREADS = int(os.getenv("EMBED_WORKER_THREADS", "1"))
+EMBED_WORKER_CHUNK = int(os.getenv("EMBED_WORKER_CHUNK", "128"))
 
 _tokenizer = None
 _model = None
-_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+_device = None  # torch.device, set when the torch backend loads
+_load_lock = threading.Lock()
+# Rust-backed HF tokenizers fail ("Already borrowed") when one instance is
+# used from several threads at once, e.g. ingest jobs and the micro-batcher
+_tokenize_lock = threading.Lock()
+# > 0 pins ONNX Runtime's intra-op threads (set in worker processes)
+_intra_op_threads = 0
 
 
 def _load_model():
     """
-    Lazy-load the HuggingFace model & tokenizer once.
+    Lazy-load the tokenizer and the EMBED_BACKEND model once.
+
+    For "onnx-int8", _model is an onnxruntime.InferenceSession instead of a
+    torch module. torch and transformers are imported here, not at module
+    import: together they take seconds, which every process importing the
+    app (workers, CLIs, tests) would otherwise pay up front.
     """
-    global _tokenizer, _model
+    global _tokenizer, _model, _device
 
     if _tokenizer is not None and _model is not None:
         return
 
-    _tokenizer = AutoTokenizer.from_pretrained(_EMBEDDING_MODEL_NAME)
-    _model = AutoModel.from_pretrained(_EMBEDDING_MODEL_NAME)
-    _model.to(_device)
-    _model.eval()
+    with _load_lock:
+        if _tokenizer is not None and _model is not None:
+            return
+        if EMBED_BACKEND not in _BACKENDS:
+            raise ValueError(
+                f"Unknown EMBED_BACKEND {EMBED_BACKEND!r}; expected one of {_BACKENDS}"
+            )
+        tokenizer = _tokenizer if _tokenizer is not None else _load_tokenizer()
+        if EMBED_BACKEND == "onnx-int8":
+            model = _load_onnx_int8(tokenizer)
+        else:
+            import torch
+            from transformers import AutoModel
+
+            _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            model = AutoModel.from_pretrained(_EMBEDDING_MODEL_NAME)
+            model.to(_device)
+            model.eval()
+        _tokenizer, _model = tokenizer, model
+
 
+def _onnx_int8_path() -> Path:
+    """Where the quantized export of the configured model lives."""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", _EMBEDDING_MODEL_NAME).strip("_")
+    return EMBED_ONNX_DIR / slug / "model.int8.onnx"
 
-@torch.no_grad()
-def _encode_batch(texts: List[str]) -> List[List[float]]:
+
+def _export_onnx_int8(tokenizer, path: Path) -> None:
     """
-    Encode a batch of texts into sentence embeddings using mean pooling.
+    Export the model to ONNX (dynamic batch and sequence axes, output
+    last_hidden_state) and quantize its weights to int8 into `path`.
     """
-    _load_model()
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fp32_path = path.with_name("model.fp32.onnx")
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    model = AutoModel.from_pretrained(_EMBEDDING_MODEL_NAME)
+    model.eval()
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    # Positional order of BERT-style forward(): ids, mask, token types
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    axes = {k: {0: "batch", 1: "seq"} for k in names + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[k] for k in names),
+            str(fp32_path),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=17,
+            dynamo=False,
+        )
+
+    quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+    os.replace(tmp_path, path)  # atomic: other processes never see half a file
+    fp32_path.unlink(missing_ok=True)
+
+
+def _load_onnx_int8(tokenizer):
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise RuntimeError(
+            "EMBED_BACKEND=onnx-int8 needs ONNX Runtime. "
+            "Install with: pip install onnxruntime onnx"
+        ) from None
+    path = _onnx_int8_path()
+    if not path.exists():
+        _export_onnx_int8(tokenizer, path)
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if _intra_op_threads > 0:
+        opts.intra_op_num_threads = _intra_op_threads
+    return ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(_EMBEDDING_MODEL_NAME)
+
+
+def _get_tokenizer():
+    """The tokenizer alone (chunking needs it, not the model)."""
+    global _tokenizer
+
+    if _tokenizer is None:
+        with _load_lock:
+            if _tokenizer is None:
+                _tokenizer = _load_tokenizer()
+    return _tokenizer
+
+
+def token_offsets(texts: List[str]) -> List[List[Tuple[int, int]]]:
+    """
+    (start, end) character offsets of every token of each text, without
+    special tokens or truncation, in one batched call of the model's fast
+    tokenizer.
+    """
+    tokenizer = _get_tokenizer()
+    if not tokenizer.is_fast:
+        raise RuntimeError(
+            f"Token offsets need a fast (Rust) tokenizer; {_EMBEDDING_MODEL_NAME} has none. "
+            "Install with: pip install tokenizers"
+        )
+    with _tokenize_lock:
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False,  # pages are longer than the model input, on purpose
+        )
+    return [[tuple(o) for o in offsets] for offsets in encoded["offset_mapping"]]
+
+
+def max_input_tokens() -> int:
+    """Tokens of text that fit in one model input next to the special tokens."""
+    return EMBED_MAX_LENGTH - _get_tokenizer().num_special_tokens_to_add(pair=False)
+
 
+_lowercases: bool | None = None
+
+
+def lowercases() -> bool:
+    """
+    Whether the model's tokenizer lowercases its input, i.e. the embeddings
+    ignore case. Taken from do_lower_case; tokenizers that don't declare it
+    are asked whether "A" and "a" come out the same.
+    """
+    global _lowercases
+
+    if _lowercases is None:
+        tokenizer = _get_tokenizer()
+        declared = getattr(tokenizer, "do_lower_case", None)
+        if declared is None:
+            with _tokenize_lock:
+                declared = tokenizer.tokenize("A") == tokenizer.tokenize("a")
+        _lowercases = bool(declared)
+    return _lowercases
+
+
+def _tokenize(texts: List[str], **kwargs):
+    with _tokenize_lock:
+        return _tokenizer(_clean(texts), **kwargs)
+
+
+def _clean(texts: List[str]) -> List[str]:
     # Replace empty or None texts to avoid crashes
-    clean_texts = [t if (t is not None and t.strip()) else "" for t in texts]
+    return [t if (t is not None and t.strip()) else "" for t in texts]
+
+
+def _forward(encoded) -> np.ndarray:
+    """
+    Run one padded, tokenized batch through the model with mean pooling.
+    Returns a float32 (batch, dim) array.
+    """
+    if EMBED_BACKEND == "onnx-int8":
+        return _forward_onnx(encoded)
+    return _forward_torch(encoded)
+
+
+def _forward_torch(encoded) -> np.ndarray:
+    import torch
+
+    encoded = {k: torch.as_tensor(v).to(_device) for k, v in encoded.items()}
+
+    with torch.no_grad():
+        outputs = _model(**encoded)
+        last_hidden_state = outputs.last_hidden_state  # (batch, seq_len, hidden_dim)
+        attention_mask = encoded["attention_mask"]     # (batch, seq_len)
+
+        # Mean pooling with mask
+        mask_expanded = attention_mask.unsqueeze(-1).expand(last_hidden_state.size()).float()
+        sum_embeddings = (last_hidden_state * mask_expanded).sum(1)
+        sum_mask = mask_expanded.sum(1).clamp(min=1e-9)
+        embeddings = sum_embeddings / sum_mask
 
-    encoded = _tokenizer(
-        clean_texts,
+    return embeddings.to(torch.float32).cpu().numpy()
+
+
+def _forward_onnx(encoded) -> np.ndarray:
+    feeds = {
+        i.name: np.asarray(encoded[i.name], dtype=np.int64) for i in _model.get_inputs()
+    }
+    last_hidden_state = _model.run(["last_hidden_state"], feeds)[0]
+    mask = feeds["attention_mask"][..., None].astype(np.float32)
+    embeddings = (last_hidden_state * mask).sum(1) / np.clip(mask.sum(1), 1e-9, None)
+    return embeddings.astype(np.float32, copy=False)
+
+
+def _encode_batch(texts: List[str]) -> np.ndarray:
+    """
+    Encode a batch of texts into sentence embeddings using mean pooling.
+
+    Everything goes through the model as one batch padded to its longest
+    text; use _encode_bucketed for large or mixed-length inputs.
+    """
+    _load_model()
+
+    encoded = _tokenize(
+        texts,
         padding=True,
         truncation=True,
-        max_length=512,
-        return_tensors="pt",
+        max_length=EMBED_MAX_LENGTH,
+        return_tensors="np",
     )
+    return _forward(encoded)
+
+
+def _token_batches(lengths: List[int], budget: int) -> List[List[int]]:
+    """
+    Group text indexes into batches of similar token length.
+
+    Indexes are sorted longest first and a batch is closed before its padded
+    size (rows x longest row) would exceed `budget` tokens, so short texts
+    are never padded to a long one and no batch outgrows the budget (a
+    single text longer than the budget still gets its own batch).
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    width = 0
+    for i in order:
+        if current and (len(current) + 1) * width > budget:
+            batches.append(current)
+            current = []
+        if not current:
+            width = lengths[i]  # longest first: the first row sets the width
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _encode_bucketed(texts: List[str]) -> np.ndarray:
+    """
+    Like _encode_batch, but in length-sorted batches of at most
+    EMBED_TOKEN_BUDGET padded tokens. Results are in input order.
+    """
+    _load_model()
+
+    # Tokenize once, unpadded, to get lengths; each batch is padded later
+    encoded = _tokenize(texts, truncation=True, max_length=EMBED_MAX_LENGTH)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+
+    out = None
+    for batch in _token_batches(lengths, EMBED_TOKEN_BUDGET):
+        width = lengths[batch[0]]  # longest first
+        padded = {}
+        for key in encoded.keys():
+            fill = _tokenizer.pad_token_id if key == "input_ids" else 0
+            padded[key] = np.array(
+                [encoded[key][i] + [fill] * (width - lengths[i]) for i in batch],
+                dtype=np.int64,
+            )
+        vecs = _forward(padded)
+        if out is None:
+            out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        out[batch] = vecs
+    return out
+
+
+def _init_worker(backend: str, threads: int) -> None:
+    """Worker process initializer: pin threads, then load the model once."""
+    global EMBED_BACKEND, _intra_op_threads
+
+    EMBED_BACKEND = backend
+    _intra_op_threads = threads
+    if backend == "torch":
+        import torch
+
+        torch.set_num_threads(threads)
+    _load_model()
+
+
+def _worker_encode(texts: List[str]) -> np.ndarray:
+    return _encode_bucketed(texts)
+
+
+_worker_pool: ProcessPoolExecutor | None = None
+_worker_pool_lock = threading.Lock()
+
+
+def _get_worker_pool() -> ProcessPoolExecutor:
+    global _worker_pool
+
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                # The parent needs the model for queries anyway; loading it
+                # first also means an ONNX export happens once, not per worker
+                _load_model()
+                _worker_pool = ProcessPoolExecutor(
+                    max_workers=EMBED_WORKERS,
+                    # fork after torch has started threads is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(EMBED_BACKEND, EMBED_WORKER_THREADS),
+                )
+    return _worker_pool
+
+
+def _encode_pooled(texts: List[str]) -> np.ndarray:
+    """
+    _encode_bucketed across the worker processes, EMBED_WORKER_CHUNK texts
+    per task. Results are in input order.
+    """
+    pool = _get_worker_pool()
+    step = max(1, EMBED_WORKER_CHUNK)
+    parts = [texts[i:i + step] for i in range(0, len(texts), step)]
+    return np.concatenate(list(pool.map(_worker_encode, parts)))
+
+
+def _encode(texts: List[str], bulk: bool) -> np.ndarray:
+    # Batches smaller than one task are not worth a round trip to a worker
+    if bulk and EMBED_WORKERS > 0 and len(texts) > EMBED_WORKER_CHUNK:
+        return _encode_pooled(texts)
+    return _encode_bucketed(texts)
+
+
+def shutdown_workers() -> None:
+    """Stop the bulk ingest worker processes, if they were started."""
+    global _worker_pool
+
+    with _worker_pool_lock:
+        if _worker_pool is not None:
+            _worker_pool.shutdown(cancel_futures=True)
+            _worker_pool = None
+
+
+def _l2_normalize(m: np.ndarray) -> np.ndarray:
+    """Scale the rows of `m` to unit length, in place."""
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    np.divide(m, np.maximum(norms, 1e-12), out=m)
+    return m
+
+
+def embed_texts_array(
+    texts: List[str], normalize: bool = False, bulk: bool = False
+) -> np.ndarray:
+    """
+    Embed a list of texts into a contiguous float32 (len(texts), dim) array,
+    rows in input order. With `normalize`, every row has unit L2 norm.
+
+    `bulk` marks ingest-sized calls: cache misses then go to the worker
+    processes when EMBED_WORKERS is set. Leave it off on latency-sensitive
+    paths.
+    """
+    # If a single string is accidentally passed, wrap it
+    if isinstance(texts, str):
+        texts = [texts]
+
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
 
-    encoded = {k: v.to(_device) for k, v in encoded.items()}
+    cache = get_cache()
+    if cache is None:
+        out = _encode(texts, bulk)
+    else:
+        keys = [embedding_key(_cache_namespace(), t or "") for t in texts]
+        vectors = cache.get_many(keys)
 
-    outputs = _model(**encoded)
-    last_hidden_state = outputs.last_hidden_state  # (batch, seq_len, hidden_dim)
-    attention_mask = encoded["attention_mask"]     # (batch, seq_len)
+        # Only misses go to the model, each distinct text once
+        missing = {k: t for k, t in zip(keys, texts) if k not in vectors}
+        if missing:
+            fresh = _encode(list(missing.values()), bulk)
+            cache.put_many(zip(missing, fresh))
+            vectors.update(zip(missing, fresh))
 
-    # Mean pooling with mask
-    mask_expanded = attention_mask.unsqueeze(-1).expand(last_hidden_state.size()).float()
-    sum_embeddings = (last_hidden_state * mask_expanded).sum(1)
-    sum_mask = mask_expanded.sum(1).clamp(min=1e-9)
-    embeddings = sum_embeddings / sum_mask
+        out = np.stack([vectors[k] for k in keys])
 
-    # Convert to plain Python lists
-    return embeddings.cpu().tolist()
+    return _l2_normalize(out) if normalize else out
 
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
@@ -82,21 +509,144 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
 
     This is what pipeline.py expects to import:
         from app.services.embeddings import embed_texts
+
+    List-returning wrapper around embed_texts_array.
     """
-    if not texts:
-        return []
+    return embed_texts_array(texts).tolist()
 
-    # If a single string is accidentally passed, wrap it
-    if isinstance(texts, str):
-        texts = [texts]
 
-    return _encode_batch(texts)
+class _MicroBatcher:
+    """
+    Coalesces single-text embedding requests from concurrent threads.
+
+    One daemon thread takes everything queued, runs one `encode` call for
+    it and hands each caller its own vector. Requests that arrive while a
+    forward pass is running simply form the next batch. When more than one
+    request is waiting, the batch is held open up to `max_wait` seconds for
+    stragglers; a lone request is never delayed.
+    """
 
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch: int,
+        max_wait: float,
+    ) -> None:
+        self._encode = encode
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._queue: "queue.SimpleQueue[Tuple[str, Future]]" = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
 
-def embed_text(text: str) -> List[float]:
+    def submit(self, text: str) -> "Future[np.ndarray]":
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="embed-batcher", daemon=True
+                    )
+                    self._thread.start()
+        fut: "Future[np.ndarray]" = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if len(batch) > 1 and self.max_wait > 0:
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            batch = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                vectors = self._encode([t for t, _ in batch])
+            except BaseException as e:
+                for _, f in batch:
+                    f.set_exception(e)
+                continue
+            for (_, f), vec in zip(batch, vectors):
+                f.set_result(vec)
+
+
+_batcher = _MicroBatcher(
+    embed_texts_array,
+    max_batch=EMBED_MAX_BATCH,
+    max_wait=EMBED_BATCH_WAIT_MS / 1000.0,
+)
+
+
+def embed_text_array(text: str, normalize: bool = False) -> np.ndarray:
     """
-    Convenience function for a single text.
+    Embed a single text (e.g. a query) into a float32 (dim,) array.
+
+    Goes through the micro-batcher, so concurrent callers share forward
+    passes instead of each running a batch of one.
     """
     if text is None:
         text = ""
-    return embed_texts([text])[0]
+    vec = _batcher.submit(text).result()
+    # The row belongs to the batch's array; normalize a copy of it
+    return _l2_normalize(vec.copy()) if normalize else vec
+
+
+def embed_text(text: str) -> List[float]:
+    """
+    Convenience function for a single text (e.g. a query).
+
+    List-returning wrapper around embed_text_array.
+    """
+    return embed_text_array(text).tolist()
+
+
+def _cache_namespace() -> str:
+    # Everything that changes a text's vector: model, backend and truncation
+    # length. fp32 vectors truncated at 512 tokens (the setup before either
+    # option existed) keep the bare model name so existing caches stay valid.
+    namespace = _EMBEDDING_MODEL_NAME
+    if EMBED_BACKEND != "torch":
+        namespace += f"#{EMBED_BACKEND}"
+    if EMBED_MAX_LENGTH != 512:
+        namespace += f"#len{EMBED_MAX_LENGTH}"
+    return namespace
+
+
+def warmup() -> None:
+    """
+    Load the model and run a forward pass, start the query micro-batcher
+    and, with EMBED_WORKERS set, start the worker pool and send it one
+    warm-up task per worker (idle workers are still loading their model in
+    the background and just pick up ingest work a little later).
+    """
+    _load_model()
+    _encode_batch(["warm up"])
+    _batcher.submit("warm up").result()
+    if EMBED_WORKERS > 0:
+        list(_get_worker_pool().map(_worker_encode, [["warm up"]] * EMBED_WORKERS))
+
+
+def model_name() -> str:
+    """Hub id or local path of the embedding model in use."""
+    return _EMBEDDING_MODEL_NAME
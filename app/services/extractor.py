@@ -6,39 +6,244 @@ Simple text extractor for PDFs and text files.
 Provides:
     - extract_text_pages(file_path)  -> list[str]
     - extract_text_from_file(file_path) -> dict
+    - iter_pdf_pages(file_path, on_progress=None) -> iterator of (page_no, text)
+    - extract_pdf_pages(file_path, on_progress=None) -> list[(page_no, text)]
+    - iter_file_pages(file_path, on_progress=None) -> iterator of (page_no, text)
+    - extract_files(paths) -> iterator of (path, [(page_no, text)], error)
+    - shutdown_extract_pool() -> None
+
+PDF text extraction (PyPDF2 extract_text, pure Python and slow) is split
+into ranges of PDF_PAGES_PER_TASK pages that run on a pool of up to
+PDF_EXTRACT_WORKERS processes; each worker opens the PDF itself. Short
+documents, or PDF_EXTRACT_WORKERS=1, stay in-process. For many files at
+once (extract_files), whole files are spread over the same pool instead.
 """
 
 from __future__ import annotations
 
+import multiprocessing
 import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Extraction processes (1 = sequential, in-process) and pages per task
+PDF_EXTRACT_WORKERS = int(
+    os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+# .txt and .md files are read as a single page
+TEXT_SUFFIXES = {".txt", ".md"}
+SUPPORTED_SUFFIXES = {".pdf"} | TEXT_SUFFIXES
 
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None  # We'll show a clear error message later
+
+def _pypdf2():
+    """PyPDF2, imported on first use (it is slow to import)."""
+    try:
+        import PyPDF2
+    except ImportError:
+        # Clear error message instead of a bare ImportError
+        raise RuntimeError(
+            "PyPDF2 not installed. Install with: pip install PyPDF2"
+        ) from None
+    return PyPDF2
 
 
 # ---------------------------
 #   Helper extractors
 # ---------------------------
 
+def _page_texts(reader, start: int, stop: int) -> List[str]:
+    texts = []
+    for i in range(start, stop):
+        try:
+            texts.append(reader.pages[i].extract_text() or "")
+        except Exception:
+            texts.append("")  # one broken page should not fail the document
+    return texts
+
+
+def _extract_range(path: str, start: int, stop: int) -> Tuple[int, List[str]]:
+    """Worker task: raw text of pages [start, stop), from its own reader."""
+    reader = _pypdf2().PdfReader(path)
+    return start, _page_texts(reader, start, stop)
+
+
+def _file_texts(path: str) -> List[str]:
+    """Worker task: raw text of every page of a PDF, .txt or .md file."""
+    ext = Path(path).suffix.lower()
+    if ext == ".pdf":
+        reader = _pypdf2().PdfReader(path)
+        return _page_texts(reader, 0, len(reader.pages))
+    if ext in TEXT_SUFFIXES:
+        return [Path(path).read_text(encoding="utf-8", errors="ignore")]
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, PDF_EXTRACT_WORKERS),
+                    # fork after torch has started threads is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_extract_pool() -> None:
+    """Stop the extraction worker processes, if they were started."""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def iter_pdf_pages(
+    file_path: str | os.PathLike,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Raw text of every page of a PDF as (page_number, text), 1-based and in
+    page order; pages without text come back as "".
+
+    Pages are yielded as soon as they (and every page before them) are
+    extracted. Large PDFs are extracted in parallel page ranges (see the
+    module docstring), with at most 2 * PDF_EXTRACT_WORKERS ranges in
+    flight, so a slow consumer holds back extraction instead of letting
+    finished pages pile up. `on_progress(pages_done, pages_total)` is called
+    as pages (or whole ranges) finish.
+    """
+    path = str(file_path)
+    reader = _pypdf2().PdfReader(path)
+    total = len(reader.pages)
+    step = max(1, PDF_PAGES_PER_TASK)
+
+    if PDF_EXTRACT_WORKERS <= 1 or total <= step:
+        for i in range(total):
+            text = _page_texts(reader, i, i + 1)[0]
+            if on_progress is not None:
+                on_progress(i + 1, total)
+            yield i + 1, text
+        return
+
+    del reader  # workers open their own
+    starts = iter(range(0, total, step))
+    in_flight: Deque[Future] = deque()
+    done = 0
+    try:
+        while True:
+            while len(in_flight) < 2 * PDF_EXTRACT_WORKERS:
+                start = next(starts, None)
+                if start is None:
+                    break
+                in_flight.append(
+                    _get_pool().submit(_extract_range, path, start, min(start + step, total))
+                )
+            if not in_flight:
+                return
+            start, part = in_flight.popleft().result()
+            done += len(part)
+            if on_progress is not None:
+                on_progress(done, total)
+            for i, text in enumerate(part, start=start + 1):
+                yield i, text
+    finally:
+        for fut in in_flight:  # consumer stopped early
+            fut.cancel()
+
+
+def extract_pdf_pages(
+    file_path: str | os.PathLike,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Tuple[int, str]]:
+    """All pages of iter_pdf_pages(file_path, on_progress) as one list."""
+    return list(iter_pdf_pages(file_path, on_progress=on_progress))
+
+
+def iter_file_pages(
+    file_path: str | os.PathLike,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Like iter_pdf_pages, for any of SUPPORTED_SUFFIXES; a .txt or .md file
+    is a single page.
+    """
+    ext = Path(file_path).suffix.lower()
+    if ext == ".pdf":
+        yield from iter_pdf_pages(file_path, on_progress=on_progress)
+        return
+    text = _file_texts(str(file_path))[0]
+    if on_progress is not None:
+        on_progress(1, 1)
+    yield 1, text
+
+
+def extract_files(
+    paths: Iterable[str | os.PathLike],
+) -> Iterator[Tuple[str, List[Tuple[int, str]], Optional[str]]]:
+    """
+    Raw pages of many files, as (path, [(page_number, text), ...], error)
+    in input order.
+
+    Each file is one task on the extraction pool, with at most
+    2 * PDF_EXTRACT_WORKERS files in flight; `paths` is consumed only as
+    fast as results are taken. A file that cannot be read comes back with
+    no pages and `error` set, instead of stopping the others.
+    """
+    def numbered(texts: List[str]) -> List[Tuple[int, str]]:
+        return [(i + 1, text) for i, text in enumerate(texts)]
+
+    if PDF_EXTRACT_WORKERS <= 1:
+        for p in paths:
+            try:
+                pages, error = numbered(_file_texts(str(p))), None
+            except Exception as e:
+                pages, error = [], f"{type(e).__name__}: {e}"
+            yield str(p), pages, error
+        return
+
+    pending = iter(paths)
+    in_flight: Deque[Tuple[str, Future]] = deque()
+    try:
+        while True:
+            while len(in_flight) < 2 * PDF_EXTRACT_WORKERS:
+                p = next(pending, None)
+                if p is None:
+                    break
+                in_flight.append((str(p), _get_pool().submit(_file_texts, str(p))))
+            if not in_flight:
+                return
+            path, fut = in_flight.popleft()
+            try:
+                pages, error = numbered(fut.result()), None
+            except Exception as e:
+                pages, error = [], f"{type(e).__name__}: {e}"
+            yield path, pages, error
+    finally:
+        for _, fut in in_flight:  # consumer stopped early
+            fut.cancel()
+
+
 def _extract_from_pdf(path: Path) -> List[str]:
     """Extracts text page-by-page from a PDF."""
-    if PyPDF2 is None:
-        raise RuntimeError(
-            "PyPDF2 not installed. Install with: pip install PyPDF2"
-        )
-
     pages = []
-    with path.open("rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            text = page.extract_text() or ""
-            text = text.strip()
-            if text:
-                pages.append(text)
+    for _, text in extract_pdf_pages(path):
+        text = text.strip()
+        if text:
+            pages.append(text)
     return pages
 
 
@@ -7,14 +7,176 @@ Pipeline handles:
 
 Exports:
     - vs_query(query: str, top_k: int = 6, mode: str = "hybrid") -> list[dict]
+
+Each mode runs only the retrievers it needs. In hybrid mode the BM25 leg
+runs on a small thread pool while the semantic (embedding + Chroma) leg
+runs in the calling thread, so latency is close to the slower leg, not the
+sum. The semantic leg is never queued behind other requests, and as many
+query embeddings as there are concurrent requests can share a micro-batch.
+Every returned row carries per-leg timings in meta["timings_ms"].
+
+Results are cached (LRU + TTL) by normalized query, top_k, mode and the
+index versions of Chroma and BM25, so repeated questions skip embedding and
+search, and any upload or delete makes older entries unreachable.
+    - cache_stats() -> dict     (hits, misses, hit rate, entries, bytes)
+    - cache_clear() -> None
 """
 
 from __future__ import annotations
 
-from typing import List, Dict, Any
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.services.embeddings import lowercases
+from app.services.vectorstore import semantic_query, index_version as vs_version
+from app.services.bm25_index import query as bm25_query, version as bm25_version
+
+
+# Threads for the BM25 leg of hybrid queries. BM25 is pure Python and holds
+# the GIL, so more threads than a few would not run it any faster
+RETRIEVAL_THREADS = int(os.getenv("RETRIEVAL_THREADS", "4"))
+
+_POOL: ThreadPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ThreadPoolExecutor(
+                    max_workers=RETRIEVAL_THREADS, thread_name_prefix="retrieval"
+                )
+    return _POOL
+
+
+# Result cache limits; 0 entries disables caching
+CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(float(os.getenv("RETRIEVAL_CACHE_MB", "64")) * 1024 * 1024)
+CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+
+
+def _rows_size(rows: List[Dict[str, Any]]) -> int:
+    """Rough heap size of a result list (rows, texts and meta values)."""
+    size = sys.getsizeof(rows)
+    for r in rows:
+        size += sys.getsizeof(r) + sys.getsizeof(r.get("text", ""))
+        meta = r.get("meta") or {}
+        size += sys.getsizeof(meta) + sum(sys.getsizeof(v) for v in meta.values())
+    return size
+
+
+class _ResultCache:
+    """
+    Thread-safe LRU of query results with a TTL and entry/byte limits.
+
+    Keys include the index versions, so entries from before an upload are
+    never served again; they just age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (stored at, size in bytes, rows)
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Any, ...]) -> List[Dict[str, Any]] | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                self._pop(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
 
-from app.services.vectorstore import semantic_query
-from app.services.bm25_index import query as bm25_query
+    def put(self, key: Tuple[Any, ...], rows: List[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        size = _rows_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic(), size, rows)
+            self.bytes += size
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key: Tuple[Any, ...]) -> None:
+        self.bytes -= self._data.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+
+_CACHE = _ResultCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters and memory use of the retrieval result cache."""
+    return _CACHE.stats()
+
+
+def cache_clear() -> None:
+    _CACHE.clear()
+
+
+def _copy_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy rows and their meta dicts (texts are immutable and shared)."""
+    return [{**r, "meta": dict(r.get("meta") or {})} for r in rows]
+
+
+def _normalize(query: str, mode: str) -> str:
+    # Spacing never changes results. Case doesn't for BM25 (it lowercases),
+    # nor for the embedder if its tokenizer lowercases too; a cased model
+    # must see "US" and "us" as different queries.
+    text = " ".join(query.split())
+    if mode == "keyword" or lowercases():
+        text = text.lower()
+    return text
+
+
+def _timed(
+    fn: Callable[..., List[Dict[str, Any]]], *args: Any, **kwargs: Any
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Run fn and return (result, elapsed milliseconds)."""
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, round((time.perf_counter() - t0) * 1000.0, 2)
 
 
 def _hybrid_merge(
@@ -56,21 +218,46 @@ def vs_query(query: str, top_k: int = 6, mode: str = "hybrid") -> List[Dict[str,
     Perform vectorstore retrieval.
 
     mode = "semantic" | "keyword" | "hybrid"
+
+    Each row's meta gets "timings_ms": {"semantic"?, "keyword"?, "total"}
+    with the legs that actually ran, or {"cache", "total"} on a cache hit.
+    Callers get their own copy of the rows and may modify them.
     """
     mode = mode.lower()
+    t0 = time.perf_counter()
 
-    # --- 1) Semantic search ---
-    semantic_results = semantic_query(query, top_k=top_k)
+    # Versions are read before searching: if an upload lands mid-query, the
+    # result is stored under the old versions and never looked up again.
+    key = (_normalize(query, mode), top_k, mode, vs_version(), bm25_version())
+    cached = _CACHE.get(key)
+    if cached is not None:
+        results = _copy_rows(cached)
+        elapsed = round((time.perf_counter() - t0) * 1000.0, 3)
+        for r in results:
+            r["meta"]["timings_ms"] = {"cache": elapsed, "total": elapsed}
+        return results
 
-    # --- 2) Keyword/BM25 search ---
-    keyword_results = bm25_query(query, top_k=top_k)
+    timings: Dict[str, float] = {}
 
-    # --- 3) Mode selection ---
     if mode == "semantic":
-        return semantic_results
+        # --- Semantic search only ---
+        results, timings["semantic"] = _timed(semantic_query, query, top_k=top_k)
+
+    elif mode == "keyword":
+        # --- Keyword/BM25 search only ---
+        results, timings["keyword"] = _timed(bm25_query, query, top_k=top_k)
+
+    else:
+        # --- Hybrid: both legs at once, then merge ---
+        keyword_future = _pool().submit(_timed, bm25_query, query, top_k=top_k)
+        semantic_results, timings["semantic"] = _timed(semantic_query, query, top_k=top_k)
+        keyword_results, timings["keyword"] = keyword_future.result()
+        results = _hybrid_merge(semantic_results, keyword_results, top_k)
+
+    _CACHE.put(key, _copy_rows(results))
 
-    if mode == "keyword":
-        return keyword_results
+    timings["total"] = round((time.perf_counter() - t0) * 1000.0, 2)
+    for r in results:
+        r["meta"]["timings_ms"] = dict(timings)
 
-    # --- 4) Hybrid merge ---
-    return _hybrid_merge(semantic_results, keyword_results, top_k)
+    return results
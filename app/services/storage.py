@@ -1,21 +1,31 @@
 # app/services/storage.py
 from __future__ import annotations
 
+import hashlib
 import io
 import os
 import uuid
 import logging
+from contextlib import closing
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional
-
-try:
-    # PyPDF2 is lightweight and already in most RAG stacks
-    from PyPDF2 import PdfReader
-except Exception as e:  # pragma: no cover
-    PdfReader = None  # We'll raise a helpful error at runtime.
+from typing import BinaryIO, Callable, Dict, Any, Iterable, Iterator, List, Tuple, Optional
 
 # Local services
-from app.services.vectorstore import vs_add
+from app.services.chunker import CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS, iter_chunks
+from app.services.embeddings import EMBED_MAX_LENGTH, embed_texts_array, model_name
+from app.services.extractor import iter_file_pages
+from app.services.vectorstore import (
+    find_document, get_collection, vs_add, vs_delete, vs_update_meta,
+)
+from app.services.bm25_index import (
+    add_chunks as bm25_add_chunks,
+    documents as bm25_documents,
+    remove_chunks as bm25_remove_chunks,
+    replace_chunks as bm25_replace_chunks,
+    size as bm25_size,
+)
+from app.utils.hashing import content_hash, file_sha256
+from app.utils.streams import batched, prefetch
 
 log = logging.getLogger("app.services.storage")
 
@@ -23,55 +33,137 @@ log = logging.getLogger("app.services.storage")
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "uploaded_files")).resolve()
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Chunks embedded and written to Chroma/BM25 per step
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "256"))
+
+# Bounded queues between the ingest stages: extracted pages waiting to be
+# chunked, and embedded batches waiting to be indexed. Together with
+# INGEST_BATCH they cap how much of a document is in memory at once.
+INGEST_PAGE_QUEUE = int(os.getenv("INGEST_PAGE_QUEUE", "32"))
+INGEST_BATCH_QUEUE = int(os.getenv("INGEST_BATCH_QUEUE", "2"))
+
+# Uploads are streamed to disk (and hashed) in blocks of this many bytes
+UPLOAD_BLOCK_BYTES = int(os.getenv("UPLOAD_BLOCK_BYTES", str(1 << 20)))
+
+# How text is cut into chunks (see chunker); part of the ingest key, so
+# changing it makes re-uploads of unchanged files re-index instead of being
+# skipped
+CHUNKING = f"tokens:{CHUNK_TOKENS or 'max'}/{CHUNK_OVERLAP_TOKENS}/{EMBED_MAX_LENGTH}"
+
 
 # ---------- small utils ----------
 
-def _read_pdf_text(pdf_path: Path) -> Tuple[str, int]:
-    """Extracts plain text from a PDF and returns (text, page_count)."""
-    if PdfReader is None:
-        raise RuntimeError(
-            "PyPDF2 is not installed. Please add 'PyPDF2' to requirements.txt and pip install."
-        )
-    reader = PdfReader(str(pdf_path))
-    pages = len(reader.pages)
-    parts: List[str] = []
-    for i in range(pages):
-        try:
-            txt = reader.pages[i].extract_text() or ""
-        except Exception:
-            txt = ""
-        if txt.strip():
-            parts.append(txt)
-    text = "\n\n".join(parts).strip()
-    return text, pages
-
-
-def _chunk_text(
-    text: str,
-    chunk_chars: int = 1400,
-    overlap: int = 200,
-) -> List[str]:
-    """Simple, robust character-based chunker."""
-    text = (text or "").strip()
-    if not text:
-        return []
-
-    chunks: List[str] = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(start + chunk_chars, n)
-        # try to break on a nearby sentence boundary
-        window = text[start:end]
-        split_at = max(window.rfind("\n\n"), window.rfind(". "), window.rfind("? "), window.rfind("! "))
-        if split_at > 400:  # don't split too early
-            end = start + split_at + 1
-
-        chunks.append(text[start:end].strip())
-        if end >= n:
-            break
-        start = max(0, end - overlap)
-    return [c for c in chunks if c]
+def write_stream(src: BinaryIO, target: Path) -> Tuple[str, int]:
+    """
+    Copy `src` into `target` in UPLOAD_BLOCK_BYTES blocks, hashing as it
+    writes, so the file is never held in memory or read a second time.
+    Returns (sha256 hex digest, bytes written).
+    """
+    h = hashlib.sha256()
+    size = 0
+    with target.open("wb") as f:
+        while True:
+            block = src.read(UPLOAD_BLOCK_BYTES)
+            if not block:
+                break
+            h.update(block)
+            f.write(block)
+            size += len(block)
+    return h.hexdigest(), size
+
+
+def ingest_key(sha256: str) -> str:
+    """
+    Identity of an indexed document: its bytes plus everything that decides
+    its chunks and vectors (chunking and embedding model).
+    """
+    return content_hash("document", sha256, CHUNKING, model_name())
+
+
+def _chunk_docs(
+    pages: Iterable[Tuple[int, str]],
+    *,
+    path: Path,
+    source: str,
+    sha256: str,
+    key: str,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Chunk dicts for vs_add, cut from the (page_number, text) `pages` of the
+    document at `path` (see chunker.iter_chunks).
+
+    chunks_total and pages are only known once the last chunk is cut, and
+    _finalize stamps them. Until then every chunk carries 0: Chroma's upsert
+    merges metadata, so without an explicit value a chunk overwriting the
+    same id of a previous version would keep that version's counts.
+    """
+    name = path.name
+    for i, ch in enumerate(iter_chunks(pages), start=1):
+        yield {
+            "id": f"{name}:{i}",
+            "text": ch["text"],
+            "meta": {
+                "source": source,
+                "path": str(path),
+                "filename": name,
+                "chunk_index": i,
+                "page": ch["page"],
+                "char_start": ch["char_start"],
+                "page_end": ch["page_end"],
+                "char_end": ch["char_end"],
+                "tokens": ch["tokens"],
+                "sha256": sha256,
+                "ingest_key": key,
+                "chunks_total": 0,
+                "pages": 0,
+            },
+        }
+
+
+def _index_batch(
+    docs: List[Dict[str, Any]],
+    vectors: Any,
+    ids_by_file: Dict[str, List[str]],
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Index one embedded batch (vectors in Chroma, keywords in the persistent
+    BM25 index); the batch may hold chunks of several documents. A
+    document's first batch replaces its previous BM25 chunks, later ones
+    append. Chunk ids are stable per filename, so the upsert overwrites a
+    previous version in place and only chunks past its new length need
+    deleting (see _finalize).
+
+    `ids_by_file` collects the indexed ids per filename. Returns (Chroma
+    collection info, previous BM25 chunks replaced).
+    """
+    _, info = vs_add(docs, vectors=vectors)
+    texts_by_file: Dict[str, List[str]] = {}
+    for d in docs:
+        name = d["meta"]["filename"]
+        texts_by_file.setdefault(name, []).append(d["text"])
+        ids_by_file.setdefault(name, []).append(d["id"])
+    replaced = 0
+    for name, texts in texts_by_file.items():
+        if len(ids_by_file[name]) > len(texts):
+            bm25_add_chunks(name, texts)
+        else:
+            replaced += bm25_replace_chunks(name, texts)
+    return info, replaced
+
+
+def _finalize(name: str, ids: List[str], pages: int, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Complete a document once all of its chunks are indexed: stamp the
+    counts only known at the end (find_document treats a document as
+    complete once every chunk carrying its ingest key has chunks_total equal
+    to their number) and drop chunks of a previous, longer version. Returns
+    the updated collection info.
+    """
+    vs_update_meta(ids, {"pages": pages, "chunks_total": len(ids)})
+    stale = vs_delete(name, keep=ids)
+    if stale:
+        info = {**info, "count": info["count"] - stale}
+    return info
 
 
 # ---------- main public API ----------
@@ -81,9 +173,39 @@ def save_and_index_pdf(
     *,
     source: str = "upload",
     collection: Optional[str] = None,  # ignored here; collection is configured in vectorstore
+    progress: Optional[Callable[..., None]] = None,
+    sha256: Optional[str] = None,
+    name: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Save (already on disk) PDF, extract text, chunk, embed, and index in Chroma.
+    .txt and .md files are accepted too, as a single page.
+
+    With `name`, the file is read where it is and indexed as UPLOAD_DIR/`name`
+    without being copied there: the caller moves it into place once indexing
+    succeeded, so a failed or duplicate upload never replaces the file that
+    the index describes.
+
+    Re-indexing a file with the same name replaces its previous chunks in
+    both Chroma and the BM25 index instead of duplicating them.
+
+    The work is a pipeline of three stages joined by bounded queues: pages
+    are extracted and chunked as they come, chunks are embedded
+    INGEST_BATCH at a time, and each batch is indexed as soon as it is
+    embedded. Memory stays flat however long the PDF is, and the first
+    batches are searchable while later pages are still being extracted.
+    (chunks_total and pages are stamped on the chunks at the end, so a
+    half-indexed document is never taken for a complete duplicate.)
+
+    `progress(**fields)`, if given, is called as work advances with any of:
+    stage (extracting, indexing, finalizing), pages_total, pages_extracted,
+    chunks_total (so far), chunks_embedded, chunks_indexed.
+
+    `sha256` is the file's digest if the caller already has it (uploads are
+    hashed while being written, see write_stream). If a byte-identical file
+    is already fully indexed with the current chunking and embedding model,
+    nothing is extracted or embedded: the result describes the existing
+    copy, with "duplicate": true and "filename" set to the indexed name.
 
     Returns:
         {
@@ -91,69 +213,198 @@ def save_and_index_pdf(
           "filename": "...",
           "pages": 12,
           "chunks_indexed": 25,
-          "collection_info": {...}
+          "collection_info": {...},
+          "sha256": "...",
+          "duplicate": false
         }
     """
     path = Path(file_path).resolve()
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    # Ensure the file is inside UPLOAD_DIR (copy if user gave a path from Downloads)
-    if UPLOAD_DIR not in path.parents:
-        target = UPLOAD_DIR / path.name
-        if target.exists() and target.samefile(path) is False:
-            target = UPLOAD_DIR / f"{target.stem}-{uuid.uuid4().hex[:8]}{target.suffix}"
-        if not target.exists():
-            target.write_bytes(path.read_bytes())
-        path = target
-
-    # Extract text
-    text, pages = _read_pdf_text(path)
-    if not text:
+    if name is not None:
+        indexed = UPLOAD_DIR / Path(name).name
+    else:
+        # Ensure the file is inside UPLOAD_DIR (copy if user gave a path from Downloads)
+        if UPLOAD_DIR not in path.parents:
+            target = UPLOAD_DIR / path.name
+            if target.exists() and target.samefile(path) is False:
+                target = UPLOAD_DIR / f"{target.stem}-{uuid.uuid4().hex[:8]}{target.suffix}"
+            if not target.exists():
+                with path.open("rb") as src:
+                    sha256, _ = write_stream(src, target)
+            path = target
+        indexed = path
+
+    if sha256 is None:
+        sha256 = file_sha256(path, UPLOAD_BLOCK_BYTES)
+    key = ingest_key(sha256)
+    existing = find_document(key)
+    if existing is not None:
+        log.info(
+            "'%s' is identical to indexed '%s'; skipping extraction and embedding",
+            indexed.name, existing["filename"],
+        )
         return {
-            "ok": False,
-            "filename": path.name,
-            "pages": pages,
-            "chunks_indexed": 0,
-            "error": "No text extracted from PDF (it may be scanned images). Enable OCR if needed.",
+            "ok": True,
+            "filename": existing["filename"],
+            "pages": existing["pages"],
+            "chunks_indexed": existing["chunks"],
+            "collection_info": existing["collection_info"],
+            "sha256": sha256,
+            "duplicate": True,
         }
 
-    # Chunk
-    chunks = _chunk_text(text, chunk_chars=1400, overlap=200)
-    if not chunks:
+    report = progress or (lambda **_: None)
+    name = indexed.name
+    step = max(1, INGEST_BATCH)
+    pages = 0
+    pages_with_text = 0
+    chunks_total = 0
+
+    def on_page(done: int, total: int) -> None:
+        nonlocal pages
+        pages = total
+        report(pages_extracted=done, pages_total=total)
+
+    # Stage 1 (thread "ingest-extract"): pages with text, in page order
+    def page_texts() -> Iterator[Tuple[int, str]]:
+        nonlocal pages_with_text
+        with closing(prefetch(
+            iter_file_pages(path, on_progress=on_page), INGEST_PAGE_QUEUE, "ingest-extract"
+        )) as page_stream:
+            for page_no, txt in page_stream:
+                if txt.strip():
+                    pages_with_text += 1
+                    yield page_no, txt
+
+    # Stage 2 (thread "ingest-embed"): chunks, in batches of INGEST_BATCH,
+    # with their vectors
+    def embedded() -> Iterator[Tuple[List[Dict[str, Any]], Any]]:
+        nonlocal chunks_total
+        with closing(page_texts()) as texts:
+            chunks = _chunk_docs(texts, path=indexed, source=source, sha256=sha256, key=key)
+            for docs in batched(chunks, step):
+                chunks_total += len(docs)
+                report(stage="indexing", chunks_total=chunks_total)
+                vectors = embed_texts_array([d["text"] for d in docs], normalize=True, bulk=True)
+                report(chunks_embedded=chunks_total)
+                yield docs, vectors
+
+    # Stage 3 (this thread): index each batch as soon as it is embedded, so
+    # the start of a long document is searchable while the rest is still
+    # being processed
+    report(stage="extracting")
+    ids_by_file: Dict[str, List[str]] = {}
+    info: Dict[str, Any] = {}
+    replaced = 0
+    # closing(): if indexing fails, the stages are stopped and their threads
+    # joined here instead of staying blocked on full queues
+    with closing(prefetch(embedded(), INGEST_BATCH_QUEUE, "ingest-embed")) as batches:
+        for docs, vectors in batches:
+            info, n = _index_batch(docs, vectors, ids_by_file)
+            replaced += n
+            report(chunks_indexed=len(ids_by_file[name]))
+    ids = ids_by_file.get(name, [])
+
+    if not ids:
         return {
             "ok": False,
-            "filename": path.name,
+            "filename": name,
             "pages": pages,
             "chunks_indexed": 0,
-            "error": "Could not create chunks from extracted text.",
+            "error": (
+                "Could not create chunks from extracted text." if pages_with_text else
+                "No text extracted (a PDF may be scanned images). Enable OCR if needed."
+            ),
         }
 
-    # Prepare docs for the vectorstore
-    docs: List[Dict[str, Any]] = []
-    for i, ch in enumerate(chunks, start=1):
-        docs.append({
-            "id": f"{path.name}:{i}",
-            "text": ch,
-            "meta": {
-                "source": source,
-                "path": str(path),
-                "filename": path.name,
-                "chunk_index": i,
-                "chunks_total": len(chunks),
-                "pages": pages,
-            },
-        })
-
-    # Index
-    ids, info = vs_add(docs)
+    report(stage="finalizing")
+    info = _finalize(name, ids, pages, info)
+    if replaced:
+        log.info("Replaced %s previous chunks of '%s'", replaced, name)
 
     result = {
         "ok": True,
-        "filename": path.name,
+        "filename": name,
         "pages": pages,
         "chunks_indexed": len(ids),
         "collection_info": info,
+        "sha256": sha256,
+        "duplicate": False,
     }
-    log.info("Indexed PDF '%s' -> %s chunks", path.name, len(ids))
+    log.info("Indexed PDF '%s' -> %s chunks", name, len(ids))
     return result
+
+
+def delete_document(filename: str) -> Dict[str, Any]:
+    """
+    Remove a document from Chroma, the BM25 index and UPLOAD_DIR.
+
+    The caller must hold the file's claim (app.workers.ingest.hold_file, as
+    DELETE /v1/documents does), or the delete can interleave with an upload
+    or bulk import of the same file and leave half of it indexed.
+
+    Returns:
+        {
+          "ok": true,
+          "filename": "...",
+          "chunks_deleted": 25
+        }
+    """
+    name = Path(filename).name  # never follow paths outside UPLOAD_DIR
+    deleted = vs_delete(name)
+    bm25_deleted = bm25_remove_chunks(name)
+
+    path = UPLOAD_DIR / name
+    if path.exists():
+        path.unlink()
+
+    log.info("Deleted document '%s' -> %s chunks", name, max(deleted, bm25_deleted))
+    return {
+        "ok": bool(deleted or bm25_deleted),
+        "filename": name,
+        "chunks_deleted": max(deleted, bm25_deleted),
+    }
+
+
+def restore_bm25() -> int:
+    """
+    Index in BM25 every document that Chroma holds but the BM25 index does
+    not, from the chunk texts stored in Chroma (ordered by chunk_index).
+    That is every document of a collection built before the BM25 index was
+    persisted, or one whose BM25 write was lost to a crash. Runs as a
+    warmup step; a no-op when BM25 has as many chunks as Chroma.
+
+    Each document is written under its file claim (app.workers.ingest
+    .hold_file), so an upload of the same file either finished first, and
+    Chroma already holds its new chunks, or starts after. Returns the
+    number of chunks restored.
+    """
+    # Imported here: app.workers.ingest imports this module
+    from app.workers.ingest import hold_file, release_file
+
+    col = get_collection()
+    if col.count() <= bm25_size():
+        return 0
+
+    metas = col.get(include=["metadatas"])["metadatas"]
+    names = {m["filename"] for m in metas if m and m.get("filename")}
+    missing = sorted(names - bm25_documents())
+    restored = 0
+    for name in missing:
+        hold_file(name)
+        try:
+            got = col.get(where={"filename": name}, include=["documents", "metadatas"])
+            rows = sorted(
+                zip(got["metadatas"], got["documents"]),
+                key=lambda r: int(r[0].get("chunk_index") or 0),
+            )
+            texts = [text or "" for _, text in rows]
+            bm25_replace_chunks(name, texts)
+            restored += len(texts)
+        finally:
+            release_file(name)
+    if missing:
+        log.info("Restored %s documents (%s chunks) into BM25 from Chroma", len(missing), restored)
+    return restored
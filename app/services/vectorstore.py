@@ -2,30 +2,173 @@
 """
 Thin wrapper around ChromaDB for:
 - creating/getting a collection
-- adding chunks
+- adding chunks (and updating their metadata)
+- deleting a document's chunks
+- finding an already indexed copy of a document by content
 - semantic query
+- an index version counter, bumped whenever the collection changes
+- warmup (open the collection and load its vector index)
+- re-embedding a collection built with another embedding model
+
+The Chroma client is created on first use (get_client()), not at import:
+importing chromadb and opening the persistent store takes most of a
+second, which processes that never touch the vectorstore should not pay.
+
+Chroma never embeds anything itself: the collection has no embedding
+function, and documents and queries are embedded by app.services.embeddings
+(one shared model, batched and cached) and passed in as vectors. Every
+vector is L2-normalized, so the collection's L2 distance ranks exactly like
+cosine similarity and a vector's length never affects its rank.
 """
 
 from __future__ import annotations
 
-from typing import List, Dict, Any
-import chromadb
+import itertools
+import logging
+import threading
+from typing import List, Dict, Any, Iterable
+
+from app.services.embeddings import embed_text_array, embed_texts_array, model_name
+
+log = logging.getLogger("app.services.vectorstore")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The process-wide Chroma client, created on first call.
+
+    Uses a persistent client if available, falls back to in-memory.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+
+                try:
+                    _client = chromadb.PersistentClient(path="chroma_db")
+                except Exception:
+                    _client = chromadb.Client()
+    return _client
 
-# Use a persistent client if available, fall back to in-memory
-try:
-    client = chromadb.PersistentClient(path="chroma_db")
-except Exception:
-    client = chromadb.Client()
 
 COLLECTION_NAME = "docs"
 
+# Bumped by every write through this module; lets callers cache query
+# results and know when they went stale. (count() is atomic under the GIL.)
+_VERSIONS = itertools.count(1)
+_VERSION = 0
+
+
+def index_version() -> int:
+    """Counter that changes whenever vs_add/vs_delete modify the collection."""
+    return _VERSION
+
+
+def _bump_version() -> None:
+    global _VERSION
+    _VERSION = next(_VERSIONS)
+
+
+# Rows re-embedded per step when an existing collection is migrated
+_REEMBED_BATCH = 256
+
+_col = None
+_col_lock = threading.Lock()
+
+
+def _embedding_meta() -> Dict[str, Any]:
+    """Collection metadata recording how its vectors were made."""
+    return {"embedding_model": model_name(), "embedding_norm": "l2"}
+
+
+def _reembed(col) -> int:
+    """
+    Replace the vector of every chunk in `col` with one from the current
+    embedding model, _REEMBED_BATCH chunks at a time. Documents and
+    metadata are kept. Returns the number of chunks re-embedded.
+    """
+    total = col.count()
+    done = 0
+    while done < total:
+        part = col.get(include=["documents"], limit=_REEMBED_BATCH, offset=done)
+        if not part["ids"]:
+            break
+        vectors = embed_texts_array(part["documents"], normalize=True, bulk=True)
+        col.update(ids=part["ids"], embeddings=vectors.tolist())
+        done += len(part["ids"])
+        log.info("Re-embedded %s/%s chunks of '%s'", done, total, col.name)
+    return done
+
+
+def _open_collection():
+    client = get_client()
+    try:
+        col = client.get_collection(name=COLLECTION_NAME, embedding_function=None)
+    except ValueError:  # does not exist yet
+        return client.create_collection(
+            name=COLLECTION_NAME,
+            embedding_function=None,  # we always pass embeddings ourselves
+            metadata=_embedding_meta(),
+        )
+
+    # Read what the existing collection was built with before writing anything
+    # (get_or_create_collection would overwrite the metadata we compare)
+    meta = col.metadata or {}
+    wanted = _embedding_meta()
+    if any(meta.get(k) != v for k, v in wanted.items()):
+        if col.count():
+            stored = meta.get("embedding_model") or "Chroma's default model"
+            if meta.get("embedding_model") and meta.get("embedding_norm") != "l2":
+                stored += " (unnormalized)"
+            log.warning(
+                "Collection '%s' holds vectors from %s, now using %s; "
+                "re-embedding its %s chunks so they stay comparable.",
+                COLLECTION_NAME, stored, model_name(), col.count(),
+            )
+            _reembed(col)
+            _bump_version()
+        # The distance function cannot be changed (nor passed back in)
+        kept = {k: v for k, v in meta.items() if not k.startswith("hnsw:")}
+        col.modify(metadata={**kept, **wanted})
+    return col
+
 
 def get_collection():
     """
-    Get or create the main Chroma collection used for document chunks.
+    The main Chroma collection used for document chunks, opened (or
+    created) on first call.
+
+    A collection built with another embedding model, or with Chroma's
+    built-in one (collections from before documents were embedded here),
+    is re-embedded with the current model when it is opened, so vectors
+    from different models are never ranked against each other.
+    """
+    global _col
+
+    if _col is None:
+        with _col_lock:
+            if _col is None:
+                _col = _open_collection()
+    return _col
+
+
+def warmup() -> int:
+    """
+    Open the collection and run one query so Chroma loads its vector index
+    before the first user request. Returns the number of chunks.
     """
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
-    return collection
+    col = get_collection()
+    n = col.count()
+    if n:
+        col.query(
+            query_embeddings=[embed_text_array("warm up", normalize=True).tolist()], n_results=1
+        )
+    return n
 
 
 def _collection():
@@ -35,10 +178,18 @@ def _collection():
     return get_collection()
 
 
-def vs_add(chunks: List[Dict[str, Any]]):
+def vs_add(chunks: List[Dict[str, Any]], vectors=None):
     """
     Add chunk dicts to Chroma.
 
+    Texts are embedded here with embed_texts_array (batched, cached, and
+    spread over the embedding worker processes when EMBED_WORKERS is set),
+    unless `vectors` (one unit-norm row per chunk, from
+    embed_texts_array(..., normalize=True)) is given because the caller
+    embedded them already. Chunks whose id already exists are overwritten
+    (upsert), so indexing the same document twice does not fail or leave
+    duplicates behind.
+
     Each chunk is expected to look like:
         {
             "id": str,              # unique ID per chunk
@@ -69,7 +220,11 @@ def vs_add(chunks: List[Dict[str, Any]]):
         docs.append(text)
         metas.append(meta)
 
-    col.add(ids=ids, documents=docs, metadatas=metas)
+    if vectors is None:
+        vectors = embed_texts_array(docs, normalize=True, bulk=True)
+    # Chroma's API validates plain lists: convert the float32 matrix once, here
+    col.upsert(ids=ids, embeddings=vectors.tolist(), documents=docs, metadatas=metas)
+    _bump_version()
 
     info = {
         "collection": col.name,
@@ -78,6 +233,64 @@ def vs_add(chunks: List[Dict[str, Any]]):
     return ids, info
 
 
+def vs_update_meta(ids: List[str], fields: Dict[str, Any], batch: int = 1024) -> None:
+    """
+    Set `fields` in the metadata of the chunks `ids`, keeping their other
+    metadata, documents and vectors as they are. Used once a streamed
+    document is complete, to stamp values only known at the end on every
+    chunk. Updates go to Chroma `batch` ids at a time.
+    """
+    col = get_collection()
+    for start in range(0, len(ids), batch):
+        part = ids[start:start + batch]
+        col.update(ids=part, metadatas=[dict(fields) for _ in part])
+    if ids:
+        _bump_version()
+
+
+def vs_delete(filename: str, keep: Iterable[str] = ()) -> int:
+    """
+    Delete the chunks of the document `filename` from Chroma.
+
+    Ids in `keep` are left alone: after re-indexing a document, this drops
+    only the chunks the new version no longer has. Chroma just marks the
+    vectors deleted and compacts its own index, so this is cheap.
+    Returns the number of chunks deleted.
+    """
+    col = get_collection()
+
+    keep = set(keep)
+    ids = col.get(where={"filename": filename}, include=[])["ids"]
+    stale = [cid for cid in ids if cid not in keep]
+    if stale:
+        col.delete(ids=stale)
+        _bump_version()
+    return len(stale)
+
+
+def find_document(ingest_key: str) -> Dict[str, Any] | None:
+    """
+    The fully indexed document whose chunks carry meta["ingest_key"] ==
+    `ingest_key` (see storage.save_and_index_pdf), as
+    {"filename", "pages", "chunks", "collection_info"}; None if there is
+    none, or if only part of its chunks made it into the collection.
+    """
+    col = get_collection()
+    metas = col.get(where={"ingest_key": ingest_key}, include=["metadatas"])["metadatas"]
+    by_file: Dict[str, List[Dict[str, Any]]] = {}
+    for meta in metas or []:
+        by_file.setdefault(meta.get("filename", ""), []).append(meta)
+    for filename, rows in by_file.items():
+        if all(r.get("chunks_total") == len(rows) for r in rows):
+            return {
+                "filename": filename,
+                "pages": rows[0].get("pages", 0),
+                "chunks": len(rows),
+                "collection_info": {"collection": col.name, "count": col.count()},
+            }
+    return None
+
+
 def semantic_query(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
     """
     Run a semantic (vector) query against Chroma.
@@ -88,7 +301,8 @@ def semantic_query(query: str, top_k: int = 6) -> List[Dict[str, Any]]:
     if not query.strip():
         return []
 
-    res = col.query(query_texts=[query], n_results=top_k)
+    vector = embed_text_array(query, normalize=True)
+    res = col.query(query_embeddings=[vector.tolist()], n_results=top_k)
 
     # Chroma returns lists of documents, metadatas, distances
     docs = res.get("documents", [[]])[0]
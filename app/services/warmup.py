@@ -0,0 +1,123 @@
+# app/services/warmup.py
+"""
+Startup preloading and the readiness state behind /v1/ready.
+
+Everything that is otherwise loaded on first use is loaded and exercised
+once at startup, in a background thread, so the server answers liveness
+checks right away while readiness stays false until every step has
+finished:
+
+    - embeddings : load the embedding model, one forward pass, start the
+                   query micro-batcher (and the bulk worker pool, if any)
+    - chroma     : open the collection and load its vector index
+    - bm25       : index in BM25 the documents only Chroma has (a store
+                   from before the BM25 index was persisted starts empty;
+                   see storage.restore_bm25)
+    - reranker   : load the answerer's cross-encoder and score one pair
+
+WARMUP_STEPS selects and orders the steps (comma-separated). A failed step
+is reported with its error and keeps the process not ready. (The BM25
+index itself is opened synchronously at startup, before any write can
+arrive.)
+
+Exports:
+    - start_warmup() -> None
+    - readiness() -> dict   ({"ready": bool, "steps": {...}})
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app.services import embeddings, storage, vectorstore
+
+log = logging.getLogger("app.services.warmup")
+
+WARMUP_STEPS = [
+    s.strip() for s in os.getenv("WARMUP_STEPS", "embeddings,chroma,bm25,reranker").split(",")
+    if s.strip()
+]
+
+
+def _embeddings() -> str:
+    embeddings.warmup()
+    return f"{embeddings.model_name()} ({embeddings.EMBED_BACKEND})"
+
+
+def _chroma() -> str:
+    return f"{vectorstore.warmup()} chunks"
+
+
+def _bm25() -> str:
+    return f"{storage.restore_bm25()} chunks restored"
+
+
+def _reranker() -> str:
+    # Imported here: a missing sentence-transformers fails this step only
+    from app.services import answerer
+
+    answerer.warmup()
+    return answerer._MODEL_NAME
+
+
+_STEPS: Dict[str, Callable[[], str]] = {
+    "embeddings": _embeddings,
+    "chroma": _chroma,
+    "bm25": _bm25,
+    "reranker": _reranker,
+}
+
+_lock = threading.Lock()
+_thread: threading.Thread | None = None
+_status: Dict[str, Dict[str, Any]] = {}
+_ready = threading.Event()
+
+
+def _run() -> None:
+    ok = True
+    for name in WARMUP_STEPS:
+        step = _STEPS.get(name)
+        with _lock:
+            _status[name]["state"] = "running"
+        t0 = time.perf_counter()
+        try:
+            if step is None:
+                raise ValueError(f"unknown warmup step; expected one of {sorted(_STEPS)}")
+            detail = step()
+        except Exception as e:
+            ok = False
+            log.exception("Warmup step %s failed", name)
+            update = {"state": "error", "error": f"{type(e).__name__}: {e}"}
+        else:
+            log.info("Warmup step %s: %s", name, detail)
+            update = {"state": "ok", "detail": detail}
+        update["seconds"] = round(time.perf_counter() - t0, 3)
+        with _lock:
+            _status[name].update(update)
+    if ok:
+        _ready.set()
+        log.info("Warmup complete; ready to serve")
+
+
+def start_warmup() -> None:
+    """Run the WARMUP_STEPS in a background thread (once per process)."""
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return
+        for name in WARMUP_STEPS:
+            _status[name] = {"state": "pending"}
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+        _thread.start()
+
+
+def readiness() -> Dict[str, Any]:
+    """Whether every warmup step has succeeded, with per-step state and timings."""
+    with _lock:
+        steps = {name: dict(s) for name, s in _status.items()}
+    return {"ready": _ready.is_set(), "steps": steps}
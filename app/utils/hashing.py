@@ -0,0 +1,45 @@
+# app/utils/hashing.py
+"""
+Stable content hashes used as cache keys.
+
+    - content_hash(*parts: str) -> str
+    - embedding_key(model: str, text: str) -> str
+    - file_sha256(path, block_size=1 MiB) -> str
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+
+def content_hash(*parts: str) -> str:
+    """
+    SHA-256 hex digest of `parts`.
+
+    Each part is length-prefixed, so ("ab", "c") and ("a", "bc") never
+    collide.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Cache key for the embedding of `text` by `model`."""
+    return content_hash("embedding", model, text)
+
+
+def file_sha256(path: str | os.PathLike, block_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file's bytes, read in `block_size` blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
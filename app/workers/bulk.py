@@ -0,0 +1,377 @@
+# app/workers/bulk.py
+"""
+Bulk ingestion of a whole corpus: a directory tree or a .zip archive of
+PDF, .txt and .md files (a course at a time).
+
+Each file is indexed under a flat name made of its path in the corpus
+("week1/intro.pdf" -> "week1__intro.pdf"), exactly as if it had been
+uploaded under that name. One pipeline runs for the whole corpus, its
+stages joined by bounded queues:
+
+    - stage   : claim the filename as an upload job does (ingest.hold_file),
+                copy the file into INCOMING_DIR, hashing it on the way, and
+                skip it if an identical file is already fully indexed
+    - extract : whole files in parallel on the extraction process pool
+                (extractor.extract_files)
+    - embed   : chunks of consecutive files share embedding batches of
+                INGEST_BATCH, so hundreds of short notes do not mean
+                hundreds of tiny batches
+    - index   : each batch goes into Chroma and BM25 as soon as it is
+                embedded; a file is finalized, and moved into UPLOAD_DIR,
+                once its last chunk is in
+
+Imports are resumable: a file only counts as indexed once all of its
+chunks carry its ingest key and chunk count (see storage.ingest_key and
+vectorstore.find_document). Running the same import again after an
+interruption skips every finished file and redoes the rest, including a
+changed file whose re-indexing was cut short. Until a file is indexed,
+UPLOAD_DIR keeps its previous version.
+
+From the command line, with the server stopped (Chroma and the BM25 store
+take a single writer process; while the server runs, use POST /v1/bulk):
+
+    python -m app.workers.bulk path/to/course/
+    python -m app.workers.bulk course.zip
+
+Exports:
+    - ingest_corpus(source, *, progress=None, on_file=None, source_label="bulk") -> dict
+    - submit_bulk(source: Path, label: str, cleanup=False) -> Job
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import closing
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services import storage
+from app.services.embeddings import embed_texts_array
+from app.services.extractor import SUPPORTED_SUFFIXES, extract_files
+from app.services.vectorstore import find_document
+from app.utils.hashing import file_sha256
+from app.utils.streams import prefetch
+from app.workers.ingest import INCOMING_DIR, Job, hold_file, release_file, submit_job
+
+log = logging.getLogger("app.workers.bulk")
+
+# Staged files waiting for extraction
+BULK_STAGE_QUEUE = int(os.getenv("BULK_STAGE_QUEUE", "16"))
+
+# Server-side directories/archives POST /v1/bulk may import from (by path);
+# unset, only uploaded archives are accepted
+BULK_IMPORT_ROOT = os.getenv("BULK_IMPORT_ROOT", "")
+
+_Entry = Tuple[str, Callable[[], BinaryIO], Optional[Path]]  # name, open, local path
+
+
+def _flat_name(parts: Tuple[str, ...]) -> str:
+    return "__".join(p for p in parts if p not in ("", ".", ".."))
+
+
+def _wanted(parts: Tuple[str, ...]) -> bool:
+    """Supported file type, and not hidden or archive-tool clutter (__MACOSX/)."""
+    return (
+        PurePosixPath(parts[-1]).suffix.lower() in SUPPORTED_SUFFIXES
+        and not any(p.startswith(".") or p == "__MACOSX" for p in parts)
+    )
+
+
+def _entries(source: Path, archive: Optional[zipfile.ZipFile]) -> List[_Entry]:
+    """The corpus files, sorted by name; names that collide keep the first."""
+    found: List[_Entry] = []
+    if archive is not None:
+        for info in archive.infolist():
+            parts = PurePosixPath(info.filename).parts
+            if not info.is_dir() and parts and _wanted(parts):
+                found.append((_flat_name(parts), lambda i=info: archive.open(i), None))
+    else:
+        for path in source.rglob("*"):
+            parts = path.relative_to(source).parts
+            if path.is_file() and _wanted(parts):
+                found.append((_flat_name(parts), lambda p=path: p.open("rb"), path))
+
+    entries: Dict[str, _Entry] = {}
+    for entry in sorted(found, key=lambda e: e[0]):
+        if entry[0] in entries:
+            log.warning("Skipping '%s': another file in the corpus has the same name", entry[0])
+            continue
+        entries[entry[0]] = entry
+    return list(entries.values())
+
+
+def ingest_corpus(
+    source: str | Path,
+    *,
+    progress: Optional[Callable[..., None]] = None,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+    source_label: str = "bulk",
+) -> Dict[str, Any]:
+    """
+    Index every PDF, .txt and .md file in the directory or .zip archive
+    `source` (see the module docstring).
+
+    `progress(**fields)`, if given, is called as work advances with any of:
+    stage, files_total, files_done, files_indexed, files_skipped,
+    files_failed, chunks_embedded, chunks_indexed. `on_file(result)` is
+    called as each file is finished, with {"filename", "status" (indexed |
+    skipped | failed), "pages", "chunks_indexed", "error"}.
+
+    Returns:
+        {
+          "ok": true,
+          "source": "...",
+          "files_total": 340,
+          "files_indexed": 300,
+          "files_skipped": 38,
+          "files_failed": 2,
+          "chunks_indexed": 9120,
+          "failed": [{"filename": "...", "error": "..."}],
+          "seconds": 412.5,
+          "files_per_s": 0.82,
+          "chunks_per_s": 22.1
+        }
+    """
+    source = Path(source).resolve()
+    if not source.exists():
+        raise FileNotFoundError(f"Not found: {source}")
+    report = progress or (lambda **_: None)
+    t0 = time.perf_counter()
+
+    counts = {"files_done": 0, "files_indexed": 0, "files_skipped": 0, "files_failed": 0}
+    failed: List[Dict[str, str]] = []
+    chunks_indexed = 0
+    finish_lock = threading.Lock()  # files finish on the stage thread and this one
+    held: Dict[str, Path] = {}  # claimed (hold_file) name -> staged copy
+
+    def settle(name: str, indexed: bool) -> None:
+        """Move an indexed file into place (or drop the staged copy) and release its name."""
+        staged_path = held.pop(name)
+        target = storage.UPLOAD_DIR / name
+        if staged_path != target:
+            if indexed:
+                os.replace(staged_path, target)
+            else:
+                staged_path.unlink(missing_ok=True)
+        release_file(name)
+
+    def finish(
+        name: str, status: str, pages: int = 0, chunks: int = 0, error: Optional[str] = None,
+    ) -> None:
+        with finish_lock:
+            settle(name, status == "indexed")
+            counts["files_done"] += 1
+            counts[f"files_{status}"] += 1
+            if error is not None:
+                failed.append({"filename": name, "error": error})
+                log.warning("Bulk import: '%s' failed: %s", name, error)
+            report(**counts)
+            if on_file is not None:
+                on_file({
+                    "filename": name, "status": status, "pages": pages,
+                    "chunks_indexed": chunks, "error": error,
+                })
+
+    archive = zipfile.ZipFile(source) if source.is_file() else None
+    try:
+        entries = _entries(source, archive)
+        report(stage="indexing", files_total=len(entries))
+        INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+        docs: Dict[str, Dict[str, Any]] = {}  # staged path -> per-file state
+
+        # Stage 1 (thread "bulk-stage"): claim each name like an upload job
+        # does (ingest.hold_file), copy the file into INCOMING_DIR, and skip
+        # it if already fully indexed. A file only replaces UPLOAD_DIR/name
+        # once it is indexed (see settle).
+        def staged() -> Iterator[str]:
+            for name, open_src, local in entries:
+                target = storage.UPLOAD_DIR / name
+                if local is not None and local.resolve() == target:
+                    staged_path = target  # importing UPLOAD_DIR itself
+                else:
+                    staged_path = INCOMING_DIR / f"{uuid.uuid4().hex}-{name}"
+                hold_file(name)
+                with finish_lock:
+                    held[name] = staged_path
+                try:
+                    if staged_path == target:
+                        sha256 = file_sha256(target, storage.UPLOAD_BLOCK_BYTES)
+                    else:
+                        with open_src() as src:
+                            sha256, _ = storage.write_stream(src, staged_path)
+                    key = storage.ingest_key(sha256)
+                    existing = find_document(key)
+                except Exception as e:
+                    finish(name, "failed", error=f"{type(e).__name__}: {e}")
+                    continue
+                if existing is not None:
+                    finish(name, "skipped", existing["pages"], existing["chunks"])
+                    continue
+                docs[str(staged_path)] = {"name": name, "sha256": sha256, "key": key}
+                yield str(staged_path)
+
+        # Stage 2 (thread "bulk-embed"): extract in parallel, chunk, and embed
+        # in batches that may span files. Each batch carries the files whose
+        # last chunk it (or an earlier batch) holds.
+        def embedded() -> Iterator[Tuple[List[Dict[str, Any]], Any, List[Dict[str, Any]]]]:
+            step = max(1, storage.INGEST_BATCH)
+            batch: List[Dict[str, Any]] = []
+            done: List[Dict[str, Any]] = []
+            embedded_total = 0
+
+            def flush():
+                nonlocal batch, done, embedded_total
+                vectors = (
+                    embed_texts_array([d["text"] for d in batch], normalize=True, bulk=True)
+                    if batch else None
+                )
+                embedded_total += len(batch)
+                report(chunks_embedded=embedded_total)
+                out = (batch, vectors, done)
+                batch, done = [], []
+                return out
+
+            with closing(prefetch(staged(), BULK_STAGE_QUEUE, "bulk-stage")) as staged_paths:
+                for path, pages, error in extract_files(staged_paths):
+                    doc = docs.pop(path)
+                    doc["pages"] = len(pages)
+                    doc["error"] = error
+                    pages = [(n, t) for n, t in pages if t.strip()]
+                    doc["has_text"] = bool(pages)
+                    for chunk in storage._chunk_docs(
+                        pages, path=storage.UPLOAD_DIR / doc["name"], source=source_label,
+                        sha256=doc["sha256"], key=doc["key"],
+                    ):
+                        batch.append(chunk)
+                        if len(batch) >= step:
+                            yield flush()
+                    done.append(doc)
+            if batch or done:
+                yield flush()
+
+        # Stage 3 (this thread): index each batch, then finalize the files
+        # it completes
+        ids_by_file: Dict[str, List[str]] = {}
+        info: Dict[str, Any] = {}
+        # closing(): on an error the pipeline threads are stopped and joined
+        # before the cleanup below, so no stage still claims or writes files
+        with closing(prefetch(embedded(), storage.INGEST_BATCH_QUEUE, "bulk-embed")) as batches:
+            for batch, vectors, done in batches:
+                if batch:
+                    info, _ = storage._index_batch(batch, vectors, ids_by_file)
+                    chunks_indexed += len(batch)
+                    report(chunks_indexed=chunks_indexed)
+                for doc in done:
+                    name = doc["name"]
+                    ids = ids_by_file.pop(name, [])
+                    if doc["error"] is None and ids:
+                        info = storage._finalize(name, ids, doc["pages"], info)
+                        finish(name, "indexed", doc["pages"], len(ids))
+                    else:
+                        finish(name, "failed", doc["pages"], error=doc["error"] or (
+                            "Could not create chunks from extracted text." if doc["has_text"] else
+                            "No text extracted (a PDF may be scanned images)."
+                        ))
+    finally:
+        # Interrupted: drop staged copies of unfinished files, free their names
+        with finish_lock:
+            for name in list(held):
+                settle(name, indexed=False)
+        if archive is not None:
+            archive.close()
+
+    secs = time.perf_counter() - t0
+    result = {
+        "ok": bool(entries),
+        "source": str(source),
+        "files_total": len(entries),
+        "files_indexed": counts["files_indexed"],
+        "files_skipped": counts["files_skipped"],
+        "files_failed": counts["files_failed"],
+        "chunks_indexed": chunks_indexed,
+        "failed": failed,
+        "seconds": round(secs, 2),
+        "files_per_s": round(counts["files_done"] / secs, 2) if secs else 0.0,
+        "chunks_per_s": round(chunks_indexed / secs, 1) if secs else 0.0,
+    }
+    if not entries:
+        result["error"] = "No PDF, .txt or .md files found."
+    log.info(
+        "Bulk import of %s: %s indexed, %s skipped, %s failed, %s chunks in %.1fs",
+        source, result["files_indexed"], result["files_skipped"], result["files_failed"],
+        chunks_indexed, secs,
+    )
+    return result
+
+
+def submit_bulk(source: Path, label: str, cleanup: bool = False) -> Job:
+    """
+    Queue ingest_corpus(source) as an ingestion job labelled `label`;
+    with `cleanup`, `source` (an uploaded archive) is deleted afterwards.
+    Raises ingest.QueueFull like submit_ingest.
+    """
+    def work(job: Job) -> Dict[str, Any]:
+        job.start()
+        return ingest_corpus(source, progress=job.update, source_label="bulk")
+
+    return submit_job(
+        label, work, cleanup=(lambda: source.unlink(missing_ok=True)) if cleanup else None,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.workers.bulk",
+        description="Index every PDF, .txt and .md file in a directory or .zip archive.",
+    )
+    parser.add_argument("source", help="directory or .zip archive")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s | %(name)s | %(message)s")
+
+    from app.services import bm25_index
+    from app.services.embeddings import shutdown_workers
+    from app.services.extractor import shutdown_extract_pool
+
+    bm25_index.open_store()
+    state: Dict[str, int] = {"files_total": 0}
+
+    def on_file(r: Dict[str, Any]) -> None:
+        state["done"] = state.get("done", 0) + 1
+        detail = r["error"] or f"{r['pages']} pages, {r['chunks_indexed']} chunks"
+        width = len(str(state["files_total"]))
+        print(f"[{state['done']:>{width}}/{state['files_total']}] {r['status']:<8} {r['filename']}  ({detail})",
+              flush=True)
+
+    try:
+        result = ingest_corpus(
+            args.source,
+            progress=lambda **f: state.update(files_total=f.get("files_total", state["files_total"])),
+            on_file=on_file,
+            source_label="bulk",
+        )
+    finally:
+        shutdown_extract_pool()
+        shutdown_workers()
+
+    print(
+        f"\n{result['files_total']} files in {result['seconds']:.1f}s: "
+        f"{result['files_indexed']} indexed, {result['files_skipped']} skipped "
+        f"(already indexed), {result['files_failed']} failed; "
+        f"{result['chunks_indexed']} chunks.\n"
+        f"{result['files_per_s']:.2f} files/s, {result['chunks_per_s']:.1f} chunks/s"
+    )
+    if result.get("error"):
+        print(result["error"], file=sys.stderr)
+    return 0 if result["ok"] and not result["files_failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
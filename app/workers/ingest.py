@@ -0,0 +1,292 @@
+# app/workers/ingest.py
+"""
+Background ingestion jobs.
+
+/v1/upload stores the file and submits a job here instead of parsing,
+embedding and indexing on the event loop. Jobs run on a bounded thread pool
+of INGEST_WORKERS threads (threads, not processes: the BM25 index and the
+embedding model live in this process; embedding can still fan out to the
+embedding worker processes). At most INGEST_MAX_PENDING jobs may be queued
+or running; beyond that submit_ingest raises QueueFull.
+
+Jobs for the same filename run one at a time (hold_file), so a re-upload
+never interleaves with the indexing of the previous version; deleting a
+document takes the same claim. An upload
+only replaces the file in UPLOAD_DIR once it is indexed; a failed or
+duplicate upload leaves the previous file as it was. Finished jobs are
+kept for INGEST_JOB_TTL seconds. Bulk imports (app.workers.bulk) run as
+jobs on the same pool, through submit_job.
+
+Jobs still queued at shutdown are dropped: they are marked failed and their
+staged files deleted. Files a previous process left in INCOMING_DIR (it was
+killed mid-job) are removed by sweep_incoming at startup.
+
+Exports:
+    - submit_ingest(incoming: Path, filename: str, sha256=None) -> Job
+    - submit_job(filename: str, work, cleanup=None) -> Job
+    - get_job(job_id: str) -> Job | None
+    - hold_file(filename: str, blocking=True) -> bool / release_file(filename: str) -> None
+    - sweep_incoming() -> int
+    - shutdown() -> None
+    - QueueFull
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.storage import UPLOAD_DIR, save_and_index_pdf
+
+log = logging.getLogger("app.workers.ingest")
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "64"))
+INGEST_JOB_TTL = float(os.getenv("INGEST_JOB_TTL", "3600"))
+
+# Where uploads wait until their job has indexed them and moves them into UPLOAD_DIR
+INCOMING_DIR = UPLOAD_DIR / ".incoming"
+
+
+class QueueFull(RuntimeError):
+    """Too many ingestion jobs are queued or running."""
+
+
+class Job:
+    """State of one ingestion job. Fields are updated by the worker thread."""
+
+    def __init__(self, filename: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"  # queued | running | done | failed
+        self.stage: Optional[str] = None
+        self.progress: Dict[str, int] = {
+            "pages_total": 0,
+            "pages_extracted": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "chunks_indexed": 0,
+        }
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def update(self, stage: Optional[str] = None, **counts: int) -> None:
+        """Progress callback for save_and_index_pdf (and bulk.ingest_corpus)."""
+        with self._lock:
+            if stage is not None:
+                self.stage = stage
+            self.progress.update(counts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+_pool: ThreadPoolExecutor | None = None
+_jobs: Dict[str, Job] = {}
+_pending = 0
+_lock = threading.Lock()
+_file_locks: Dict[str, List[Any]] = {}  # filename -> [lock, holders and waiters]
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    """The job thread pool, created on first use. Caller holds _lock."""
+    global _pool
+
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=max(1, INGEST_WORKERS), thread_name_prefix="ingest"
+        )
+    return _pool
+
+
+def _prune(now: float) -> None:
+    """Forget finished jobs older than INGEST_JOB_TTL. Caller holds _lock."""
+    for job_id in [
+        j.id for j in _jobs.values()
+        if j.finished_at is not None and now - j.finished_at > INGEST_JOB_TTL
+    ]:
+        del _jobs[job_id]
+
+
+def _run(job: Job, work: Callable[[Job], Dict[str, Any]], cleanup: Optional[Callable[[], None]]) -> None:
+    global _pending
+
+    try:
+        result = work(job)
+        with job._lock:
+            if result.get("ok"):
+                job.status = "done"
+            else:
+                job.status = "failed"
+                job.error = result.get("error", "Unknown indexing error")
+            job.result = result
+    except Exception as e:
+        log.exception("Ingestion job %s (%s) failed", job.id, job.filename)
+        with job._lock:
+            job.status = "failed"
+            job.error = f"Indexing failed: {e}"
+    finally:
+        if cleanup is not None:
+            cleanup()
+        with job._lock:
+            job.stage = None
+            job.finished_at = time.time()
+        with _lock:
+            _pending -= 1
+
+
+def _drop(job: Job, cleanup: Optional[Callable[[], None]]) -> None:
+    """A queued job cancelled by shutdown(): _run never starts, so finish it here."""
+    global _pending
+
+    if cleanup is not None:
+        cleanup()
+    with job._lock:
+        job.status = "failed"
+        job.error = "Cancelled: the server shut down before the job started"
+        job.finished_at = time.time()
+    with _lock:
+        _pending -= 1
+
+
+def submit_job(
+    filename: str,
+    work: Callable[[Job], Dict[str, Any]],
+    cleanup: Optional[Callable[[], None]] = None,
+) -> Job:
+    """
+    Queue `work(job)` as a job labelled `filename`. `work` calls job.start()
+    when it begins, reports progress through job.update, and returns a
+    result dict with "ok" (and "error" if not ok). `cleanup()` runs after
+    it, whatever happened. Raises QueueFull if INGEST_MAX_PENDING jobs are
+    already queued or running.
+    """
+    global _pending
+
+    job = Job(filename)
+    with _lock:
+        _prune(time.time())
+        if _pending >= INGEST_MAX_PENDING:
+            raise QueueFull(f"{_pending} ingestion jobs already pending")
+        future = _get_pool().submit(_run, job, work, cleanup)
+        future.add_done_callback(lambda f: _drop(job, cleanup) if f.cancelled() else None)
+        _pending += 1
+        _jobs[job.id] = job
+    log.info("Queued ingestion job %s for '%s'", job.id, filename)
+    return job
+
+
+def hold_file(filename: str, blocking: bool = True) -> bool:
+    """
+    Wait until no other job is indexing `filename`, then claim it until
+    release_file(filename), which may be called from another thread.
+    With blocking=False, return False right away (claiming nothing) if the
+    file is busy.
+    """
+    with _lock:
+        entry = _file_locks.setdefault(filename, [threading.Lock(), 0])
+        entry[1] += 1
+    if entry[0].acquire(blocking):
+        return True
+    with _lock:
+        entry[1] -= 1
+        if not entry[1]:
+            del _file_locks[filename]
+    return False
+
+
+def release_file(filename: str) -> None:
+    with _lock:
+        entry = _file_locks[filename]
+        entry[1] -= 1
+        if not entry[1]:
+            del _file_locks[filename]  # nobody waiting: don't keep one lock per name ever seen
+    entry[0].release()
+
+
+def _index_upload(job: Job, incoming: Path, sha256: Optional[str]) -> Dict[str, Any]:
+    hold_file(job.filename)
+    try:
+        job.start()
+        result = save_and_index_pdf(
+            incoming, progress=job.update, sha256=sha256, name=job.filename
+        )
+        # Only now does the new file take the old one's place (an identical
+        # copy indexed under another name is not stored a second time)
+        if result.get("ok") and result.get("filename") == job.filename:
+            os.replace(incoming, UPLOAD_DIR / job.filename)
+        return result
+    finally:
+        release_file(job.filename)
+
+
+def submit_ingest(incoming: Path, filename: str, sha256: Optional[str] = None) -> Job:
+    """
+    Queue the indexing of `incoming` (a file under INCOMING_DIR) as
+    UPLOAD_DIR/`filename`; `sha256` is its digest, if already known. Raises
+    QueueFull if INGEST_MAX_PENDING jobs are already queued or running.
+    """
+    return submit_job(
+        filename,
+        lambda job: _index_upload(job, incoming, sha256),
+        cleanup=lambda: incoming.unlink(missing_ok=True),
+    )
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def sweep_incoming() -> int:
+    """
+    Delete every file in INCOMING_DIR. Only safe before the first upload or
+    bulk import of this process (at startup): whatever is there was staged
+    by a previous one. Returns the number of files removed.
+    """
+    removed = 0
+    if INCOMING_DIR.is_dir():
+        for f in INCOMING_DIR.iterdir():
+            if f.is_file():
+                f.unlink(missing_ok=True)
+                removed += 1
+    if removed:
+        log.info("Removed %s files left in %s by a previous run", removed, INCOMING_DIR)
+    return removed
+
+
+def shutdown() -> None:
+    """Wait for running jobs to finish; fail (and clean up) the ones still queued."""
+    global _pool
+
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
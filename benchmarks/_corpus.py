@@ -0,0 +1,47 @@
+# benchmarks/_corpus.py
+"""
+Synthetic corpus helpers shared by the benchmark scripts.
+
+Chunks are built from a Zipf-distributed vocabulary so that term
+frequencies look roughly like real course material (a few very common
+words, a long tail of rare ones) without shipping any PDFs.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+from typing import Iterator, List
+
+VOCAB_SIZE = 50_000
+WORDS_PER_CHUNK = 180
+
+
+def _vocab(size: int = VOCAB_SIZE) -> List[str]:
+    return [f"w{i}" for i in range(size)]
+
+
+def _cum_weights(size: int, exponent: float) -> List[float]:
+    # Precomputed once: rng.choices(weights=...) would re-accumulate per call
+    return list(itertools.accumulate(1.0 / (r + 1) ** exponent for r in range(size)))
+
+
+def make_chunks(n: int, seed: int = 0, words: int = WORDS_PER_CHUNK) -> List[str]:
+    """Return `n` synthetic chunks of roughly `words` tokens each."""
+    return list(iter_chunks(n, seed=seed, words=words))
+
+
+def iter_chunks(n: int, seed: int = 0, words: int = WORDS_PER_CHUNK) -> Iterator[str]:
+    rng = random.Random(seed)
+    vocab = _vocab()
+    cum = _cum_weights(len(vocab), 1.0)
+    for _ in range(n):
+        yield " ".join(rng.choices(vocab, cum_weights=cum, k=words))
+
+
+def make_queries(n: int, seed: int = 1, terms: int = 4) -> List[str]:
+    """Return `n` synthetic keyword queries mixing common and rare terms."""
+    rng = random.Random(seed)
+    vocab = _vocab()
+    cum = _cum_weights(len(vocab), 0.5)
+    return [" ".join(rng.choices(vocab, cum_weights=cum, k=terms)) for _ in range(n)]
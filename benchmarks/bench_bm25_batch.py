@@ -0,0 +1,60 @@
+# benchmarks/bench_bm25_batch.py
+"""
+Looping bm25_index.query_bm25 vs one bm25_index.query_batch call.
+
+Reports queries/second for both paths (the batch path split into the
+one-off matrix build and the cached multiply), and checks that both
+return the same chunks in the same order.
+
+Usage:
+    python -m benchmarks.bench_bm25_batch
+    BENCH_CHUNKS=200000 BENCH_QUERIES=5000 python -m benchmarks.bench_bm25_batch
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks, make_queries
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "50000"))
+N_QUERIES = int(os.getenv("BENCH_QUERIES", "1000"))
+TOP_K = int(os.getenv("BENCH_TOP_K", "8"))
+DOC_CHUNKS = 500
+
+
+def _ids(results):
+    return [[r["meta"]["chunk_index"] for r in rows] for rows in results]
+
+
+def main() -> None:
+    chunks = make_chunks(N_CHUNKS)
+    for i in range(0, N_CHUNKS, DOC_CHUNKS):
+        bm25_index.add_chunks(f"doc-{i}", chunks[i:i + DOC_CHUNKS])
+    queries = make_queries(N_QUERIES, terms=6)
+
+    t0 = time.perf_counter()
+    looped = [bm25_index.query_bm25(q, TOP_K) for q in queries]
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bm25_index._term_doc_matrix(bm25_index._SNAP)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = bm25_index.query_batch(queries, TOP_K)
+    batch_s = time.perf_counter() - t0
+
+    assert _ids(batched) == _ids(looped), "batch rankings differ from query_bm25"
+
+    print(f"{N_CHUNKS:,} chunks, {N_QUERIES:,} queries, top_k={TOP_K}\n")
+    print(f"query_bm25 loop      : {loop_s:8.2f} s  ({N_QUERIES / loop_s:10.0f} q/s)")
+    print(f"matrix build (once)  : {build_s:8.2f} s")
+    print(f"query_batch          : {batch_s:8.2f} s  ({N_QUERIES / batch_s:10.0f} q/s)")
+    print(f"speed-up (cached)    : {loop_s / batch_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
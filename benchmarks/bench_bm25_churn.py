@@ -0,0 +1,68 @@
+# benchmarks/bench_bm25_churn.py
+"""
+BM25 index size and query latency under steady document replacement.
+
+Indexes BENCH_DOCS documents, then replaces random documents for
+BENCH_ROUNDS rounds (the re-upload path), with background compaction
+enabled and disabled. Reports stored vs live chunks and the median query
+latency at the end of each run.
+
+Usage:
+    python -m benchmarks.bench_bm25_churn
+    BENCH_DOCS=500 BENCH_ROUNDS=5000 python -m benchmarks.bench_bm25_churn
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks, make_queries
+
+N_DOCS = int(os.getenv("BENCH_DOCS", "200"))
+N_ROUNDS = int(os.getenv("BENCH_ROUNDS", "2000"))
+DOC_CHUNKS = 20
+
+
+def _run(compact: bool) -> None:
+    bm25_index._SNAP = bm25_index._Snapshot()
+    bm25_index.COMPACT_RATIO = 0.25 if compact else float("inf")
+
+    rng = random.Random(0)
+    pool = make_chunks(N_DOCS * DOC_CHUNKS)
+    for d in range(N_DOCS):
+        bm25_index.add_chunks(f"doc-{d}", pool[d * DOC_CHUNKS:(d + 1) * DOC_CHUNKS])
+
+    t0 = time.perf_counter()
+    for _ in range(N_ROUNDS):
+        d = rng.randrange(N_DOCS)
+        bm25_index.replace_chunks(f"doc-{d}", rng.sample(pool, DOC_CHUNKS))
+    churn_s = time.perf_counter() - t0
+    bm25_index.maintain()
+
+    snap = bm25_index._SNAP
+    stored = sum(seg.n for seg in snap.segments)
+    lat = []
+    for q in make_queries(300, terms=5):
+        t = time.perf_counter()
+        bm25_index.query_bm25(q, 8)
+        lat.append(time.perf_counter() - t)
+
+    label = "compaction on " if compact else "compaction off"
+    print(
+        f"{label}: {snap.n_docs:,} live / {stored:,} stored chunks in "
+        f"{len(snap.segments)} segments, {N_ROUNDS / churn_s:7.0f} replaces/s, "
+        f"p50 query {statistics.median(lat) * 1000:6.2f} ms"
+    )
+
+
+def main() -> None:
+    _run(compact=False)
+    _run(compact=True)
+
+
+if __name__ == "__main__":
+    main()
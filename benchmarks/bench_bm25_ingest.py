@@ -0,0 +1,58 @@
+# benchmarks/bench_bm25_ingest.py
+"""
+Ingest cost of bm25_index.add_chunks as the corpus grows.
+
+Fills the index up to each checkpoint size, then times adding one
+50-chunk "PDF" BENCH_REPEATS times and reports the median and the worst
+add. With incremental statistics and segment merges on the background
+maintenance thread, both should stay flat instead of growing with the
+corpus (the worst add used to include a cascade of merges).
+
+Usage:
+    python -m benchmarks.bench_bm25_ingest
+    BENCH_SIZES=10000,100000,500000 python -m benchmarks.bench_bm25_ingest
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks
+
+SIZES = [int(s) for s in os.getenv("BENCH_SIZES", "1000,10000,50000,100000").split(",")]
+REPEATS = int(os.getenv("BENCH_REPEATS", "40"))
+DOC_CHUNKS = 50
+FILL_BATCH = 1000
+
+
+def main() -> None:
+    upload = make_chunks(DOC_CHUNKS, seed=999)
+    filler = make_chunks(FILL_BATCH, seed=1)
+
+    print(f"{'corpus_chunks':>14} | {'add 50 chunks p50 (ms)':>22} | {'max (ms)':>9}")
+    print("-" * 52)
+
+    n = 0
+    for target in SIZES:
+        while n < target:
+            bm25_index.add_chunks(f"filler-{n}", filler[: min(FILL_BATCH, target - n)])
+            n += min(FILL_BATCH, target - n)
+        bm25_index.maintain()
+
+        times = []
+        for i in range(REPEATS):
+            t0 = time.perf_counter()
+            bm25_index.add_chunks(f"upload-{i}.pdf", upload)
+            times.append((time.perf_counter() - t0) * 1000)
+        for i in range(REPEATS):
+            bm25_index.remove_chunks(f"upload-{i}.pdf")
+        bm25_index.maintain()
+
+        print(f"{n:>14,} | {statistics.median(times):>22.2f} | {max(times):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
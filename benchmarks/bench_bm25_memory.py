@@ -0,0 +1,89 @@
+# benchmarks/bench_bm25_memory.py
+"""
+Resident bytes per chunk of the BM25 index.
+
+Measured with tracemalloc (Python heap only; memory-mapped segment files are
+page cache, not heap) for three layouts of the same BENCH_CHUNKS chunks:
+
+1) legacy   : raw texts + one token list per chunk, the original
+              List[str] / List[List[str]] representation
+2) in-memory: bm25_index segments built by add_chunks without a store
+3) mmap     : the same index written to disk and re-opened by open_store()
+              in a fresh interpreter
+
+Usage:
+    python -m benchmarks.bench_bm25_memory
+    BENCH_CHUNKS=100000 python -m benchmarks.bench_bm25_memory
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "50000"))
+DOC_CHUNKS = 500
+
+_REOPEN = """
+import sys, tracemalloc
+from app.services import bm25_index
+tracemalloc.start()
+bm25_index.open_store(sys.argv[1])
+print(tracemalloc.get_traced_memory()[0])
+"""
+
+
+def _traced(fn) -> int:
+    """Heap bytes still held after fn() returns (its result is kept alive)."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = fn()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used
+
+
+def _legacy(chunks):
+    texts = list(chunks)
+    tokens = [bm25_index._tokenize(c) for c in texts]
+    return texts, tokens
+
+
+def _in_memory(chunks):
+    for i in range(0, len(chunks), DOC_CHUNKS):
+        bm25_index.add_chunks(f"doc-{i}", chunks[i:i + DOC_CHUNKS])
+    return bm25_index._SNAP
+
+
+def main() -> None:
+    # Fresh copies so the measured layouts don't share the input strings
+    chunks = make_chunks(N_CHUNKS)
+    legacy = _traced(lambda: _legacy([c.encode().decode() for c in chunks]))
+    in_memory = _traced(lambda: _in_memory(chunks))
+
+    with tempfile.TemporaryDirectory() as store:
+        # open_store starts from the (empty) store, so index the chunks again
+        bm25_index.open_store(store)
+        _in_memory(chunks)
+        out = subprocess.run(
+            [sys.executable, "-c", _REOPEN, store],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        mapped = int(out.split()[-1])
+        disk = sum(os.path.getsize(os.path.join(store, f)) for f in os.listdir(store))
+
+    print(f"chunks                 : {N_CHUNKS:,} ({len(bm25_index._TERMS):,} distinct terms)")
+    for name, used in (("legacy lists", legacy), ("in-memory index", in_memory), ("mmap'd index (heap)", mapped)):
+        print(f"{name:<23}: {used / N_CHUNKS:8.0f} B/chunk  ({used / 1e6:7.1f} MB)")
+    print(f"{'on disk':<23}: {disk / N_CHUNKS:8.0f} B/chunk  ({disk / 1e6:7.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
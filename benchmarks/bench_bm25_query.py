@@ -0,0 +1,60 @@
+# benchmarks/bench_bm25_query.py
+"""
+Exhaustive BM25 scoring vs WAND dynamic pruning in bm25_index.query_bm25.
+
+For each query length, runs the same synthetic queries in both modes,
+checks that the results are identical, and reports mean latency plus the
+postings-visited / documents-scored counters.
+
+Usage:
+    python -m benchmarks.bench_bm25_query
+    BENCH_CHUNKS=200000 BENCH_TOP_K=10 python -m benchmarks.bench_bm25_query
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks, make_queries
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "50000"))
+TOP_K = int(os.getenv("BENCH_TOP_K", "6"))
+N_QUERIES = int(os.getenv("BENCH_QUERIES", "50"))
+DOC_CHUNKS = 500
+
+
+def _run(queries, prune):
+    stats = {"postings_visited": 0, "docs_scored": 0}
+    t0 = time.perf_counter()
+    results = [bm25_index.query_bm25(q, TOP_K, prune=prune, stats=stats) for q in queries]
+    ms = (time.perf_counter() - t0) * 1000 / len(queries)
+    return results, ms, stats
+
+
+def main() -> None:
+    chunks = make_chunks(N_CHUNKS)
+    for i in range(0, N_CHUNKS, DOC_CHUNKS):
+        bm25_index.add_chunks(f"doc-{i}", chunks[i:i + DOC_CHUNKS])
+
+    print(f"{N_CHUNKS:,} chunks, top_k={TOP_K}, {N_QUERIES} queries per row\n")
+    print(f"{'terms':>5} | {'mode':>10} | {'ms/query':>9} | {'postings/q':>10} | {'scored/q':>9}")
+    print("-" * 58)
+
+    for n_terms in (2, 4, 8, 16):
+        queries = make_queries(N_QUERIES, seed=n_terms, terms=n_terms)
+        exact, ms_e, st_e = _run(queries, prune=False)
+        pruned, ms_w, st_w = _run(queries, prune=True)
+        assert pruned == exact, "WAND results differ from exhaustive scoring"
+
+        for mode, ms, st in (("exhaustive", ms_e, st_e), ("wand", ms_w, st_w)):
+            print(
+                f"{n_terms:>5} | {mode:>10} | {ms:>9.2f} | "
+                f"{st['postings_visited'] / N_QUERIES:>10.0f} | "
+                f"{st['docs_scored'] / N_QUERIES:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_bm25_startup.py
+"""
+Startup cost of the persistent BM25 index at 100k+ chunks.
+
+1) Builds an on-disk index of BENCH_CHUNKS synthetic chunks in a temp dir
+   (including its segment merges).
+2) In a fresh interpreter, times bm25_index.open_store() (memory-mapping the
+   segment files) plus the first query.
+3) For comparison, times rebuilding the same index from raw text, which is
+   what every restart had to do before the index was persisted.
+
+Usage:
+    python -m benchmarks.bench_bm25_startup
+    BENCH_CHUNKS=250000 python -m benchmarks.bench_bm25_startup
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import iter_chunks
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "100000"))
+DOC_CHUNKS = 500
+
+_COLD_START = """
+import sys, time
+t0 = time.perf_counter()
+from app.services import bm25_index
+n = bm25_index.open_store(sys.argv[1])
+t1 = time.perf_counter()
+bm25_index.query("w1 w42 w999", top_k=5)
+t2 = time.perf_counter()
+print(n, t1 - t0, t2 - t1)
+"""
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as store:
+        bm25_index.open_store(store)
+
+        t0 = time.perf_counter()
+        doc: list[str] = []
+        for i, ch in enumerate(iter_chunks(N_CHUNKS)):
+            doc.append(ch)
+            if len(doc) == DOC_CHUNKS:
+                bm25_index.add_chunks(f"doc-{i // DOC_CHUNKS}", doc)
+                doc = []
+        if doc:
+            bm25_index.add_chunks("doc-last", doc)
+        # Let background merges finish: the cold-start child must not open
+        # (and sweep) the store while segment files are still being rewritten
+        bm25_index.maintain()
+        build_s = time.perf_counter() - t0
+
+        files = os.listdir(store)
+        size_mb = sum(os.path.getsize(os.path.join(store, f)) for f in files) / 1e6
+
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_START, store],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        n, open_s, first_q_s = int(out[0]), float(out[1]), float(out[2])
+
+        # Baseline: re-tokenize everything into a memory-only index
+        t0 = time.perf_counter()
+        bm25_index._Segment.build(0, "rebuild", list(iter_chunks(N_CHUNKS)))
+        rebuild_s = time.perf_counter() - t0
+
+    print(f"chunks on disk         : {n:,} ({size_mb:.1f} MB in {len(files)} files)")
+    print(f"incremental build      : {build_s:8.2f} s")
+    print(f"open_store (mmap)      : {open_s * 1000:8.1f} ms")
+    print(f"first query            : {first_q_s * 1000:8.1f} ms")
+    print(f"rebuild from raw text  : {rebuild_s * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_chunking.py
+"""
+Embedding work per document: the old character chunkers vs the
+token-budgeted chunker.
+
+Chunks the given document (PDF, .txt or .md) three ways:
+
+    - chars 1400/200 : the former storage._chunk_text (uploads)
+    - chars 800/100  : the former chunker.chunk_text
+    - tokens         : chunker.iter_chunks (CHUNK_TOKENS / CHUNK_OVERLAP_TOKENS)
+
+and reports, in the embedding model's tokens: chunks, tokens embedded
+(what the model actually sees, after truncation at EMBED_MAX_LENGTH),
+embedded tokens per token of the document (overlap redundancy), tokens
+silently cut off by truncation, chunks that were truncated, and the
+average fill of a model input. With BENCH_EMBED=1 it also times embedding
+every chunk (disk cache off).
+
+Usage:
+    python -m benchmarks.bench_chunking path/to/book.pdf
+    BENCH_EMBED=1 CHUNK_TOKENS=256 python -m benchmarks.bench_chunking notes.md
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Callable, List
+
+os.environ.setdefault("EMBED_CACHE_MB", "0")  # measure the model, not the cache
+
+from app.services import chunker, embeddings  # noqa: E402
+from app.services.extractor import iter_file_pages  # noqa: E402
+
+EMBED = os.getenv("BENCH_EMBED", "0") == "1"
+
+
+def _chars(text: str, chunk_chars: int, overlap: int, snap: bool) -> List[str]:
+    """The former character chunkers (snap=True: break at a sentence, as uploads did)."""
+    text = text.strip()
+    chunks: List[str] = []
+    start, n = 0, len(text)
+    while start < n:
+        end = min(start + chunk_chars, n)
+        if snap:
+            window = text[start:end]
+            split_at = max(window.rfind("\n\n"), window.rfind(". "), window.rfind("? "), window.rfind("! "))
+            if split_at > 400:
+                end = start + split_at + 1
+        chunks.append(text[start:end].strip())
+        if end >= n:
+            break
+        start = max(0, end - overlap)
+    return [c for c in chunks if c]
+
+
+def _report(label: str, chunks: List[str], doc_tokens: int, limit: int) -> None:
+    lengths = [len(o) for o in embeddings.token_offsets(chunks)]
+    seen = [min(n, limit) for n in lengths]
+    cut = sum(n - s for n, s in zip(lengths, seen))
+    truncated = sum(1 for n in lengths if n > limit)
+    line = (
+        f"{label:>15} | {len(chunks):6d} | {sum(seen):9d} | {sum(seen) / doc_tokens:8.2f} | "
+        f"{cut:7d} | {truncated:5d} | {sum(seen) / (len(chunks) * limit):5.0%}"
+    )
+    if EMBED:
+        t0 = time.perf_counter()
+        embeddings.embed_texts_array(chunks, bulk=True)
+        line += f" | {time.perf_counter() - t0:8.1f}"
+    print(line)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    pages = [(n, t) for n, t in iter_file_pages(sys.argv[1]) if t.strip()]
+    text = "\n\n".join(t for _, t in pages)
+    limit = embeddings.max_input_tokens()
+    doc_tokens = sum(len(o) for o in embeddings.token_offsets([t for _, t in pages]))
+    if EMBED:
+        embeddings.embed_texts_array(["warm up"])
+
+    print(f"{sys.argv[1]}: {len(pages)} pages, {doc_tokens} tokens; "
+          f"model input {limit} tokens + specials ({embeddings.model_name()})")
+    header = (f"{'chunker':>15} | {'chunks':>6} | {'embedded':>9} | {'per doc':>8} | "
+              f"{'cut off':>7} | {'trunc':>5} | {'fill':>5}")
+    print(header + (f" | {'embed s':>8}" if EMBED else ""))
+
+    runs: List[tuple[str, Callable[[], List[str]]]] = [
+        ("chars 1400/200", lambda: _chars(text, 1400, 200, snap=True)),
+        ("chars 800/100", lambda: [c for _, t in pages for c in _chars(t, 800, 100, snap=False)]),
+        (f"tokens {chunker.chunk_budget()}/{chunker.CHUNK_OVERLAP_TOKENS}",
+         lambda: [c["text"] for c in chunker.iter_chunks(pages)]),
+    ]
+    for label, run in runs:
+        _report(label, run(), doc_tokens, limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_embed_arrays.py
+"""
+Cost of returning embeddings as Python lists vs float32 arrays.
+
+Embeds BENCH_CHUNKS synthetic chunks with embed_texts (lists) and
+embed_texts_array (one float32 matrix), with the disk cache disabled, cold
+(every chunk a miss, vectors written) and warm (every chunk a hit). The
+transformer is replaced by a stub that returns fixed hidden states, so the
+timings cover only what differs between the two APIs: tokenization,
+pooling, conversion and the cache round trip, not the forward pass.
+
+Reports wall time and the peak Python heap (tracemalloc, measured in a
+separate pass) for each case, normalized to 10k chunks.
+
+Usage:
+    python -m benchmarks.bench_embed_arrays
+    BENCH_CHUNKS=50000 python -m benchmarks.bench_embed_arrays
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import torch
+
+from app.services import embedding_cache, embeddings
+from benchmarks._corpus import make_chunks
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "10000"))
+DIM = 384
+
+
+class _StubModel:
+    """Stands in for the transformer: (batch, seq) ids -> (batch, seq, DIM)."""
+
+    def __init__(self) -> None:
+        self._row = torch.randn(1, 1, DIM, generator=torch.Generator().manual_seed(0))
+
+    def __call__(self, input_ids, **_):
+        b, s = input_ids.shape
+        return SimpleNamespace(last_hidden_state=self._row.expand(b, s, DIM))
+
+
+def _use_cache(mode: str, cache_dir: Path) -> None:
+    """Point the embedding cache at `mode`: "off", "cold" (empty) or "warm"."""
+    if embedding_cache._CACHE is not None and mode != "warm":
+        embedding_cache._CACHE.close()
+        embedding_cache._CACHE = None
+    embedding_cache.EMBED_CACHE_MB = 0 if mode == "off" else 512
+    embedding_cache.EMBED_CACHE_DIR = cache_dir
+    if mode == "cold":
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def _measure(fn, chunks, mode: str, cache_dir: Path):
+    _use_cache(mode, cache_dir)
+    t0 = time.perf_counter()
+    fn(chunks)
+    elapsed = time.perf_counter() - t0
+
+    _use_cache(mode, cache_dir)
+    tracemalloc.start()
+    result = fn(chunks)  # noqa: F841  (held so the peak includes the result)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    embeddings.EMBED_BACKEND = "torch"
+    embeddings._load_model()
+    embeddings._model = _StubModel()
+    chunks = make_chunks(N_CHUNKS, words=60)
+    scale = 10_000 / N_CHUNKS
+    cache_dir = Path(tempfile.mkdtemp(prefix="bench_embed_arrays_"))
+
+    print(f"{N_CHUNKS:,} chunks, dim {DIM}; per 10k chunks:")
+    print(f"{'cache':<5} | {'API':<5} | {'seconds':>7} | {'peak MiB':>8}")
+    try:
+        for mode in ("off", "cold", "warm"):
+            for api, fn in (("list", embeddings.embed_texts), ("array", embeddings.embed_texts_array)):
+                elapsed, peak = _measure(fn, chunks, mode, cache_dir)
+                print(f"{mode:<5} | {api:<5} | {elapsed * scale:7.2f} | {peak * scale / 2**20:8.1f}")
+    finally:
+        _use_cache("off", cache_dir)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
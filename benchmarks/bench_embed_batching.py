@@ -0,0 +1,83 @@
+# benchmarks/bench_embed_batching.py
+"""
+Query embedding under concurrency: one forward pass per request vs the
+micro-batcher behind embeddings.embed_text().
+
+For 1, 8 and 32 concurrent client threads, each client embeds
+BENCH_REQUESTS distinct queries back to back. Reports requests/second and
+p50/p95 latency for both paths. The disk embedding cache is disabled so
+every request reaches the model.
+
+Usage:
+    python -m benchmarks.bench_embed_batching
+    BENCH_REQUESTS=50 BENCH_CLIENTS=1,4,16,64 python -m benchmarks.bench_embed_batching
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import threading
+import time
+
+from app.services import embedding_cache
+
+embedding_cache.EMBED_CACHE_MB = 0  # measure the model, not the cache
+
+from app.services import embeddings  # noqa: E402
+from benchmarks._corpus import make_queries  # noqa: E402
+
+N_REQUESTS = int(os.getenv("BENCH_REQUESTS", "40"))
+CLIENTS = [int(c) for c in os.getenv("BENCH_CLIENTS", "1,8,32").split(",")]
+
+
+def _unbatched(text: str):
+    return embeddings._encode_batch([text])[0]
+
+
+def _run(fn, clients: int):
+    queries = make_queries(clients * N_REQUESTS, terms=12, seed=clients)
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(mine):
+        local = []
+        for q in mine:
+            t0 = time.perf_counter()
+            fn(q)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [
+        threading.Thread(target=client, args=(queries[i::clients],)) for i in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    return (
+        len(latencies) / wall,
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    )
+
+
+def main() -> None:
+    embeddings.embed_texts(["warmup"])  # load the model outside the timings
+
+    print(f"{'clients':>7} | {'path':<10} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for clients in CLIENTS:
+        for name, fn in (("unbatched", _unbatched), ("batched", embeddings.embed_text)):
+            rps, p50, p95 = _run(fn, clients)
+            print(f"{clients:>7} | {name:<10} | {rps:8.1f} | {p50:8.1f} | {p95:8.1f}")
+    b = embeddings._batcher
+    print(f"batcher: {b.requests} requests in {b.batches} forward passes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_embed_bucketing.py
+"""
+Embedding throughput on a real document's chunks: one padded batch per
+call vs length-bucketed batches under a token budget.
+
+The document (PDF, .txt or .md) is extracted and chunked exactly like an
+upload. Both paths embed the same chunks in slices of BENCH_SLICE (the
+number of chunks handed to the model at once); the unbucketed path pads
+each slice to its longest chunk, the bucketed path is embed_texts'
+_encode_bucketed. Also reports padded tokens per real token and checks that
+both paths return the same vectors in the same order.
+
+Usage:
+    python -m benchmarks.bench_embed_bucketing path/to/book.pdf
+    BENCH_SLICE=256 python -m benchmarks.bench_embed_bucketing notes.md
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+from app.services import embeddings
+from app.services.chunker import chunk_pages
+from app.services.extractor import extract_text_pages
+
+SLICE = int(os.getenv("BENCH_SLICE", "64"))
+
+
+def _padding(lengths, batches) -> int:
+    return sum(len(b) * max(lengths[i] for i in b) for b in batches)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    pages = extract_text_pages(sys.argv[1])
+    chunks = chunk_pages(pages)
+    embeddings._load_model()
+
+    encoded = embeddings._tokenizer(chunks, truncation=True, max_length=embeddings.EMBED_MAX_LENGTH)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    slices = [list(range(i, min(i + SLICE, len(chunks)))) for i in range(0, len(chunks), SLICE)]
+
+    plain_tokens = _padding(lengths, slices)
+    bucket_tokens = 0
+    for s in slices:
+        sub = [lengths[i] for i in s]
+        bucket_tokens += _padding(sub, embeddings._token_batches(sub, embeddings.EMBED_TOKEN_BUDGET))
+
+    embeddings._encode_batch(chunks[:4])  # warm up
+
+    t0 = time.perf_counter()
+    plain = []
+    for s in slices:
+        plain.extend(embeddings._encode_batch([chunks[i] for i in s]))
+    plain_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bucketed = []
+    for s in slices:
+        bucketed.extend(embeddings._encode_bucketed([chunks[i] for i in s]))
+    bucket_s = time.perf_counter() - t0
+
+    worst = max(
+        max(abs(a - b) for a, b in zip(u, v)) for u, v in zip(plain, bucketed)
+    )
+    real = sum(lengths)
+    print(f"document               : {sys.argv[1]} ({len(pages)} pages, {len(chunks)} chunks)")
+    print(f"tokens per chunk       : min {min(lengths)}, mean {real / len(lengths):.0f}, max {max(lengths)}")
+    print(f"padded / real tokens   : {plain_tokens / real:.2f} -> {bucket_tokens / real:.2f}")
+    print(f"one batch per slice    : {len(chunks) / plain_s:8.1f} chunks/s")
+    print(f"length-bucketed        : {len(chunks) / bucket_s:8.1f} chunks/s  ({plain_s / bucket_s:.2f}x)")
+    print(f"max |difference|       : {worst:.2e}")
+
+
+if __name__ == "__main__":
+    main()
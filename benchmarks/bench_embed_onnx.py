@@ -0,0 +1,116 @@
+# benchmarks/bench_embed_onnx.py
+"""
+Embedding backends on CPU: PyTorch fp32 vs ONNX Runtime with int8 weights.
+
+The document (PDF, .txt or .md) is extracted and chunked exactly like an
+upload. Each backend embeds every chunk through embed_texts (ingest path),
+then BENCH_QUERIES single short queries one at a time (query path).
+Queries are random 8-word spans of the document. Reports chunks/s, median
+query latency, and the agreement between the two backends: cosine
+similarity of each pair of vectors, and whether both give the same nearest
+chunk for each query.
+
+Exits non-zero when the minimum cosine is below BENCH_MIN_COSINE, so the
+script doubles as the accuracy check for a new model or quantization
+setting. The first onnx-int8 run includes the one-time export, which is
+done before the timings start.
+
+Usage:
+    python -m benchmarks.bench_embed_onnx path/to/book.pdf
+    BENCH_MIN_COSINE=0.995 python -m benchmarks.bench_embed_onnx notes.md
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from app.services import embedding_cache
+
+embedding_cache.EMBED_CACHE_MB = 0  # measure the model, not the cache
+
+from app.services import embeddings  # noqa: E402
+from app.services.chunker import chunk_pages  # noqa: E402
+from app.services.extractor import extract_text_pages  # noqa: E402
+
+N_QUERIES = int(os.getenv("BENCH_QUERIES", "200"))
+MIN_COSINE = float(os.getenv("BENCH_MIN_COSINE", "0.99"))
+
+
+def _queries(chunks, n: int, words: int = 8):
+    rng = random.Random(0)
+    out = []
+    for _ in range(n):
+        toks = rng.choice(chunks).split()
+        start = rng.randrange(max(1, len(toks) - words))
+        out.append(" ".join(toks[start:start + words]))
+    return out
+
+
+def _use(backend: str) -> None:
+    embeddings.EMBED_BACKEND = backend
+    embeddings._tokenizer = embeddings._model = None
+    embeddings._load_model()
+    embeddings._encode_batch(["warm up"])
+
+
+def _run(backend: str, chunks, queries):
+    _use(backend)
+
+    t0 = time.perf_counter()
+    docs = embeddings.embed_texts(chunks)
+    ingest_s = time.perf_counter() - t0
+
+    lat = []
+    qvecs = []
+    for q in queries:
+        t = time.perf_counter()
+        qvecs.append(embeddings._encode_batch([q])[0])
+        lat.append(time.perf_counter() - t)
+
+    return np.asarray(docs, dtype=np.float32), np.asarray(qvecs, dtype=np.float32), ingest_s, lat
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    return m / np.linalg.norm(m, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    pages = extract_text_pages(sys.argv[1])
+    chunks = chunk_pages(pages)
+    queries = _queries(chunks, N_QUERIES)
+
+    print(f"document : {sys.argv[1]} ({len(pages)} pages, {len(chunks)} chunks)")
+    print(f"model    : {embeddings.model_name()}")
+    results = {}
+    for backend in ("torch", "onnx-int8"):
+        docs, qvecs, ingest_s, lat = _run(backend, chunks, queries)
+        results[backend] = (docs, qvecs)
+        print(
+            f"{backend:<9}: {len(chunks) / ingest_s:8.1f} chunks/s, "
+            f"query p50 {statistics.median(lat) * 1000:6.2f} ms"
+        )
+
+    (d32, q32), (d8, q8) = results["torch"], results["onnx-int8"]
+    cos = np.concatenate([
+        (_unit(d32) * _unit(d8)).sum(1),
+        (_unit(q32) * _unit(q8)).sum(1),
+    ])
+    top32 = (_unit(q32) @ _unit(d32).T).argmax(1)
+    top8 = (_unit(q8) @ _unit(d8).T).argmax(1)
+    print(f"cosine(torch, onnx-int8): mean {cos.mean():.4f}, min {cos.min():.4f}")
+    print(f"same top-1 chunk        : {(top32 == top8).mean():.1%} of {len(queries)} queries")
+
+    if cos.min() < MIN_COSINE:
+        sys.exit(f"FAIL: min cosine {cos.min():.4f} < {MIN_COSINE}")
+
+
+if __name__ == "__main__":
+    main()
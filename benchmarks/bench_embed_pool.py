@@ -0,0 +1,63 @@
+# benchmarks/bench_embed_pool.py
+"""
+Bulk embedding throughput: in-process vs EMBED_WORKERS worker processes.
+
+Embeds BENCH_CHUNKS synthetic chunks through
+embed_texts_array(..., bulk=True) with the disk cache disabled, once
+in-process (torch's default intra-op threading) and once for each worker
+count in BENCH_WORKERS (EMBED_WORKER_THREADS threads per worker). Worker
+start-up and model loading happen in an untimed warm-up pass. Reports
+chunks/s, speedup over in-process and scaling efficiency
+(speedup / workers).
+
+Usage:
+    python -m benchmarks.bench_embed_pool
+    BENCH_WORKERS=1,2,4,8,16,32 BENCH_CHUNKS=4096 python -m benchmarks.bench_embed_pool
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+from app.services import embedding_cache
+
+embedding_cache.EMBED_CACHE_MB = 0  # measure the model, not the cache
+
+from app.services import embeddings  # noqa: E402
+from benchmarks._corpus import make_chunks  # noqa: E402
+
+N_CHUNKS = int(os.getenv("BENCH_CHUNKS", "512"))
+WORKERS = [int(w) for w in os.getenv("BENCH_WORKERS", "1,2,4").split(",")]
+
+
+def _run(workers: int, chunks) -> float:
+    embeddings.shutdown_workers()
+    embeddings.EMBED_WORKERS = workers
+    # Warm-up: one task per worker starts every process and loads its model
+    warm = embeddings.EMBED_WORKER_CHUNK * max(1, workers) + 1
+    embeddings.embed_texts_array(chunks[:warm], bulk=True)
+
+    t0 = time.perf_counter()
+    embeddings.embed_texts_array(chunks, bulk=True)
+    return len(chunks) / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    chunks = make_chunks(N_CHUNKS, words=120)
+    print(f"{N_CHUNKS:,} chunks, {os.cpu_count()} CPUs, model {embeddings.model_name()}")
+    print(f"{'workers':>7} | {'chunks/s':>9} | {'speedup':>7} | {'efficiency':>10}")
+
+    base = _run(0, chunks)
+    print(f"{'in-proc':>7} | {base:9.1f} | {1.0:7.2f} | {'':>10}")
+    try:
+        for workers in WORKERS:
+            rate = _run(workers, chunks)
+            speedup = rate / base
+            print(f"{workers:>7} | {rate:9.1f} | {speedup:7.2f} | {speedup / workers:10.0%}")
+    finally:
+        embeddings.shutdown_workers()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_import_time.py
+"""
+Cold-start import time of app.main, with a budget.
+
+Imports app.main in BENCH_RUNS fresh interpreters under `python -X
+importtime` and reports the median cumulative import time, the slowest
+modules (by self time) of the median run, and whether any heavy dependency
+was imported eagerly. Those must stay behind their accessors and load on
+first use:
+
+    torch, transformers, sentence_transformers, onnxruntime, chromadb, PyPDF2
+
+Exits non-zero if the median exceeds IMPORT_BUDGET_MS or a heavy module
+shows up, so it can gate CI. Run from the repository root (app.main serves
+./web).
+
+Usage:
+    python -m benchmarks.bench_import_time
+    IMPORT_BUDGET_MS=800 BENCH_RUNS=9 python -m benchmarks.bench_import_time
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+N_RUNS = int(os.getenv("BENCH_RUNS", "5"))
+BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+MODULE = "app.main"
+HEAVY = ("torch", "transformers", "sentence_transformers", "onnxruntime", "chromadb", "PyPDF2")
+
+
+def _import_once(upload_dir: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """One fresh interpreter: (cumulative ms of MODULE, {module: (self_us, cumulative_us)})."""
+    env = dict(os.environ, UPLOAD_DIR=upload_dir)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        capture_output=True, text=True, env=env, check=False,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {MODULE} failed:\n{proc.stderr[-2000:]}")
+
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cum_us))
+    return modules[MODULE][1] / 1000.0, modules
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as upload_dir:
+        runs = [_import_once(upload_dir) for _ in range(N_RUNS)]
+
+    runs.sort(key=lambda r: r[0])
+    median_ms = statistics.median(r[0] for r in runs)
+    _, modules = runs[len(runs) // 2]
+
+    print(f"import {MODULE}: median {median_ms:.0f} ms over {N_RUNS} runs "
+          f"(min {runs[0][0]:.0f}, max {runs[-1][0]:.0f}); budget {BUDGET_MS:.0f} ms")
+    print("slowest modules (self time):")
+    for name, (self_us, cum_us) in sorted(modules.items(), key=lambda kv: -kv[1][0])[:10]:
+        print(f"  {self_us / 1000:7.1f} ms  (cumulative {cum_us / 1000:7.1f} ms)  {name}")
+
+    failures: List[str] = []
+    eager = sorted({m for m in HEAVY for name in modules if name == m or name.startswith(m + ".")})
+    if eager:
+        failures.append(f"heavy modules imported eagerly: {', '.join(eager)}")
+    if median_ms > BUDGET_MS:
+        failures.append(f"median {median_ms:.0f} ms exceeds budget {BUDGET_MS:.0f} ms")
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
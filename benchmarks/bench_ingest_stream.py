@@ -0,0 +1,110 @@
+# benchmarks/bench_ingest_stream.py
+"""
+Peak memory and time-to-first-result of PDF ingestion: streamed pipeline vs
+whole-document.
+
+Indexes each given PDF twice into a scratch Chroma/BM25 store (embedding
+cache off):
+
+    - whole    : the previous flow: extract every page, chunk all of them,
+                 build every chunk dict, then embed and index in
+                 INGEST_BATCH steps
+    - streamed : storage.save_and_index_pdf (extract -> chunk -> embed ->
+                 index, joined by bounded queues)
+
+Reports pages, chunks, total seconds, seconds until the first batch was
+searchable, and the peak Python heap (tracemalloc, which includes numpy
+buffers). Pass PDFs of different lengths to see whether peak memory grows
+with the document.
+
+Usage:
+    python -m benchmarks.bench_ingest_stream short.pdf long.pdf
+    INGEST_BATCH=64 python -m benchmarks.bench_ingest_stream long.pdf
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+_SCRATCH = tempfile.mkdtemp(prefix="bench_ingest_")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ["UPLOAD_DIR"] = os.path.join(_SCRATCH, "uploads")
+os.environ["EMBED_CACHE_MB"] = "0"
+os.chdir(_SCRATCH)  # chroma_db and bm25_index are relative to the cwd
+
+from app.services import bm25_index, storage, vectorstore  # noqa: E402
+from app.services.chunker import chunk_pages  # noqa: E402
+from app.services.embeddings import embed_texts_array  # noqa: E402
+from app.services.extractor import extract_pdf_pages  # noqa: E402
+
+
+def _whole(path: str) -> Tuple[int, int, float]:
+    """The pre-streaming flow; returns (pages, chunks, first_searchable_s)."""
+    t0 = time.perf_counter()
+    name = "whole-" + os.path.basename(path)
+    pages = extract_pdf_pages(path)
+    chunks = chunk_pages([t for _, t in pages])
+    docs: List[Dict[str, Any]] = [
+        {"id": f"{name}:{i}", "text": ch,
+         "meta": {"filename": name, "chunk_index": i, "chunks_total": len(chunks)}}
+        for i, ch in enumerate(chunks, start=1)
+    ]
+    first = None
+    for start in range(0, len(docs), storage.INGEST_BATCH):
+        part = docs[start:start + storage.INGEST_BATCH]
+        vectors = embed_texts_array([d["text"] for d in part], normalize=True, bulk=True)
+        vectorstore.vs_add(part, vectors=vectors)
+        if first is None:
+            first = time.perf_counter() - t0
+    bm25_index.replace_chunks(name, chunks)
+    return len(pages), len(chunks), first or 0.0
+
+
+def _streamed(path: str) -> Tuple[int, int, float]:
+    t0 = time.perf_counter()
+    first: List[float] = []
+
+    def progress(**fields: Any) -> None:
+        if fields.get("chunks_indexed") and not first:
+            first.append(time.perf_counter() - t0)
+
+    r = storage.save_and_index_pdf(path, progress=progress)
+    return r["pages"], r["chunks_indexed"], first[0] if first else 0.0
+
+
+def _measure(fn, path: str) -> Tuple[int, int, float, float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    pages, chunks, first = fn(path)
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pages, chunks, secs, first, peak / 2**20
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    paths = [os.path.abspath(p) for p in sys.argv[1:]]
+    embed_texts_array(["warm-up"])  # load the model outside the measurements
+
+    print(f"INGEST_BATCH={storage.INGEST_BATCH}, page queue {storage.INGEST_PAGE_QUEUE}, "
+          f"batch queue {storage.INGEST_BATCH_QUEUE}")
+    print(f"{'pdf':>24} | {'mode':>8} | {'pages':>5} | {'chunks':>6} | {'total s':>7} | "
+          f"{'first s':>7} | {'peak MiB':>8}")
+    for path in paths:
+        for mode, fn in (("whole", _whole), ("streamed", _streamed)):
+            pages, chunks, secs, first, peak = _measure(fn, path)
+            print(f"{os.path.basename(path)[-24:]:>24} | {mode:>8} | {pages:5d} | {chunks:6d} | "
+                  f"{secs:7.1f} | {first:7.1f} | {peak:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
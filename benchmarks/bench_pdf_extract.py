@@ -0,0 +1,56 @@
+# benchmarks/bench_pdf_extract.py
+"""
+PDF text extraction throughput: sequential vs parallel page ranges.
+
+Extracts every page of the given PDF with extractor.extract_pdf_pages,
+first in-process (PDF_EXTRACT_WORKERS=1), then on the process pool for each
+worker count in BENCH_WORKERS. Worker start-up happens in an untimed
+warm-up run. Reports pages/s and speedup, and checks that every parallel
+run returns the same text for the same page numbers as the sequential one.
+
+Usage:
+    python -m benchmarks.bench_pdf_extract path/to/reader.pdf
+    BENCH_WORKERS=2,4,8 PDF_PAGES_PER_TASK=8 python -m benchmarks.bench_pdf_extract reader.pdf
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+from app.services import extractor
+
+WORKERS = [int(w) for w in os.getenv("BENCH_WORKERS", "2,4").split(",")]
+
+
+def _run(workers: int, path: str):
+    extractor.shutdown_extract_pool()
+    extractor.PDF_EXTRACT_WORKERS = workers
+    if workers > 1:
+        extractor.extract_pdf_pages(path)  # warm-up: start the workers
+    t0 = time.perf_counter()
+    pages = extractor.extract_pdf_pages(path)
+    return pages, time.perf_counter() - t0
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    path = sys.argv[1]
+
+    base, base_s = _run(1, path)
+    n = len(base)
+    print(f"{path}: {n} pages, {extractor.PDF_PAGES_PER_TASK} pages per task, {os.cpu_count()} CPUs")
+    print(f"{'workers':>10} | {'pages/s':>8} | {'speedup':>7} | same text")
+    print(f"{'sequential':>10} | {n / base_s:8.1f} | {1.0:7.2f} |")
+    try:
+        for workers in WORKERS:
+            pages, secs = _run(workers, path)
+            print(f"{workers:>10} | {n / secs:8.1f} | {base_s / secs:7.2f} | {pages == base}")
+    finally:
+        extractor.shutdown_extract_pool()
+
+
+if __name__ == "__main__":
+    main()
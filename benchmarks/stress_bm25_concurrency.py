@@ -0,0 +1,131 @@
+# benchmarks/stress_bm25_concurrency.py
+"""
+Concurrent upload + query stress run for bm25_index snapshot swapping.
+
+Writer threads keep adding (and removing) documents while reader threads
+query the index. Every chunk of document `doc<N>` carries the marker token
+`mark<N>`, so a reader querying that marker must see either none or all of
+the document's chunks. A partial result means it saw a half-applied write.
+Readers also check that every snapshot's statistics add up.
+
+Exits non-zero on the first inconsistency.
+
+Usage:
+    python -m benchmarks.stress_bm25_concurrency
+    STRESS_SECONDS=60 STRESS_READERS=16 python -m benchmarks.stress_bm25_concurrency
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from app.services import bm25_index
+from benchmarks._corpus import make_chunks
+
+SECONDS = float(os.getenv("STRESS_SECONDS", "10"))
+WRITERS = int(os.getenv("STRESS_WRITERS", "2"))
+READERS = int(os.getenv("STRESS_READERS", "8"))
+DOC_CHUNKS = 20
+
+_errors: list[str] = []
+_stop = threading.Event()
+_counts = {"added": 0, "removed": 0, "queries": 0}
+_lock = threading.Lock()
+_next_doc = iter(range(10**9))
+
+
+def _fail(msg: str) -> None:
+    _errors.append(msg)
+    _stop.set()
+
+
+def _writer(seed: int) -> None:
+    rng = random.Random(seed)
+    filler = make_chunks(DOC_CHUNKS * 4, seed=seed, words=60)
+    live: list[int] = []
+    while not _stop.is_set():
+        if live and rng.random() < 0.3:
+            n = live.pop(rng.randrange(len(live)))
+            if bm25_index.remove_chunks(f"doc{n}") != DOC_CHUNKS:
+                _fail(f"remove doc{n} did not remove {DOC_CHUNKS} chunks")
+            with _lock:
+                _counts["removed"] += 1
+            continue
+
+        with _lock:
+            n = next(_next_doc)
+        chunks = [
+            f"mark{n} shared {text}" for text in rng.sample(filler, DOC_CHUNKS)
+        ]
+        bm25_index.add_chunks(f"doc{n}", chunks)
+        live.append(n)
+        with _lock:
+            _counts["added"] += 1
+
+
+def _reader(seed: int) -> None:
+    rng = random.Random(seed)
+    while not _stop.is_set():
+        snap = bm25_index._SNAP
+        n_docs = sum(s.n for s in snap.segments) - len(snap.deleted)
+        total = sum(s.total_len for s in snap.segments)
+        if n_docs != snap.n_docs or total < snap.total_len:
+            _fail(f"inconsistent snapshot v{snap.version}: {n_docs} != {snap.n_docs}")
+            return
+
+        with _lock:
+            hi = _counts["added"] + 1
+        n = rng.randrange(hi)
+        hits = bm25_index.query_bm25(f"mark{n} shared", top_k=DOC_CHUNKS * 2)
+        mine = [h for h in hits if h["meta"]["doc_id"] == f"doc{n}"]
+        if len(mine) not in (0, DOC_CHUNKS):
+            _fail(f"query saw {len(mine)}/{DOC_CHUNKS} chunks of doc{n}")
+            return
+        for h in mine:
+            if f"mark{n}" not in h["text"]:
+                _fail(f"chunk text does not match doc{n}: {h['text'][:40]!r}")
+                return
+        with _lock:
+            _counts["queries"] += 1
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as store:
+        bm25_index.open_store(store)
+
+        threads = [threading.Thread(target=_writer, args=(i,)) for i in range(WRITERS)]
+        threads += [threading.Thread(target=_reader, args=(100 + i,)) for i in range(READERS)]
+        for t in threads:
+            t.start()
+
+        deadline = time.monotonic() + SECONDS
+        while time.monotonic() < deadline and not _stop.is_set():
+            time.sleep(0.1)
+        _stop.set()
+        for t in threads:
+            t.join()
+
+        # The persisted index must reload to the same state
+        bm25_index.maintain()
+        live = bm25_index._SNAP.n_docs
+        if bm25_index.open_store(store) != live:
+            _fail("reloaded index does not match the in-memory snapshot")
+
+    print(
+        f"{WRITERS} writers / {READERS} readers for {SECONDS:.0f}s: "
+        f"{_counts['added']} docs added, {_counts['removed']} removed, "
+        f"{_counts['queries']} queries checked"
+    )
+    if _errors:
+        print("FAILED:", _errors[0])
+        sys.exit(1)
+    print("OK: every query saw a consistent snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# tests/test_bm25_index.py
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Dict, List
+
+import pytest
+
+from app.services import bm25_index
+
+# Small Zipf-ish vocabulary: frequent terms, rare terms, and plenty of ties
+_VOCAB = [f"t{i}" for i in range(300)]
+_WEIGHTS = [1.0 / (r + 1) for r in range(len(_VOCAB))]
+
+
+def _chunks(rng: random.Random, n: int) -> List[str]:
+    return [
+        " ".join(rng.choices(_VOCAB, weights=_WEIGHTS, k=rng.randint(3, 40)))
+        for _ in range(n)
+    ]
+
+
+def _queries(rng: random.Random, n: int) -> List[str]:
+    return [" ".join(rng.choices(_VOCAB, k=rng.randint(1, 6))) for _ in range(n)]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """An empty, memory-only index; the module's own state is restored after."""
+    monkeypatch.setattr(bm25_index, "_SNAP", bm25_index._Snapshot())
+    monkeypatch.setattr(bm25_index, "_STORE", None)
+    monkeypatch.setattr(bm25_index, "_MATRIX", None)
+    yield bm25_index
+    bm25_index.maintain()  # let the maintenance thread finish before restoring
+
+
+def _assert_wand_matches_exhaustive(rng: random.Random) -> None:
+    for q in _queries(rng, 60):
+        for k in (1, 3, 10, 50):
+            pruned = bm25_index.query_bm25(q, k, prune=True)
+            exhaustive = bm25_index.query_bm25(q, k, prune=False)
+            assert pruned == exhaustive, (q, k)
+
+
+def test_wand_matches_exhaustive_through_replace_remove_and_compact(index, monkeypatch):
+    # Compact only when told to, so queries also run against tombstones
+    # (compaction renumbers chunks, which would differ between two queries)
+    monkeypatch.setattr(bm25_index, "COMPACT_RATIO", float("inf"))
+    rng = random.Random(4)
+    docs = {f"doc{d}": _chunks(rng, rng.randint(1, 30)) for d in range(40)}
+    for name, chunks in docs.items():
+        index.add_chunks(name, chunks)
+    _assert_wand_matches_exhaustive(rng)
+
+    for name in rng.sample(sorted(docs), 12):
+        index.replace_chunks(name, _chunks(rng, rng.randint(1, 30)))
+    _assert_wand_matches_exhaustive(rng)
+
+    for name in rng.sample(sorted(docs), 10):
+        index.remove_chunks(name)
+    assert index._SNAP.deleted
+    _assert_wand_matches_exhaustive(rng)
+
+    index.compact(min_dead_ratio=0.0)
+    assert not index._SNAP.deleted
+    _assert_wand_matches_exhaustive(rng)
+
+    # Merging compacted segments moves chunk indexes down to close the gaps
+    for d in range(40, 60):
+        index.add_chunks(f"doc{d}", _chunks(rng, rng.randint(1, 30)))
+    index.maintain()
+    _assert_wand_matches_exhaustive(rng)
+
+
+def test_readers_never_see_a_partial_write(index):
+    """Queries racing adds, replaces, removes and compaction see whole versions."""
+    doc_chunks = 12
+    errors: List[str] = []
+    added: set = set()  # documents indexed once and never removed after
+    done = threading.Event()
+
+    def doc(n: int, gen: int, rng: random.Random) -> List[str]:
+        return [f"mark{n} gen{n}x{gen} {c}" for c in _chunks(rng, doc_chunks)]
+
+    def writer(seed: int) -> None:
+        # Documents 0-4 are only ever replaced; 5-9 are also removed
+        rng = random.Random(seed)
+        gens: Dict[int, int] = {}
+        for step in range(80):
+            d = rng.randrange(10)
+            n = seed * 1000 + d
+            if n not in gens:
+                gens[n] = 0
+                index.add_chunks(f"doc{n}", doc(n, 0, rng))
+                if d < 5:
+                    added.add(n)
+            elif d >= 5 and rng.random() < 0.3:
+                del gens[n]
+                index.remove_chunks(f"doc{n}")
+            else:
+                gens[n] += 1
+                index.replace_chunks(f"doc{n}", doc(n, gens[n], rng))
+            if step % 20 == 19:
+                index.compact(min_dead_ratio=0.0)
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        while not done.is_set() and not errors:
+            snap = index._SNAP
+            live = sum(s.n for s in snap.segments) - len(snap.deleted)
+            if live != snap.n_docs:
+                errors.append(f"v{snap.version}: {live} live chunks, n_docs {snap.n_docs}")
+                return
+            n = rng.choice((1, 2)) * 1000 + rng.randrange(10)
+            stable = n in added
+            hits = index.query_bm25(f"mark{n}", top_k=doc_chunks * 3)
+            gens = {h["text"].split()[1] for h in hits}
+            if (hits or stable) and (len(hits) != doc_chunks or len(gens) != 1):
+                errors.append(f"doc{n}: {len(hits)} chunks of generations {sorted(gens)}")
+                return
+
+    readers = [threading.Thread(target=reader, args=(100 + i,)) for i in range(4)]
+    writers = [threading.Thread(target=writer, args=(i,)) for i in (1, 2)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+
+    assert not errors, errors[0]
+
+
+def _scored(queries: List[str], top_k: int) -> List[list]:
+    # Chunk indexes differ between the two indexes; everything else must not
+    return [
+        sorted((h["meta"]["doc_id"], h["text"], h["score"]) for h in bm25_index.query(q, top_k))
+        for q in queries
+    ]
+
+
+def _fresh(docs: Dict[str, List[str]], queries: List[str], top_k: int) -> List[list]:
+    """Results of the same queries on an index built from `docs` alone."""
+    current = bm25_index._SNAP
+    bm25_index._SNAP = bm25_index._Snapshot()
+    try:
+        for name, chunks in docs.items():
+            bm25_index.add_chunks(name, chunks)
+        bm25_index.maintain()
+        fresh = bm25_index._SNAP
+        return [fresh.n_docs, fresh.total_len] + _scored(queries, top_k)
+    finally:
+        bm25_index._SNAP = current
+
+
+def test_deletes_and_compaction_score_like_a_fresh_index(index, monkeypatch):
+    monkeypatch.setattr(bm25_index, "COMPACT_RATIO", float("inf"))
+    rng = random.Random(8)
+    docs = {f"doc{d}": _chunks(rng, rng.randint(1, 20)) for d in range(30)}
+    for name, chunks in docs.items():
+        index.add_chunks(name, chunks)
+    queries = _queries(rng, 40)
+    top_k = 1000  # every match, so nothing depends on tie order
+
+    # Tombstones: removed chunks are skipped and their document frequencies
+    # subtracted (dead_df), so idf and average length match a rebuilt index
+    for name in rng.sample(sorted(docs), 8):
+        del docs[name]
+        assert index.remove_chunks(name) > 0
+    for name in rng.sample(sorted(docs), 6):
+        docs[name] = _chunks(rng, rng.randint(1, 20))
+        index.replace_chunks(name, docs[name])
+    index.maintain()
+    snap = index._SNAP
+    assert snap.deleted and snap.dead_df
+    assert [snap.n_docs, snap.total_len] + _scored(queries, top_k) == _fresh(docs, queries, top_k)
+
+    # Background compaction: the next write that leaves a segment dead
+    # enough starts it on the maintenance thread
+    monkeypatch.setattr(bm25_index, "COMPACT_RATIO", 0.25)
+    name = sorted(docs)[0]
+    del docs[name]
+    index.remove_chunks(name)
+    deadline = time.monotonic() + 10
+    while index._SNAP.deleted and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not index._SNAP.deleted
+    index.maintain()
+    snap = index._SNAP
+    assert not snap.dead_df
+    assert sum(s.n for s in snap.segments) == snap.n_docs
+    assert [snap.n_docs, snap.total_len] + _scored(queries, top_k) == _fresh(docs, queries, top_k)
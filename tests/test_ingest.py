@@ -0,0 +1,226 @@
+# tests/test_ingest.py
+from __future__ import annotations
+
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import chromadb
+from chromadb.config import Settings
+import numpy as np
+import pytest
+
+from app.services import bm25_index, extractor, storage, vectorstore
+from app.workers import bulk, ingest
+
+
+def _fake_chunks(pages: Iterable[Tuple[int, str]]) -> Iterator[Dict[str, Any]]:
+    """One chunk per non-empty line (the real chunker needs the model's tokenizer)."""
+    for page, text in pages:
+        start = 0
+        for line in text.split("\n"):
+            if line.strip():
+                yield {
+                    "text": line, "tokens": len(line.split()),
+                    "page": page, "char_start": start,
+                    "page_end": page, "char_end": start + len(line),
+                }
+            start += len(line) + 1
+
+
+def _fake_embed(texts: List[str], normalize: bool = False, bulk: bool = False) -> np.ndarray:
+    rows = [np.frombuffer(hashlib.sha256(t.encode()).digest(), dtype=np.uint8)[:16] for t in texts]
+    out = np.array(rows, dtype=np.float32) + 1.0
+    return out / np.linalg.norm(out, axis=1, keepdims=True) if normalize else out
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Scratch Chroma collection, BM25 index and UPLOAD_DIR; fake chunker and model."""
+    client = chromadb.PersistentClient(
+        path=str(tmp_path / "chroma"), settings=Settings(anonymized_telemetry=False)
+    )
+    monkeypatch.setattr(vectorstore, "_client", client)
+    monkeypatch.setattr(vectorstore, "_col", None)
+    monkeypatch.setattr(bm25_index, "_SNAP", bm25_index._Snapshot())
+    monkeypatch.setattr(bm25_index, "_STORE", None)
+    monkeypatch.setattr(storage, "UPLOAD_DIR", tmp_path / "uploads")
+    (tmp_path / "uploads").mkdir()
+    monkeypatch.setattr(storage, "iter_chunks", _fake_chunks)
+    monkeypatch.setattr(storage, "embed_texts_array", _fake_embed)
+    monkeypatch.setattr(storage, "INGEST_BATCH", 4)
+    yield tmp_path
+    bm25_index.maintain()
+
+
+def _lines(tag: str, n: int) -> str:
+    return "\n".join(f"{tag} line {i} about photosynthesis" for i in range(n))
+
+
+def test_interrupted_reindex_is_not_a_duplicate(stores, monkeypatch):
+    src = storage.UPLOAD_DIR / "A.txt"
+    src.write_text(_lines("v1", 4))
+    first = storage.save_and_index_pdf(src)
+    assert first["ok"] and first["chunks_indexed"] == 4
+
+    # A new, longer version whose indexing dies after its first batch: its
+    # first 4 chunks overwrite v1's ids, which had chunks_total == 4
+    src.write_text(_lines("v2", 8))
+    batches = []
+
+    def failing_embed(texts, normalize=False, bulk=False):
+        batches.append(len(texts))
+        if len(batches) > 1:
+            raise RuntimeError("interrupted")
+        return _fake_embed(texts, normalize)
+
+    monkeypatch.setattr(storage, "embed_texts_array", failing_embed)
+    with pytest.raises(RuntimeError, match="interrupted"):
+        storage.save_and_index_pdf(src)
+    sha256 = storage.file_sha256(src)
+    assert vectorstore.find_document(storage.ingest_key(sha256)) is None
+
+    # Uploading the same version again must index it, not skip it
+    monkeypatch.setattr(storage, "embed_texts_array", _fake_embed)
+    again = storage.save_and_index_pdf(src)
+    assert again["ok"] and not again["duplicate"]
+    assert again["chunks_indexed"] == 8
+    found = vectorstore.find_document(storage.ingest_key(sha256))
+    assert found is not None and found["chunks"] == 8
+    assert vectorstore.get_collection().count() == 8
+    assert storage.save_and_index_pdf(src)["duplicate"]
+
+
+def test_interrupted_bulk_reindex_is_redone(stores, monkeypatch):
+    monkeypatch.setattr(bulk, "INCOMING_DIR", stores / "incoming")
+    monkeypatch.setattr(bulk, "embed_texts_array", _fake_embed)
+    monkeypatch.setattr(extractor, "PDF_EXTRACT_WORKERS", 1)
+    course = stores / "course"
+    course.mkdir()
+    (course / "A.txt").write_text(_lines("v1", 4))
+    (course / "B.txt").write_text(_lines("b", 3))
+    first = bulk.ingest_corpus(course)
+    assert first["files_indexed"] == 2 and first["chunks_indexed"] == 7
+
+    # A changed file whose re-indexing dies after its first batch
+    (course / "A.txt").write_text(_lines("v2", 8))
+
+    def failing_embed(texts, normalize=False, bulk=False):
+        if any(t.startswith("v2 line 4") for t in texts):
+            raise RuntimeError("interrupted")
+        return _fake_embed(texts, normalize)
+
+    monkeypatch.setattr(bulk, "embed_texts_array", failing_embed)
+    with pytest.raises(RuntimeError, match="interrupted"):
+        bulk.ingest_corpus(course)
+    # The previous version stays in place; nothing staged or claimed is left
+    assert (storage.UPLOAD_DIR / "A.txt").read_text() == _lines("v1", 4)
+    assert not list((stores / "incoming").iterdir())
+    assert not ingest._file_locks
+
+    # Running the import again redoes A (not "skipped") and skips B
+    monkeypatch.setattr(bulk, "embed_texts_array", _fake_embed)
+    again = bulk.ingest_corpus(course)
+    assert (again["files_indexed"], again["files_skipped"]) == (1, 1)
+    assert again["chunks_indexed"] == 8
+    assert (storage.UPLOAD_DIR / "A.txt").read_text() == _lines("v2", 8)
+    assert vectorstore.get_collection().count() == 11
+    assert bulk.ingest_corpus(course)["files_skipped"] == 2
+
+
+def test_shutdown_fails_and_cleans_up_queued_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_WORKERS", 1)
+    monkeypatch.setattr(ingest, "_pool", None)
+    monkeypatch.setattr(ingest, "_jobs", {})
+    monkeypatch.setattr(ingest, "_pending", 0)
+    staged = [tmp_path / "running.pdf", tmp_path / "queued.pdf"]
+    for f in staged:
+        f.write_bytes(b"%PDF")
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(job):
+        job.start()
+        started.set()
+        release.wait(10)
+        return {"ok": True}
+
+    running = ingest.submit_job("running.pdf", blocking, cleanup=staged[0].unlink)
+    queued = ingest.submit_job("queued.pdf", lambda job: {"ok": True}, cleanup=staged[1].unlink)
+    assert started.wait(10)
+    stopper = threading.Thread(target=ingest.shutdown)
+    stopper.start()
+    release.set()
+    stopper.join(10)
+
+    assert running.to_dict()["status"] == "done"
+    assert queued.to_dict()["status"] == "failed" and queued.finished_at is not None
+    assert not any(f.exists() for f in staged)
+    assert ingest._pending == 0
+
+
+def test_sweep_incoming_removes_files_of_a_previous_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INCOMING_DIR", tmp_path / ".incoming")
+    assert ingest.sweep_incoming() == 0
+    ingest.INCOMING_DIR.mkdir()
+    for i in range(3):
+        (ingest.INCOMING_DIR / f"{i}-notes.pdf").write_bytes(b"%PDF")
+    assert ingest.sweep_incoming() == 3
+    assert not list(ingest.INCOMING_DIR.iterdir())
+
+
+def test_delete_refuses_a_file_that_is_being_indexed(stores):
+    from fastapi import HTTPException
+
+    from app.api.routes_documents import delete
+
+    src = storage.UPLOAD_DIR / "A.txt"
+    src.write_text(_lines("a", 6))
+    assert storage.save_and_index_pdf(src)["ok"]
+
+    # An upload or bulk import is indexing A.txt: the delete must not interleave
+    ingest.hold_file("A.txt")
+    try:
+        with pytest.raises(HTTPException) as busy:
+            delete("A.txt")
+        assert busy.value.status_code == 409
+        assert vectorstore.get_collection().count() == 6 and src.exists()
+    finally:
+        ingest.release_file("A.txt")
+
+    assert delete("A.txt").chunks_deleted == 6
+    assert vectorstore.get_collection().count() == 0 and not src.exists()
+    assert not ingest._file_locks
+
+
+def test_restore_bm25_from_a_populated_collection(stores):
+    # Chunks indexed before the BM25 index was persisted: only Chroma has them
+    docs = []
+    for name, n in (("bio.txt", 5), ("chem.txt", 3)):
+        for i in reversed(range(1, n + 1)):
+            docs.append({
+                "id": f"{name}:{i}",
+                "text": f"{name} chunk {i} chlorophyll" if i == 2 else f"{name} chunk {i}",
+                "meta": {"filename": name, "chunk_index": i},
+            })
+    vectorstore.vs_add(docs, vectors=_fake_embed([d["text"] for d in docs], normalize=True))
+    assert bm25_index.size() == 0
+
+    assert storage.restore_bm25() == 8
+    assert bm25_index.size() == 8
+    assert bm25_index.documents() == {"bio.txt", "chem.txt"}
+    hits = bm25_index.query("chlorophyll", top_k=5)
+    assert sorted(h["text"] for h in hits) == [
+        "bio.txt chunk 2 chlorophyll", "chem.txt chunk 2 chlorophyll",
+    ]
+    # Chunks are indexed in chunk_index order, not in Chroma's
+    snap = bm25_index._SNAP
+    assert [snap.locate(i)[0].text(snap.locate(i)[1]) for i in range(5)] == [
+        f"bio.txt chunk {i}" + (" chlorophyll" if i == 2 else "") for i in range(1, 6)
+    ]
+
+    # Nothing is missing any more; a later lost write is restored alone
+    assert storage.restore_bm25() == 0
+    bm25_index.remove_chunks("chem.txt")
+    assert storage.restore_bm25() == 3
+    assert bm25_index.documents() == {"bio.txt", "chem.txt"}
+    assert not ingest._file_locks
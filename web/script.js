@@ -36,7 +36,22 @@ async function handleUpload() {
       throw new Error(`Upload failed: ${resp.status} – ${err}`);
     }
 
-    const data = await resp.json();
+    // Indexing runs as a background job: poll it until it finishes
+    const job = await resp.json();
+    let data = job;
+    while (data.status === "queued" || data.status === "running") {
+      const p = data.progress || {};
+      statusEl.textContent =
+        `Indexing (${data.stage || data.status})… ` +
+        `pages ${p.pages_extracted || 0}/${p.pages_total || 0}, ` +
+        `chunks ${p.chunks_indexed || 0}/${p.chunks_total || 0}`;
+      await new Promise((r) => setTimeout(r, 1000));
+      const st = await fetch(`${BASE_URL}/jobs/${job.job_id}`);
+      if (!st.ok) {
+        throw new Error(`Job status failed: ${st.status} – ${await st.text()}`);
+      }
+      data = await st.json();
+    }
     statusEl.textContent = JSON.stringify(data, null, 2);
   } catch (err) {
     console.error(err);